@@ -0,0 +1,14 @@
+# The API clients and records are importable from the package, e.g.
+# `from chapa_cli import ChapaClient`, without slowing down CLI startup
+_CLIENT_EXPORTS = ["ChapaClient", "AsyncChapaClient", "ChapaError"]
+_RECORD_EXPORTS = ["Transaction", "Customer", "Event", "Bank"]
+
+
+def __getattr__(name):
+    if name in _CLIENT_EXPORTS:
+        from chapa_cli import client
+        return getattr(client, name)
+    if name in _RECORD_EXPORTS:
+        from chapa_cli import records
+        return getattr(records, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
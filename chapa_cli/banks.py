@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import click
+import requests
+from chapa_cli.client import ChapaError, api_get, decode_response
+from chapa_cli.utils import BANKS_CACHE_PATH
+from chapa_cli.config import scoped_path
+
+# Seconds a cached bank list is used before it is revalidated with the API
+DEFAULT_TTL = int(os.getenv("CHAPA_BANKS_TTL", "86400"))
+
+# In-process lookup tables, built from the cache entry of `fetched_at`
+_index = None
+
+
+def cache_path():
+    return scoped_path(os.getenv("CHAPA_BANKS_CACHE_PATH") or BANKS_CACHE_PATH)
+
+
+def load_cache():
+    """Return the cached entry, or None if there is no usable cache."""
+    try:
+        with open(cache_path(), "r") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cache(entry):
+    """Atomically replace the cache file."""
+    path = cache_path()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as cache_file:
+        json.dump(entry, cache_file)
+    os.replace(tmp_path, path)
+
+
+def get_banks(token, ttl=DEFAULT_TTL, offline=False, refresh=False):
+    """Return the /banks response, from the on-disk cache when it is fresh.
+
+    A stale cache is revalidated with ETag/If-Modified-Since so an
+    unchanged list costs a 304 instead of a full download.
+    """
+    return get_entry(token, ttl=ttl, offline=offline, refresh=refresh)["response"]
+
+
+def get_entry(token, ttl=DEFAULT_TTL, offline=False, refresh=False):
+    """Return the cache entry of the bank list, revalidated as described in get_banks."""
+    entry = load_cache()
+    if entry and (offline or (not refresh and time.time() - entry["fetched_at"] < ttl)):
+        return entry
+    if offline:
+        raise click.ClickException("No cached bank list available, run `chapa transaction banks` online first.")
+
+    headers = {}
+    if entry and not refresh:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        response = api_get("/banks", token=token, headers=headers)
+    except requests.RequestException as e:
+        return _stale(entry, e)
+
+    if response.status_code == 304 and entry:
+        entry["fetched_at"] = time.time()
+        save_cache(entry)
+        return entry
+
+    if response.status_code != 200:
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        try:
+            decode_response(response.status_code, response.text, body)
+        except ChapaError as e:
+            if response.status_code >= 500:
+                return _stale(entry, e)
+            raise click.ClickException(f"Failed to get supported banks: {e}")
+
+    entry = {
+        "fetched_at": time.time(),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "response": response.json(),
+    }
+    save_cache(entry)
+    return entry
+
+
+def _stale(entry, error):
+    """Fall back to the stale cache entry when the API cannot be reached or fails."""
+    if not entry:
+        raise click.ClickException(f"Failed to get supported banks: {error}")
+    age = (time.time() - entry["fetched_at"]) / 3600
+    click.echo(click.style(f"Warning: could not refresh the bank list ({error}), using the cached one "
+                           f"from {age:.1f} hours ago.", fg="yellow"), err=True)
+    return entry
+
+
+def lookup_bank(token=None, bank_id=None, swift=None, ttl=DEFAULT_TTL, offline=False, refresh=False):
+    """Find a bank by id or SWIFT code, or return None.
+
+    The lookup tables are kept per process: while the bank list they were
+    built from is fresher than `ttl`, calls never touch the network or the
+    cache file. They are rebuilt from the revalidated list once it is
+    stale, on `refresh`, or when the cache file changes (another API base
+    URL).
+    """
+    global _index
+    path = cache_path()
+    if (_index is None or refresh or _index["path"] != path
+            or (not offline and time.time() - _index["fetched_at"] >= ttl)):
+        entry = get_entry(token, ttl=ttl, offline=offline, refresh=refresh)
+        if _index is None or _index["path"] != path or _index["fetched_at"] != entry["fetched_at"]:
+            banks = entry["response"].get("data") or []
+            _index = {
+                "path": path,
+                "fetched_at": entry["fetched_at"],
+                "id": {str(bank["id"]): bank for bank in banks},
+                "swift": {str(bank.get("swift")).upper(): bank for bank in banks},
+            }
+
+    if bank_id is not None:
+        return _index["id"].get(str(bank_id))
+    if swift is not None:
+        return _index["swift"].get(swift.upper())
+    return None
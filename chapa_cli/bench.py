@@ -0,0 +1,137 @@
+import json
+import time
+import threading
+import requests
+import click
+from chapa_cli.client import build_session
+from chapa_cli.ratelimit import RateLimiter
+from chapa_cli.receiver import signature_headers
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def percentile(sorted_values, pct):
+    """Return the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return round(sorted_values[index], 3)
+
+
+def histogram(latencies):
+    """Count latencies (ms) per bucket, the last bucket catching everything slower."""
+    counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+    for latency in latencies:
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if latency <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={bound}ms" for bound in HISTOGRAM_BUCKETS] + [f">{HISTOGRAM_BUCKETS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+def bench_event(worker, number):
+    """Build a unique charge.success event for one request."""
+    return {
+        "event": "charge.success",
+        "type": "API",
+        "status": "success",
+        "tx_ref": f"bench-{worker}-{number}",
+        "amount": "100.00",
+        "currency": "ETB",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S.000000Z", time.gmtime()),
+    }
+
+
+def run_bench(url, duration=10.0, concurrency=8, rps=None, secret_key=None, timeout=10):
+    """Send signed webhook events to `url` for `duration` seconds and return a report.
+
+    Each worker thread keeps its own keep-alive connection. Without `rps`
+    workers send back to back (closed loop), with it they share a token
+    bucket so the total rate is capped.
+    """
+    limiter = RateLimiter(rps)
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    def worker(index):
+        nonlocal errors
+        session = build_session(pool_size=1, max_retries=0)
+        local_latencies, local_statuses, local_errors = [], {}, 0
+        number = 0
+        while True:
+            limiter.acquire()
+            if time.monotonic() >= deadline:
+                break
+            number += 1
+            body = json.dumps(bench_event(index, number))
+            headers = {"Content-Type": "application/json"}
+            if secret_key:
+                headers.update(signature_headers(secret_key, body))
+
+            started = time.perf_counter()
+            try:
+                response = session.post(url, data=body, headers=headers, timeout=timeout)
+                status = response.status_code
+            except requests.RequestException:
+                status = "error"
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            if status == "error" or status >= 400:
+                local_errors += 1
+        session.close()
+
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[str(status)] = statuses.get(str(status), 0) + count
+            errors += local_errors
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "url": url,
+        "duration": round(elapsed, 3),
+        "concurrency": concurrency,
+        "target_rps": rps,
+        "requests": total,
+        "throughput": round(total / elapsed, 2) if elapsed else 0,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0,
+        "statuses": statuses,
+        "latency_ms": {
+            "mean": round(sum(latencies) / total, 3) if total else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": round(latencies[-1], 3) if total else None,
+        },
+        "histogram": histogram(latencies),
+    }
+
+
+def print_report(report):
+    """Print a benchmark report in a readable format."""
+    click.echo(f"Requests:    {report['requests']} in {report['duration']}s ({report['throughput']}/s)")
+    click.echo(f"Errors:      {report['errors']} ({report['error_rate']:.2%})")
+    click.echo(f"Statuses:    {', '.join(f'{status}: {count}' for status, count in report['statuses'].items())}")
+    click.echo("Latency (ms):")
+    for name, value in report["latency_ms"].items():
+        click.echo(f"  {name:<5} {value:.2f}" if value is not None else f"  {name:<5} -")
+    click.echo("Histogram:")
+    for bucket, count in report["histogram"].items():
+        click.echo(f"  {bucket:>9} {count}")
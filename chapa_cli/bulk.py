@@ -0,0 +1,88 @@
+import os
+import csv
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+def read_references(stream):
+    """Yield references from a file, one per line, skipping blanks and comments."""
+    for line in stream:
+        reference = line.strip()
+        if reference and not reference.startswith("#"):
+            yield reference
+
+
+def read_rows(stream, fmt):
+    """Yield rows of a CSV (with header) or JSONL stream as dicts."""
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield {key: value for key, value in row.items() if value not in (None, "")}
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Checkpoint:
+    """Append-only record of the rows of a batch that have completed.
+
+    The first line holds a batch id, generated on the first run, that is
+    used to derive stable tx_refs. A resumed batch therefore re-sends an
+    interrupted row with the same tx_ref, which the API rejects as a
+    duplicate instead of creating a second checkout.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.batch_id = None
+        self.done = set()
+
+        if os.path.exists(path):
+            with open(path, "r") as checkpoint_file:
+                for line in checkpoint_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if "batch_id" in entry:
+                        self.batch_id = entry["batch_id"]
+                    elif "row" in entry:
+                        self.done.add(entry["row"])
+
+        self.file = open(path, "a")
+        if self.batch_id is None:
+            self.batch_id = uuid.uuid4().hex[:10]
+            self._append({"batch_id": self.batch_id})
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def mark_done(self, row, tx_ref):
+        self.done.add(row)
+        self._append({"row": row, "tx_ref": tx_ref})
+
+    def close(self):
+        self.file.close()
+
+
+def bounded_map(func, items, concurrency):
+    """Apply `func` to `items` on a thread pool and yield results as they complete.
+
+    At most twice `concurrency` items are in flight, so arbitrarily long
+    inputs are consumed lazily in constant memory.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        for item in items:
+            if len(pending) >= concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(func, item))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
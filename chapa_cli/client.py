@@ -0,0 +1,433 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import requests
+from chapa_cli.utils import parse_datetime
+from chapa_cli.config import DEFAULTS, get_settings
+from chapa_cli.profiling import phase
+from chapa_cli.ratelimit import ApiLimiter, parse_retry_after, shared_limiter
+from chapa_cli.records import Bank, Event, Transaction, decode_records
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Defaults only: requests use the base URL and timeouts of the active
+# account, from the config file or CHAPA_API_URL/CHAPA_*_TIMEOUT
+API_URL = DEFAULTS["api_url"]
+
+# Connect/read timeouts in seconds, overridable from the environment
+CONNECT_TIMEOUT = float(os.getenv("CHAPA_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("CHAPA_READ_TIMEOUT", "30"))
+
+# Retry policy for throttled (429) and failed (5xx) responses
+MAX_RETRIES = int(os.getenv("CHAPA_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("CHAPA_BACKOFF_FACTOR", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Keep-alive pool size, should be at least the number of concurrent workers
+POOL_SIZE = int(os.getenv("CHAPA_POOL_SIZE", "32"))
+
+# Bytes read at a time when decoding a streamed response
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# Methods retried on RETRY_STATUSES. A POST that failed with a 5xx may still
+# have gone through, and initialize would then fail on the duplicate tx_ref,
+# so POSTs are only retried on connect errors and 429s
+RETRY_METHODS = frozenset(["GET", "HEAD"])
+
+
+class _Retry(Retry):
+    """urllib3 retry policy that also retries a POST throttled with a 429, which the API did not process."""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429:
+            method = "GET"
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def build_session(pool_size=None, max_retries=None, backoff_factor=None):
+    """Build a requests session with a keep-alive pool and retry policy."""
+    pool_size = POOL_SIZE if pool_size is None else pool_size
+    retry = _Retry(
+        total=MAX_RETRIES if max_retries is None else max_retries,
+        backoff_factor=BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,
+        # Hand the last response back instead of raising, the commands print it
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+def get_session():
+    """Return the process wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def configure_session(**kwargs):
+    """Replace the process wide session with one built from the given options."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = build_session(**kwargs)
+    return _session
+
+
+def close_session():
+    """Close the process wide session and its pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_limiter(settings=None):
+    """Return the rate and concurrency limiter shared by every API call of an account."""
+    settings = settings or get_settings()
+    return shared_limiter(settings["account"], rate=settings["rate"], burst=settings["burst"],
+                          concurrency=settings["concurrency"], max_concurrency=settings["max_concurrency"])
+
+
+def throttle_signal(response):
+    """Return (throttled, retry_after) for the adaptive limiter.
+
+    A request counts as throttled if it, or a retry the session already
+    made for it, got a 429.
+    """
+    # httpx responses have no urllib3 retry history
+    retries = getattr(getattr(response, "raw", None), "retries", None)
+    history = getattr(retries, "history", None) or ()
+    throttled = response.status_code == 429 or any(entry.status == 429 for entry in history)
+    retry_after = parse_retry_after(response.headers.get("Retry-After")) if throttled else None
+    return throttled, retry_after
+
+
+def api_request(method, path, token=None, timeout=None, session=None, settings=None, limiter=None, **kwargs):
+    """Send a request to the Chapa API through the shared session (or `session`).
+
+    Every request passes the account's shared limiter (or `limiter`): a
+    token bucket for its rate limit and an adaptive concurrency limit that
+    backs off when the API answers 429.
+    """
+    headers = kwargs.pop("headers", None) or {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    # Base URL and timeouts of the active account (cached, see chapa_cli.config).
+    # Callers running requests on worker threads pass the settings they
+    # resolved, since the --account of the command is only visible on the
+    # main thread
+    settings = settings or get_settings()
+    if timeout is None:
+        timeout = (settings["connect_timeout"], settings["read_timeout"])
+
+    url = path if path.startswith("http") else f"{settings['api_url']}{path}"
+    limiter = limiter or get_limiter(settings)
+    limiter.acquire()
+    throttled = retry_after = None
+    try:
+        with phase("request"):
+            response = (session or get_session()).request(method, url, headers=headers, timeout=timeout, **kwargs)
+        throttled, retry_after = throttle_signal(response)
+        return response
+    finally:
+        limiter.release(throttled, retry_after)
+
+
+def api_get(path, token=None, **kwargs):
+    """Send a GET request to the Chapa API."""
+    return api_request("GET", path, token=token, **kwargs)
+
+
+def api_post(path, token=None, **kwargs):
+    """Send a POST request to the Chapa API."""
+    return api_request("POST", path, token=token, **kwargs)
+
+
+def fetch_transactions_page(page, token=None, settings=None, records=False):
+    """Fetch one page of transactions, raising for non 200 responses.
+
+    With `records`, the transactions are decoded from the response as it
+    streams in, straight into Transaction records.
+    """
+    if not records:
+        response = api_get("/transactions", token=token, params={"page": page}, settings=settings)
+        response.raise_for_status()
+        return response.json().get("data") or {}
+
+    response = api_get("/transactions", token=token, params={"page": page}, settings=settings, stream=True)
+    try:
+        response.raise_for_status()
+        rest = {}
+        with phase("json_decode"):
+            transactions = list(decode_records(Transaction, response.iter_content(CHUNK_SIZE),
+                                               ("data", "transactions"), rest))
+        return {"transactions": transactions, "pagination": rest.get("pagination")}
+    finally:
+        response.close()
+
+
+def iter_transaction_pages(token=None, start_page=1, settings=None, records=False):
+    """Yield the transaction list of each page, prefetching the next page in the background.
+
+    Paging stops at the first empty page or when the API reports no next page.
+    """
+    # Resolved here, the prefetching thread cannot see the --account option
+    settings = settings or get_settings()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = start_page
+        future = executor.submit(fetch_transactions_page, page, token, settings, records)
+        try:
+            while True:
+                data = future.result()
+                transactions = data.get("transactions") or []
+                if not transactions:
+                    return
+
+                pagination = data.get("pagination")
+                has_next = pagination is None or bool(pagination.get("next_page_url"))
+                if has_next:
+                    page += 1
+                    future = executor.submit(fetch_transactions_page, page, token, settings, records)
+
+                yield transactions
+
+                if not has_next:
+                    return
+        finally:
+            future.cancel()
+
+
+def iter_transactions(token=None, since=None, until=None, start_page=1, settings=None, records=False):
+    """Lazily yield transactions across all pages, newest first.
+
+    `since` (inclusive) and `until` (exclusive) are naive UTC datetimes.
+    Since the API lists newest transactions first, paging stops as soon
+    as a transaction older than `since` is seen. With `records`, compact
+    Transaction records are yielded instead of dicts.
+    """
+    for transactions in iter_transaction_pages(token, start_page=start_page, settings=settings, records=records):
+        for transaction in transactions:
+            created_at = parse_datetime(transaction["created_at"])
+            if until and created_at >= until:
+                continue
+            if since and created_at < since:
+                return
+            yield transaction
+
+
+class ChapaError(Exception):
+    """A non 200 response from the Chapa API, `body` holds the decoded error."""
+
+    def __init__(self, status_code: int, body: Dict[str, Any]):
+        self.status_code = status_code
+        self.body = body
+        super().__init__(f"{status_code}: {body.get('message')}")
+
+
+def decode_response(status_code: int, text: str, json_body=None) -> Dict[str, Any]:
+    """Return the decoded body of a successful response, raise ChapaError otherwise."""
+    body = json_body if isinstance(json_body, dict) else {"message": text}
+    if status_code != 200:
+        raise ChapaError(status_code, body)
+    return body
+
+
+def _json(response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+class ChapaClient:
+    """Synchronous Chapa API client over the pooled, retrying session.
+
+    Every method returns the decoded JSON body and raises ChapaError for
+    non 200 responses::
+
+        client = ChapaClient(token)
+        client.verify("tx-ref")["data"]["status"]
+    """
+
+    def __init__(self, token: Optional[str] = None, session=None, account: Optional[str] = None,
+                 limiter: Optional[ApiLimiter] = None):
+        # Settings are resolved once, here: an explicit account takes its
+        # token, base URL, timeouts and limits from its profile in the
+        # config file, so clients for several merchant accounts can be used
+        # side by side, also from worker threads
+        self.settings = get_settings(account)
+        self.token = token or (self.settings["token"] if account else None)
+        self.session = session
+        self.limiter = limiter
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        response = api_request(method, path, token=self.token, session=self.session, settings=self.settings,
+                               limiter=self.limiter, **kwargs)
+        return decode_response(response.status_code, response.text, _json(response))
+
+    def _request_records(self, cls: type, path: str) -> Dict[str, Any]:
+        """GET `path` and decode its "data" array into `cls` records as the response streams in."""
+        response = api_request("GET", path, token=self.token, session=self.session, settings=self.settings,
+                               limiter=self.limiter, stream=True)
+        try:
+            if response.status_code != 200:
+                return decode_response(response.status_code, response.text, _json(response))
+            rest: Dict[str, Any] = {}
+            with phase("json_decode"):
+                data = list(decode_records(cls, response.iter_content(CHUNK_SIZE), ("data",), rest))
+            return dict(rest, data=data)
+        finally:
+            response.close()
+
+    def initialize(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._request("POST", "/transaction/initialize", json=data)
+
+    def verify(self, tx_ref: str) -> Dict[str, Any]:
+        return self._request("GET", f"/transaction/verify/{tx_ref}")
+
+    def banks(self, records: bool = False) -> Dict[str, Any]:
+        """Return the /banks body; with `records`, "data" holds Bank records."""
+        if records:
+            return self._request_records(Bank, "/banks")
+        return self._request("GET", "/banks")
+
+    def events(self, reference: str, records: bool = False) -> Dict[str, Any]:
+        """Return the events of a transaction; with `records`, "data" holds Event records."""
+        if records:
+            return self._request_records(Event, f"/transaction/events/{reference}")
+        return self._request("GET", f"/transaction/events/{reference}")
+
+    def transactions(self, page: int = 1) -> Dict[str, Any]:
+        return self._request("GET", "/transactions", params={"page": page})
+
+    def iter_transactions(self, since=None, until=None, start_page: int = 1,
+                          records: bool = False) -> Iterator[Union[Dict[str, Any], Transaction]]:
+        return iter_transactions(self.token, since=since, until=until, start_page=start_page,
+                                 settings=self.settings, records=records)
+
+
+class AsyncChapaClient:
+    """asyncio Chapa API client over one pooled httpx connection pool.
+
+    HTTP/2 is used when the `h2` package is installed. Requests pass the
+    same shared limiter of the account as the sync client (or `limiter`),
+    awaited without blocking the event loop. Requires httpx
+    (pip install chapa-cli[async])::
+
+        async with AsyncChapaClient(token) as client:
+            results = await client.verify_many(refs, concurrency=200)
+    """
+
+    def __init__(self, token: Optional[str] = None, max_connections: int = 100,
+                 timeout: Optional[float] = None, max_retries: int = MAX_RETRIES, http2: Optional[bool] = None,
+                 account: Optional[str] = None, limiter: Optional[ApiLimiter] = None, **httpx_options):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("AsyncChapaClient requires httpx: pip install chapa-cli[async]")
+
+        if http2 is None:
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+
+        settings = get_settings(account)
+        self.token = token = token or (settings["token"] if account else None)
+        self.max_retries = max_retries
+        self.limiter = limiter or get_limiter(settings)
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self._client = httpx.AsyncClient(
+            base_url=settings["api_url"],
+            headers=headers,
+            http2=http2,
+            timeout=httpx.Timeout(timeout or settings["read_timeout"], connect=settings["connect_timeout"]),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            **httpx_options,
+        )
+
+    async def __aenter__(self) -> "AsyncChapaClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        import asyncio
+
+        # Same policy as the sync session: back off on 429 and, except for POSTs, 5xx, honouring Retry-After
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire_async()
+            throttled = retry_after = None
+            try:
+                with phase("request"):
+                    response = await self._client.request(method, path.lstrip("/"), **kwargs)
+                throttled, retry_after = throttle_signal(response)
+            finally:
+                self.limiter.release(throttled, retry_after)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                break
+            if method not in RETRY_METHODS and response.status_code != 429:
+                break
+            if retry_after is None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            await asyncio.sleep(BACKOFF_FACTOR * (2 ** attempt) if retry_after is None else retry_after)
+        return decode_response(response.status_code, response.text, _json(response))
+
+    async def initialize(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("POST", "/transaction/initialize", json=data)
+
+    async def verify(self, tx_ref: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/transaction/verify/{tx_ref}")
+
+    async def banks(self) -> Dict[str, Any]:
+        return await self._request("GET", "/banks")
+
+    async def events(self, reference: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/transaction/events/{reference}")
+
+    async def transactions(self, page: int = 1) -> Dict[str, Any]:
+        return await self._request("GET", "/transactions", params={"page": page})
+
+    async def verify_many(self, tx_refs: Iterable[str], concurrency: int = 100) -> List[Any]:
+        """Verify many references concurrently.
+
+        Results come back in input order; a failed reference yields its
+        exception (usually ChapaError) instead of a body.
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def verify_one(tx_ref):
+            async with semaphore:
+                return await self.verify(tx_ref)
+
+        return await asyncio.gather(*(verify_one(tx_ref) for tx_ref in tx_refs), return_exceptions=True)
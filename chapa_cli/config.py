@@ -0,0 +1,181 @@
+import os
+import json
+import click
+import base64
+import hashlib
+import threading
+from chapa_cli.utils import CONFIG_FILE_PATH
+
+# Settings used when neither the config file nor the environment set them
+DEFAULTS = {
+    "token": None,
+    "api_url": "https://api.chapa.co/v1",
+    "connect_timeout": 5.0,
+    "read_timeout": 30.0,
+    "concurrency": 8,
+    "max_concurrency": 64,
+    "rate": None,
+    "burst": None,
+}
+
+# Environment variables overriding a setting, and how to parse them
+ENV_SETTINGS = {
+    "token": ("CHAPA_API_TOKEN", str),
+    "api_url": ("CHAPA_API_URL", str),
+    "connect_timeout": ("CHAPA_CONNECT_TIMEOUT", float),
+    "read_timeout": ("CHAPA_READ_TIMEOUT", float),
+    "concurrency": ("CHAPA_CONCURRENCY", int),
+    "max_concurrency": ("CHAPA_MAX_CONCURRENCY", int),
+    "rate": ("CHAPA_RATE", float),
+    "burst": ("CHAPA_BURST", int),
+}
+
+_lock = threading.Lock()
+# path -> ((mtime_ns, size), decoded config)
+_cache = {}
+
+
+class ConfigError(click.ClickException):
+    pass
+
+
+def get_config_path():
+    return os.getenv("CHAPA_CONFIG_PATH") or CONFIG_FILE_PATH
+
+
+def _decode_section(section):
+    """Decode the base64 token of a config section, keeping the other settings."""
+    section = {key: value for key, value in section.items() if key in DEFAULTS}
+    if section.get("token"):
+        section["token"] = base64.b64decode(section["token"]).decode("utf-8")
+    return section
+
+
+def _read(path):
+    with open(path, "r") as config_file:
+        raw = json.load(config_file)
+    return {
+        "settings": _decode_section(raw),
+        "profiles": {name: _decode_section(section) for name, section in (raw.get("profiles") or {}).items()},
+        "default_profile": raw.get("default_profile"),
+    }
+
+
+def load_config(path=None):
+    """Return the decoded config file, read once and cached until it changes.
+
+    Each call costs a stat(); the file is only re-read and decoded when its
+    modification time or size differs from the cached copy. A missing file
+    is an empty config.
+    """
+    path = path or get_config_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {"settings": {}, "profiles": {}, "default_profile": None}
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        try:
+            config = _read(path)
+        except (ValueError, TypeError) as e:
+            raise ConfigError(f"Invalid config file {path}: {e}")
+        _cache[path] = (stamp, config)
+        return config
+
+
+def get_account():
+    """Return the account (profile) chosen with --account, CHAPA_ACCOUNT or the config default."""
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None:
+        obj = ctx.find_root().obj
+        if isinstance(obj, dict) and obj.get("account"):
+            return obj["account"]
+    return os.getenv("CHAPA_ACCOUNT") or load_config()["default_profile"]
+
+
+def get_settings(account=None):
+    """Return the effective settings of `account` (default: the active one).
+
+    Precedence, lowest first: DEFAULTS, the top level of the config file,
+    the account's profile, then CHAPA_* environment variables. The token
+    is the exception: an account only uses its own (or CHAPA_API_TOKEN
+    when it is the active one), never the top level token of another
+    merchant. An account that is not in the config, or has no token,
+    raises ConfigError.
+    """
+    config = load_config()
+    explicit = account is not None
+    account = account or get_account()
+
+    settings = dict(DEFAULTS)
+    settings.update(config["settings"])
+    if account:
+        if account not in config["profiles"]:
+            raise ConfigError(f"Unknown account {account!r}, add it under \"profiles\" in {get_config_path()}")
+        settings["token"] = None
+        settings.update(config["profiles"][account])
+
+    for name, (variable, parse) in ENV_SETTINGS.items():
+        # CHAPA_API_TOKEN belongs to the active account, not to one named explicitly
+        if name == "token" and explicit:
+            continue
+        value = os.getenv(variable)
+        if value:
+            settings[name] = parse(value)
+    if account and not settings["token"]:
+        raise ConfigError(f"Account {account!r} has no token, run `chapa --account {account} login`")
+    settings["account"] = account
+    return settings
+
+
+def setting_default(name):
+    """A click option default reading `name` from the active account's settings."""
+    return lambda: get_settings()[name]
+
+
+def scoped_path(path, settings=None, per_account=False):
+    """Return the variant of a cache file path for the active API base URL.
+
+    Caches of the production API keep their path, any other base URL (a
+    mock server, a sandbox) gets a file of its own so their data never
+    mixes with production data. With `per_account`, each named account
+    gets its own file too, for caches of data that belongs to an account.
+    """
+    settings = settings or get_settings()
+    scope = [] if settings["api_url"] == DEFAULTS["api_url"] else [settings["api_url"]]
+    if per_account and settings.get("account"):
+        scope.append(f"account={settings['account']}")
+    if not scope:
+        return path
+    root, extension = os.path.splitext(path)
+    digest = hashlib.sha1("\n".join(scope).encode("utf-8")).hexdigest()[:10]
+    return f"{root}-{digest}{extension}"
+
+
+def save_settings(values, account=None, path=None):
+    """Write settings (a plain token is base64 encoded) to the config file or an account profile."""
+    path = path or get_config_path()
+    raw = {}
+    if os.path.exists(path):
+        with open(path, "r") as config_file:
+            raw = json.load(config_file)
+
+    values = dict(values)
+    if values.get("token"):
+        values["token"] = base64.b64encode(values["token"].encode("utf-8")).decode("utf-8")
+    if account:
+        raw.setdefault("profiles", {}).setdefault(account, {}).update(values)
+    else:
+        raw.update(values)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as config_file:
+        json.dump(raw, config_file, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,362 @@
+import io
+import os
+import sys
+import json
+import time
+import click
+import socket
+import struct
+import threading
+import traceback
+import subprocess
+from chapa_cli.utils import DAEMON_SOCKET_PATH
+
+# Commands that always run in the calling process: interactive ones, the
+# daemon commands themselves, long running servers and load generators
+# (the daemon runs one command at a time) and reconcile, which starts
+# worker processes of its own
+LOCAL_COMMANDS = {("login",), ("daemon",), ("mock-server",), ("webhook", "listen"), ("webhook", "tunnel"),
+                  ("webhook", "bench"), ("webhook", "replay"), ("transaction", "reconcile")}
+
+# Commands that run until interrupted when one of their flags is set
+LOCAL_FLAGS = {("transaction", "events"): "follow"}
+
+# Global options taking a value, skipped when looking for the command name
+GLOBAL_VALUE_OPTIONS = {"-o", "--output", "--profile-json", "--cprofile", "-a", "--account"}
+
+# Output frames are a kind byte, a 4 byte length and the payload:
+# stdout, stderr and the final exit status of the command
+STDOUT, STDERR, EXIT = b"o", b"e", b"x"
+_header = struct.Struct("!cI")
+
+
+def get_socket_path():
+    return os.getenv("CHAPA_DAEMON_SOCKET") or DAEMON_SOCKET_PATH
+
+
+def _command(args):
+    """Return the first two positional arguments (group and command) and their positions."""
+    names, positions = [], []
+    args = iter(enumerate(args))
+    for position, arg in args:
+        if arg in GLOBAL_VALUE_OPTIONS and not names:
+            next(args, None)
+        elif not arg.startswith("-"):
+            names.append(arg)
+            positions.append(position)
+            if len(names) == 2:
+                break
+    return tuple(names), positions
+
+
+def _reads_stdin(param, value):
+    """Whether a parsed click.File parameter is reading stdin."""
+    if not isinstance(param.type, click.File) or "r" not in param.type.mode or value is None:
+        return False
+    # Opened files carry their path, the stdin wrappers click returns for "-" do not
+    name = getattr(value, "name", None)
+    return not isinstance(name, str) or name in ("-", "<stdin>")
+
+
+def _stays_local(args, names, positions):
+    """Parse the command's own arguments and check whether it reads stdin or runs until interrupted.
+
+    Resolving the command imports its module in the calling process, so
+    a click.File defaulting to stdin ("-") is seen as well as an explicit
+    one. Arguments that do not parse are left to the daemon to report.
+    """
+    from chapa_cli.main import cli
+
+    command, ctx = cli, click.Context(cli, info_name="chapa")
+    path = []
+    for name, position in zip(names, positions):
+        if not isinstance(command, click.Group):
+            break
+        command = command.get_command(ctx, name)
+        if command is None:
+            return False
+        path.append(name)
+        rest = args[position + 1:]
+        ctx = click.Context(command, info_name=name, parent=ctx)
+
+    try:
+        with command.make_context(path[-1], list(rest), parent=ctx.parent) as command_ctx:
+            if command_ctx.params.get(LOCAL_FLAGS.get(tuple(path), "")):
+                return True
+            return any(_reads_stdin(param, command_ctx.params.get(param.name)) for param in command.params)
+    except (click.ClickException, click.exceptions.Exit):
+        return False
+
+
+def should_forward(args):
+    """Whether `args` can run in the daemon.
+
+    Help, the local commands, commands reading stdin and ones that run
+    until interrupted stay local.
+    """
+    names, positions = _command(args)
+    if not names or "--help" in args:
+        return False
+    if names[:1] in LOCAL_COMMANDS or names in LOCAL_COMMANDS:
+        return False
+    return not _stays_local(args, names, positions)
+
+
+def _send_frame(sock, kind, data):
+    sock.sendall(_header.pack(kind, len(data)) + data)
+
+
+def forward(args, path=None):
+    """Run `args` in the daemon if one is listening and return its exit status.
+
+    Returns None, so the caller runs the command itself, when there is no
+    daemon, it cannot be reached, CHAPA_NO_DAEMON is set or the command has
+    to run locally. The command's stdout and stderr are relayed as it runs.
+    """
+    if os.getenv("CHAPA_NO_DAEMON"):
+        return None
+    # Checked first: without a daemon, parsing the arguments would be wasted
+    path = path or get_socket_path()
+    if not os.path.exists(path) or not should_forward(args):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        # A stale socket left by a daemon that was killed
+        sock.close()
+        return None
+
+    with sock:
+        streams = {STDOUT: sys.stdout, STDERR: sys.stderr}
+        request = {
+            "argv": list(args),
+            "cwd": os.getcwd(),
+            "env": {key: value for key, value in os.environ.items() if key.startswith("CHAPA_")},
+        }
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+
+        reader = sock.makefile("rb")
+        while True:
+            header = reader.read(_header.size)
+            if len(header) < _header.size:
+                sys.stderr.write("chapa daemon closed the connection.\n")
+                return 1
+            kind, size = _header.unpack(header)
+            payload = reader.read(size)
+            if kind == EXIT:
+                return int(payload)
+            stream = streams[kind]
+            stream.flush()
+            stream.buffer.write(payload)
+            stream.buffer.flush()
+
+
+def control(command, path=None, timeout=2.0):
+    """Send a control command (ping, stop) to the daemon and return its reply, or None."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or get_socket_path())
+        sock.sendall(json.dumps({"control": command}).encode("utf-8") + b"\n")
+        return json.loads(sock.makefile("rb").readline())
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+
+class _FrameWriter(io.RawIOBase):
+    """Binary stream sending everything written to it as frames of one kind."""
+
+    def __init__(self, sock, kind):
+        super().__init__()
+        self.sock = sock
+        self.kind = kind
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        if data:
+            _send_frame(self.sock, self.kind, data)
+        return len(data)
+
+
+def _text_stream(sock, kind):
+    return io.TextIOWrapper(io.BufferedWriter(_FrameWriter(sock, kind)), encoding="utf-8",
+                            line_buffering=True, write_through=True)
+
+
+def run_command(sock, request):
+    """Run one forwarded command line with its cwd, CHAPA_* environment and output redirected.
+
+    Settings that modules read from the environment at import time keep
+    the daemon's values.
+    """
+    from chapa_cli.main import cli
+
+    saved_streams = sys.stdout, sys.stderr
+    saved_environ = dict(os.environ)
+    saved_cwd = os.getcwd()
+    sys.stdout, sys.stderr = _text_stream(sock, STDOUT), _text_stream(sock, STDERR)
+    for key in [key for key in os.environ if key.startswith("CHAPA_")]:
+        del os.environ[key]
+    os.environ.update(request.get("env") or {})
+
+    code = 0
+    try:
+        os.chdir(request.get("cwd") or saved_cwd)
+        cli.main(args=request["argv"], prog_name="chapa")
+    except SystemExit as e:
+        if isinstance(e.code, str):
+            sys.stderr.write(e.code + "\n")
+        code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except OSError:
+        # Most likely the client went away (Ctrl-C) while the command was writing
+        code = 1
+    except Exception:
+        traceback.print_exc()
+        code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except OSError:
+                pass
+        sys.stdout, sys.stderr = saved_streams
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        os.chdir(saved_cwd)
+    return code
+
+
+def make_server(path):
+    """Bind the daemon's Unix socket server at `path`."""
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline())
+            except ValueError:
+                return
+            server = self.server
+
+            if "control" in request:
+                reply = {"pid": os.getpid(), "uptime": round(time.time() - server.started, 1),
+                         "served": server.served}
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+                if request["control"] == "stop":
+                    threading.Thread(target=server.shutdown).start()
+                return
+
+            # The process wide stdout, environment and cwd are swapped for
+            # each command, so commands run one at a time
+            with server.command_lock:
+                code = run_command(self.request, request)
+                server.served += 1
+            try:
+                _send_frame(self.request, EXIT, str(code).encode("ascii"))
+            except OSError:
+                pass
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(path):
+        os.unlink(path)
+    old_umask = os.umask(0o177)
+    try:
+        server = Server(path, Handler)
+    finally:
+        os.umask(old_umask)
+    server.started = time.time()
+    server.served = 0
+    server.command_lock = threading.Lock()
+    return server
+
+
+def warm_up():
+    """Import the command modules and open the API session ahead of the first command."""
+    from chapa_cli.main import cli
+    from chapa_cli.client import get_session
+
+    for name in cli.list_commands(None):
+        cli.get_command(None, name)
+    get_session()
+
+
+def serve(path=None):
+    """Run the daemon in this process until it is stopped."""
+    path = path or get_socket_path()
+    warm_up()
+    server = make_server(path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+@click.group()
+def daemon():
+    """Keep a warm background process that chapa commands are forwarded to."""
+
+
+@daemon.command()
+@click.option("--socket", "socket_path", help="Unix socket to listen on (default ~/.chapa_cli_daemon.sock or CHAPA_DAEMON_SOCKET).")
+@click.option("--foreground", is_flag=True, help="Run in this process instead of in the background.")
+def start(socket_path, foreground):
+    """Start the daemon."""
+    path = socket_path or get_socket_path()
+    status = control("ping", path)
+    if status:
+        click.echo(f"chapa daemon is already running (pid {status['pid']}).")
+        return
+
+    if foreground:
+        click.echo(f"chapa daemon listening on {path}")
+        serve(path)
+        return
+
+    subprocess.Popen([sys.executable, "-m", "chapa_cli.daemon", path], start_new_session=True,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        status = control("ping", path)
+        if status:
+            click.echo(f"chapa daemon started (pid {status['pid']}), listening on {path}")
+            return
+        time.sleep(0.05)
+    raise click.ClickException("The daemon did not start within 10 seconds.")
+
+
+@daemon.command()
+@click.option("--socket", "socket_path", help="Unix socket of the daemon.")
+def stop(socket_path):
+    """Stop the daemon."""
+    if control("stop", socket_path) is None:
+        click.echo("chapa daemon is not running.")
+    else:
+        click.echo("chapa daemon stopped.")
+
+
+@daemon.command()
+@click.option("--socket", "socket_path", help="Unix socket of the daemon.")
+def status(socket_path):
+    """Show whether the daemon is running."""
+    status = control("ping", socket_path)
+    if status is None:
+        click.echo("chapa daemon is not running.")
+        sys.exit(1)
+    click.echo(f"chapa daemon running (pid {status['pid']}), up {status['uptime']}s, "
+               f"{status['served']} commands served.")
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,81 @@
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def event_key(payload):
+    """Return the idempotency key of a webhook payload: its reference and status.
+
+    A retried delivery repeats both, while the next event of the same
+    transaction changes the status. Payloads without a reference get None
+    and are never treated as duplicates.
+    """
+    if not isinstance(payload, dict):
+        return None
+    reference = payload.get("reference") or payload.get("tx_ref") or payload.get("trx_ref")
+    if not reference:
+        return None
+    return f"{reference}:{payload.get('status') or payload.get('event') or ''}"
+
+
+class Deduplicator:
+    """Remembers the keys of processed webhook events.
+
+    Lookups hit a bounded in-memory LRU first. With `path`, keys are also
+    recorded in a SQLite index so duplicates are still recognised after a
+    restart, or once they have fallen out of the LRU.
+    """
+
+    def __init__(self, capacity=100000, path=None):
+        self.capacity = capacity
+        self.recent = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, first_seen REAL)")
+
+    def check_and_add(self, key):
+        """Record `key` and return True if it had been recorded before."""
+        with self.lock:
+            if key in self.recent:
+                self.recent.move_to_end(key)
+                self.hits += 1
+                return True
+
+            duplicate = False
+            if self.db is not None:
+                # One statement both checks and records the key
+                cursor = self.db.execute("INSERT OR IGNORE INTO seen (key, first_seen) VALUES (?, ?)",
+                                         (key, time.time()))
+                duplicate = cursor.rowcount == 0
+
+            self.recent[key] = None
+            if len(self.recent) > self.capacity:
+                self.recent.popitem(last=False)
+            if duplicate:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return duplicate
+
+    def discard(self, key):
+        """Forget `key`, for an event that was recorded but could not be processed."""
+        with self.lock:
+            self.recent.pop(key, None)
+            self.misses -= 1
+            if self.db is not None:
+                self.db.execute("DELETE FROM seen WHERE key = ?", (key,))
+
+    def stats(self):
+        return {"duplicates": self.hits, "unique": self.misses, "cached": len(self.recent)}
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+def segment_name(number):
+    return f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory):
+    """Return the segment file paths in `directory`, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory)
+                   if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+class EventLog:
+    """Append-only JSONL log split into size-rotated segments.
+
+    Writes are buffered and fsynced in batches: after `fsync_every`
+    events or `fsync_interval` seconds, whichever comes first. The
+    interval is checked on `append` and `tick`, so a writer that can go
+    idle must call `tick` at least every `fsync_interval` seconds (the
+    webhook writer thread does). A crash can then lose at most that
+    window of events.
+    """
+
+    def __init__(self, directory, segment_size=64 * 1024 * 1024, fsync_every=1000, fsync_interval=1.0):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+
+        segments = list_segments(directory)
+        self.number = int(os.path.basename(segments[-1])[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) if segments else 1
+        self.file = None
+        self._open()
+
+    def _open(self):
+        self.file = open(os.path.join(self.directory, segment_name(self.number)), "ab")
+        self.size = self.file.tell()
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def _rotate(self):
+        self._sync()
+        self.file.close()
+        self.number += 1
+        self._open()
+
+    def append(self, events):
+        """Append a batch of events."""
+        data = b"".join(json.dumps(event, separators=(",", ":")).encode() + b"\n" for event in events)
+        if self.size and self.size + len(data) > self.segment_size:
+            self._rotate()
+
+        self.file.write(data)
+        self.size += len(data)
+        self.unsynced += len(events)
+
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.synced_at >= self.fsync_interval:
+            self._sync()
+
+    def tick(self):
+        """Fsync buffered events once they are `fsync_interval` seconds old."""
+        if self.unsynced and time.monotonic() - self.synced_at >= self.fsync_interval:
+            self._sync()
+
+    def close(self):
+        if self.file is not None:
+            self._sync()
+            self.file.close()
+            self.file = None
+
+
+def iter_events(directory):
+    """Yield every logged event, oldest first, skipping a torn last line."""
+    for path in list_segments(directory):
+        with open(path, "rb") as segment:
+            for line in segment:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
@@ -0,0 +1,108 @@
+import time
+import requests
+from chapa_cli.client import ChapaError, api_get, decode_response
+from chapa_cli.bulk import bounded_map
+from chapa_cli.config import get_settings
+
+
+class EventFollower:
+    """Poll the events of several transactions and report only new ones.
+
+    Each reference has its own polling delay: it drops back to `interval`
+    when new events arrive and grows by `backoff` up to `max_interval`
+    while nothing changes or the API throttles. Polls are conditional
+    (If-None-Match/If-Modified-Since) when the API returns validators, so
+    an unchanged event list costs a 304.
+
+    Connection errors, 429 and 5xx responses are retried after the same
+    backoff. Any other error (a bad token, an unknown reference) will not
+    go away by polling again: the reference is dropped and passed to
+    `on_error` with the ChapaError.
+    """
+
+    def __init__(self, token, references, interval=2.0, max_interval=30.0, backoff=1.5, concurrency=8,
+                 on_error=None):
+        self.token = token
+        self.on_error = on_error
+        # Polls run on worker threads, which cannot see the --account option
+        self.settings = get_settings()
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self.state = {
+            reference: {"last_item": None, "seen": 0, "delay": interval, "next_poll": 0.0, "validators": {}}
+            for reference in references
+        }
+
+    def _new_events(self, state, events):
+        if events and all("item" in event for event in events):
+            if state["last_item"] is None:
+                new = events
+            else:
+                new = [event for event in events if event["item"] > state["last_item"]]
+            if new:
+                state["last_item"] = max(event["item"] for event in new)
+        else:
+            # Without item numbers, the list only ever grows at the end
+            new = events[state["seen"]:]
+        state["seen"] = len(events)
+        return sorted(new, key=lambda event: event.get("item", 0))
+
+    def poll(self, reference):
+        """Fetch the events of one reference and return (reference, new events, permanent error)."""
+        state = self.state[reference]
+        headers = {}
+        if state["validators"].get("etag"):
+            headers["If-None-Match"] = state["validators"]["etag"]
+        if state["validators"].get("last_modified"):
+            headers["If-Modified-Since"] = state["validators"]["last_modified"]
+
+        new = []
+        try:
+            response = api_get(f"/transaction/events/{reference}", token=self.token, headers=headers,
+                               settings=self.settings)
+            if response.status_code != 304:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = None
+                body = decode_response(response.status_code, response.text, body)
+                state["validators"] = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                new = self._new_events(state, body.get("data") or [])
+        except ChapaError as e:
+            if e.status_code != 429 and e.status_code < 500:
+                return reference, new, e
+        except requests.RequestException:
+            pass
+
+        state["delay"] = self.interval if new else min(state["delay"] * self.backoff, self.max_interval)
+        state["next_poll"] = time.monotonic() + state["delay"]
+        return reference, new, None
+
+    def follow(self, timeout=None):
+        """Yield (reference, event) pairs for new events until `timeout` seconds have passed.
+
+        Also returns once every reference has been dropped after an error.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            now = time.monotonic()
+            due = [reference for reference, state in self.state.items() if state["next_poll"] <= now]
+            for reference, new, error in bounded_map(self.poll, due, self.concurrency):
+                for event in new:
+                    yield reference, event
+                if error is not None:
+                    del self.state[reference]
+                    if self.on_error:
+                        self.on_error(reference, error)
+
+            if not self.state:
+                return
+            next_poll = min(state["next_poll"] for state in self.state.values())
+            if deadline is not None and next_poll >= deadline:
+                return
+            time.sleep(max(0.0, next_poll - time.monotonic()))
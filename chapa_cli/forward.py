@@ -0,0 +1,133 @@
+import time
+import queue
+import threading
+import requests
+from chapa_cli.client import build_session
+
+
+class ForwardTarget:
+    """Forwards webhook events to one URL from a bounded queue.
+
+    `workers` threads POST queued events over a keep-alive session and
+    retry connection errors, 429 and 5xx responses with exponential
+    backoff (honouring Retry-After). When the queue is full `put` sheds
+    the event for this target only and returns False, so a slow target
+    never blocks the receiver or the other targets.
+    """
+
+    def __init__(self, url, queue_size=1000, workers=4, max_retries=5, backoff=0.5, max_backoff=30.0, timeout=10):
+        self.url = url
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.session = build_session(pool_size=workers, max_retries=0)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.forwarded = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, name=f"chapa-forward-{i}", daemon=True)
+                        for i in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+    def stop(self, timeout=None):
+        """Stop the workers once the queued events are sent (or `timeout` passes)."""
+        deadline = time.monotonic() + timeout if timeout else None
+
+        def remaining():
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        try:
+            for _ in self.threads:
+                self.queue.put(None, timeout=remaining())
+        except queue.Full:
+            # Give up on the rest, the workers are daemon threads
+            return
+        for thread in self.threads:
+            thread.join(remaining())
+        self.session.close()
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _delay(self, attempt, response):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return min(self.backoff * 2 ** attempt, self.max_backoff)
+
+    def send(self, event):
+        """POST one event, retrying transient failures. Returns True once delivered."""
+        headers = dict(event.get("headers") or {})
+        headers["Content-Type"] = "application/json"
+        body = event["body"].encode("utf-8")
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+                if response.status_code < 400:
+                    return True
+                if response.status_code != 429 and response.status_code < 500:
+                    # The target rejected the event, retrying will not help
+                    return False
+            except requests.RequestException:
+                pass
+            if attempt < self.max_retries:
+                self._count("retried")
+                time.sleep(self._delay(attempt, response))
+        return False
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            self._count("forwarded" if self.send(event) else "failed")
+
+    def stats(self):
+        return {"url": self.url, "forwarded": self.forwarded, "failed": self.failed,
+                "retried": self.retried, "dropped": self.dropped, "queued": self.queue.qsize()}
+
+
+class FanOut:
+    """Hands every received event to each of several ForwardTargets."""
+
+    def __init__(self, urls, **options):
+        self.targets = [ForwardTarget(url, **options) for url in urls]
+
+    def start(self):
+        for target in self.targets:
+            target.start()
+        return self
+
+    def forward(self, events):
+        for event in events:
+            for target in self.targets:
+                target.put(event)
+
+    def stop(self, timeout=None):
+        for target in self.targets:
+            target.stop(timeout)
+
+    def stats(self):
+        return [target.stats() for target in self.targets]
@@ -1,40 +1,117 @@
 import click
+import importlib
 from getpass import getpass  
-from chapa_cli import webhook, transaction
 from chapa_cli.utils import save_token, load_token
+from chapa_cli.output import OUTPUT_FORMATS
+from chapa_cli import profiling
 
-from time import sleep
-from rich.console import Console
-from rich.text import Text
-from rich.theme import Theme
+from time import sleep, perf_counter
 
-#create a console object 
-console = Console()
 
+# Context meta key of the seconds spent importing subcommand modules
+IMPORTS_META = "chapa_cli.imports"
 
 
+class LazyGroup(click.Group):
+    """A click group that imports its subcommand modules only when they are invoked.
 
+    `lazy_subcommands` maps a command name to `(import_path, short_help)`,
+    where import_path is "module:attribute". The short help is listed by
+    `--help` without importing anything.
+    """
 
-sucess_theme = Theme({"highlight":"bold Green"})
-error_theme = Theme({"highlight":"bold red"})
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
 
+    def list_commands(self, ctx):
+        return sorted(list(super().list_commands(ctx)) + list(self.lazy_subcommands))
 
-@click.group()
-def cli():
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_subcommands:
+            return self._load(ctx, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def _load(self, ctx, cmd_name):
+        import_path, _ = self.lazy_subcommands[cmd_name]
+        module_name, attribute = import_path.split(":")
+        # This runs before the group's callback enables --profile, so the
+        # time is kept on the context and recorded by the callback
+        started = perf_counter()
+        command = getattr(importlib.import_module(module_name), attribute)
+        ctx.meta[IMPORTS_META] = ctx.meta.get(IMPORTS_META, 0.0) + perf_counter() - started
+        # Register it so later lookups are plain dict hits
+        self.add_command(command, cmd_name)
+        del self.lazy_subcommands[cmd_name]
+        return command
+
+    def format_commands(self, ctx, formatter):
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_subcommands:
+                rows.append((name, self.lazy_subcommands[name][1]))
+            else:
+                command = super().get_command(ctx, name)
+                if command is not None and not command.hidden:
+                    rows.append((name, command.get_short_help_str(formatter.width)))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_subcommands={
+    "transaction": ("chapa_cli.transaction:transaction", "Transaction-related commands."),
+    "webhook": ("chapa_cli.webhook:webhook", "Webhook-related commands."),
+    "daemon": ("chapa_cli.daemon:daemon", "Keep a warm background process that commands are forwarded to."),
+    "mock-server": ("chapa_cli.mockserver:mock_server", "Serve a mock Chapa API from a seeded, generated dataset."),
+})
+@click.option("--output", "-o", type=click.Choice(OUTPUT_FORMATS), default="table", show_default=True,
+              envvar="CHAPA_OUTPUT", help="Output format. Anything but table skips rich rendering entirely.")
+@click.option("--profile", is_flag=True, envvar="CHAPA_PROFILE",
+              help="Print a per-phase timing breakdown (imports, token, DNS, TLS, requests, JSON, rendering) to stderr.")
+@click.option("--profile-json", type=click.Path(dir_okay=False), envvar="CHAPA_PROFILE_JSON",
+              help="Write the timing breakdown to this JSON file instead of printing it.")
+@click.option("--cprofile", type=click.Path(dir_okay=False), envvar="CHAPA_CPROFILE",
+              help="Also dump cProfile stats to this file.")
+@click.option("--account", "-a", envvar="CHAPA_ACCOUNT",
+              help="Merchant account (profile in the config file) to use.")
+@click.pass_context
+def cli(ctx, output, profile, profile_json, cprofile, account):
     """Chapa CLI to manage your Chapa integration."""
-    pass
+    ctx.ensure_object(dict)["output"] = output
+    ctx.obj["account"] = account
+    imports = ctx.meta.pop(IMPORTS_META, 0.0)
+    if profile or profile_json or cprofile:
+        profiling.enable(cprofile=bool(cprofile), started=perf_counter() - imports)
+        if imports:
+            profiling.record("imports", imports)
+        # Runs when the command finishes, also after sys.exit and errors
+        ctx.call_on_close(lambda: profiling.finish(json_path=profile_json, cprofile_path=cprofile))
 
 @cli.command()
-def login():
-    """Login to Chapa CLI by providing your secret token."""
+@click.pass_context
+def login(ctx):
+    """Login to Chapa CLI by providing your secret token.
+
+    With the global --account, the token is saved to that account's profile.
+    """
+    from rich.console import Console
+    from rich.text import Text
+    from rich.theme import Theme
+
+    sucess_theme = Theme({"highlight":"bold Green"})
+    error_theme = Theme({"highlight":"bold red"})
+    console = Console()
+
     token = getpass("Enter your Chapa secret token: ")
     if token:
         #TODO: validate the token with the server before saving
         
         #store the token
-        save_token(token)
+        account = (ctx.find_root().obj or {}).get("account")
+        save_token(token, account=account)
         #check if the token is saved
-        if load_token():
+        if load_token(account):
             try:
                 with console.status(f"[bold white][/bold white]", spinner="dots"):
                     #Simulate some work
@@ -59,9 +136,15 @@ def login():
         empty_text.highlight_words(["Token cannot be empty."], style="highlight")
         error_console.print(empty_text)
 
-# Register the commands
-cli.add_command(transaction.transaction)
-cli.add_command(webhook.webhook)
+def main():
+    """Console script entry point: forward to a running daemon, or run the command here."""
+    import sys
+    from chapa_cli.daemon import forward
+
+    code = forward(sys.argv[1:])
+    if code is None:
+        cli()
+    sys.exit(code)
 
 if __name__ == "__main__":
-    cli()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,382 @@
+import json
+import time
+import queue
+import random
+import hashlib
+import threading
+import click
+import requests
+from datetime import datetime, timedelta, timezone
+from chapa_cli.ratelimit import RateLimiter
+from chapa_cli.receiver import serve, signature_headers
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.000000Z"
+
+BANKS = [
+    ("Awash Bank", "AWINETAA", 14, False),
+    ("Bank of Abyssinia", "ABYSETAA", 8, False),
+    ("Commercial Bank of Ethiopia (CBE)", "CBETETAA", 13, False),
+    ("Cooperative Bank of Oromia (COOP)", "CBORETAA", 13, False),
+    ("Dashen Bank", "DASHETAA", 13, False),
+    ("Hibret Bank", "UNTDETAA", 16, False),
+    ("Telebirr", "TELEBIRR", 10, True),
+    ("M-Pesa", "MPESA", 10, True),
+]
+
+FIRST_NAMES = ["Abebe", "Bilen", "Chaltu", "Dawit", "Eden", "Feven", "Girma", "Hana", "Kebede", "Liya"]
+LAST_NAMES = ["Bekele", "Gizachew", "Haile", "Tesfaye", "Alemu", "Tadesse", "Mengistu", "Wolde"]
+PAYMENT_METHODS = ["telebirr", "cbebirr", "mpesa", "card", "awash_birr"]
+# Generated transactions are mostly successful, as on a real account
+STATUSES = ["success"] * 8 + ["failed", "pending"]
+
+
+class MockDataset:
+    """A deterministic set of `size` transactions, generated on demand.
+
+    Transaction i is derived from `seed` and i alone, so datasets of any
+    size cost no memory and every run with the same seed serves the same
+    data. Index 0 is the newest, as the API lists transactions newest first.
+    Transactions created through the initialize endpoint are kept in memory.
+    """
+
+    def __init__(self, size=1000, seed=42, per_page=10, start=None):
+        self.size = size
+        self.seed = seed
+        self.per_page = per_page
+        self.start = start or datetime(2024, 1, 1)
+        self.created = {}
+        self.lock = threading.Lock()
+
+    def tx_ref(self, index):
+        return f"mock-{self.seed}-{index:08d}"
+
+    def index_of(self, tx_ref):
+        prefix = f"mock-{self.seed}-"
+        if tx_ref.startswith(prefix) and tx_ref[len(prefix):].isdigit():
+            index = int(tx_ref[len(prefix):])
+            if index < self.size:
+                return index
+        return None
+
+    def transaction(self, index):
+        rng = random.Random(self.seed * 1000003 + index)
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        amount = round(rng.uniform(10, 5000), 2)
+        created_at = (self.start + timedelta(minutes=self.size - index)).strftime(TIMESTAMP_FORMAT)
+        return {
+            "status": rng.choice(STATUSES),
+            "ref_id": f"AP{rng.getrandbits(48):012X}",
+            "tx_ref": self.tx_ref(index),
+            "type": "API",
+            "created_at": created_at,
+            "updated_at": created_at,
+            "currency": "ETB" if rng.random() < 0.9 else "USD",
+            "amount": f"{amount:.2f}",
+            "charge": f"{amount * 0.035:.2f}",
+            "trans_id": None,
+            "payment_method": rng.choice(PAYMENT_METHODS),
+            "customer": {
+                "id": rng.randint(1, 100000),
+                "email": f"{first_name.lower()}.{last_name.lower()}{index % 97}@example.com",
+                "first_name": first_name,
+                "last_name": last_name,
+                "mobile": f"09{rng.randint(10000000, 99999999)}",
+            },
+        }
+
+    def find(self, tx_ref):
+        with self.lock:
+            if tx_ref in self.created:
+                return dict(self.created[tx_ref])
+        index = self.index_of(tx_ref)
+        return None if index is None else self.transaction(index)
+
+    def page(self, page):
+        """Return the `data` of a /transactions response."""
+        first = (page - 1) * self.per_page
+        indexes = range(max(0, first), min(self.size, first + self.per_page))
+        last_page = max(1, -(-self.size // self.per_page))
+        return {
+            "transactions": [self.transaction(index) for index in indexes],
+            "pagination": {
+                "per_page": self.per_page,
+                "current_page": page,
+                "first_page_url": "/transactions?page=1",
+                "next_page_url": f"/transactions?page={page + 1}" if page < last_page else None,
+                "prev_page_url": f"/transactions?page={page - 1}" if page > 1 else None,
+            },
+        }
+
+    def create(self, data):
+        """Record an initialized transaction; returns None if the tx_ref was used before."""
+        tx_ref = data["tx_ref"]
+        now = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+        transaction = {
+            "status": "pending",
+            "ref_id": f"AP{hashlib.sha1(tx_ref.encode()).hexdigest()[:12].upper()}",
+            "tx_ref": tx_ref,
+            "type": "API",
+            "created_at": now,
+            "updated_at": now,
+            "currency": data.get("currency") or "ETB",
+            "amount": f"{float(data['amount']):.2f}",
+            "charge": f"{float(data['amount']) * 0.035:.2f}",
+            "trans_id": None,
+            "payment_method": None,
+            "customer": {
+                "id": None,
+                "email": data.get("email"),
+                "first_name": data.get("first_name"),
+                "last_name": data.get("last_name"),
+                "mobile": data.get("phone_number"),
+            },
+        }
+        with self.lock:
+            if tx_ref in self.created or self.index_of(tx_ref) is not None:
+                return None
+            self.created[tx_ref] = transaction
+        return transaction
+
+    def complete(self, tx_ref, status="success"):
+        with self.lock:
+            transaction = self.created[tx_ref]
+            transaction["status"] = status
+            transaction["payment_method"] = "telebirr"
+            transaction["updated_at"] = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+            return dict(transaction)
+
+
+def verify_body(transaction):
+    """The /transaction/verify response for a transaction."""
+    customer = transaction["customer"]
+    return {
+        "message": "Payment details",
+        "status": "success",
+        "data": {
+            "first_name": customer["first_name"],
+            "last_name": customer["last_name"],
+            "email": customer["email"],
+            "currency": transaction["currency"],
+            "amount": float(transaction["amount"]),
+            "charge": float(transaction["charge"]),
+            "mode": "test",
+            "method": transaction["payment_method"],
+            "type": transaction["type"],
+            "status": transaction["status"],
+            "reference": transaction["ref_id"],
+            "tx_ref": transaction["tx_ref"],
+            "customization": {"title": None, "description": None, "logo": None},
+            "meta": None,
+            "created_at": transaction["created_at"],
+            "updated_at": transaction["updated_at"],
+        },
+    }
+
+
+def transaction_events(transaction):
+    """The event list of a transaction, one more event per step it went through."""
+    steps = [("log", "Checkout created")]
+    if transaction["status"] != "pending":
+        steps.append(("log", f"Payment attempted with {transaction['payment_method']}"))
+        if transaction["status"] == "success":
+            steps.append(("log", "Payment completed"))
+        else:
+            steps.append(("error", "Payment failed: insufficient balance"))
+    return [
+        {"item": item, "message": message, "type": kind,
+         "created_at": transaction["created_at"], "updated_at": transaction["updated_at"]}
+        for item, (kind, message) in enumerate(steps, 1)
+    ]
+
+
+def banks_body():
+    banks = [
+        {"id": index, "slug": name.split(" (")[0].lower().replace(" ", "_"), "swift": swift, "name": name,
+         "acct_length": acct_length, "country_id": 1, "is_mobilemoney": 1 if mobile else None,
+         "is_active": 1, "is_rtgs": None if mobile else 1, "active": 1, "is_24hrs": 1 if mobile else None,
+         "created_at": "2023-01-24T04:27:53.000000Z", "updated_at": "2024-01-05T10:15:00.000000Z",
+         "currency": "ETB"}
+        for index, (name, swift, acct_length, mobile) in enumerate(BANKS, 1)
+    ]
+    return {"message": "Banks retrieved", "data": banks}
+
+
+class CallbackSender:
+    """Completes initialized transactions after `delay` seconds and notifies the merchant.
+
+    The webhook (signed with `secret`) goes to `webhook_url`, or the
+    initialize request's `webhook`, and the callback_url gets a GET with
+    the result, as Chapa does. One background thread handles them in order:
+    with a fixed delay, first in is also first due.
+    """
+
+    def __init__(self, dataset, webhook_url=None, secret=None, delay=1.0):
+        self.dataset = dataset
+        self.webhook_url = webhook_url
+        self.secret = secret
+        self.delay = delay
+        self.queue = queue.Queue()
+        self.session = requests.Session()
+        self.sent = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._run, name="chapa-mock-callbacks", daemon=True)
+        self.thread.start()
+
+    def schedule(self, tx_ref, data):
+        self.queue.put((time.monotonic() + self.delay, tx_ref, data))
+
+    def _post(self, method, url, **kwargs):
+        try:
+            self.session.request(method, url, timeout=10, **kwargs)
+            self.sent += 1
+        except requests.RequestException:
+            self.failed += 1
+
+    def _run(self):
+        while True:
+            due, tx_ref, data = self.queue.get()
+            time.sleep(max(0.0, due - time.monotonic()))
+            transaction = self.dataset.complete(tx_ref)
+
+            webhook_url = data.get("webhook") or self.webhook_url
+            if webhook_url:
+                body = json.dumps({
+                    "event": "charge.success",
+                    "tx_ref": tx_ref,
+                    "reference": transaction["ref_id"],
+                    "status": transaction["status"],
+                    "amount": transaction["amount"],
+                    "currency": transaction["currency"],
+                    "charge": transaction["charge"],
+                    "payment_method": transaction["payment_method"],
+                    "created_at": transaction["created_at"],
+                    "updated_at": transaction["updated_at"],
+                })
+                headers = {"Content-Type": "application/json"}
+                if self.secret:
+                    headers.update(signature_headers(self.secret, body))
+                self._post("POST", webhook_url, data=body, headers=headers)
+            if data.get("callback_url"):
+                self._post("GET", data["callback_url"], params={
+                    "trx_ref": tx_ref, "ref_id": transaction["ref_id"], "status": transaction["status"]})
+
+
+def create_app(dataset, latency=0.0, jitter=0.0, error_rate=0.0, throttle=None, token=None, callbacks=None, seed=None):
+    """Build the Flask app serving the mock API under /v1.
+
+    `latency` and `jitter` are in seconds. A `error_rate` share of requests
+    fail with a 500, and above `throttle` requests per second they get a
+    429 with Retry-After. Without `token` any bearer token is accepted.
+    """
+    from flask import Flask, request, jsonify
+
+    app = Flask(__name__)
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    limiter = RateLimiter(throttle) if throttle else None
+
+    def error(status, message):
+        response = jsonify({"message": message, "status": "failed", "data": None})
+        response.status_code = status
+        return response
+
+    @app.before_request
+    def inject_faults():
+        with rng_lock:
+            delay = max(0.0, latency + rng.uniform(-jitter, jitter)) if latency or jitter else 0.0
+            fail = error_rate and rng.random() < error_rate
+        if delay:
+            time.sleep(delay)
+
+        authorization = request.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer ") or (token and authorization != f"Bearer {token}"):
+            return error(401, "Invalid API Key or the business can't accept payments at the moment.")
+        if limiter:
+            wait = limiter.try_acquire()
+            if wait:
+                response = error(429, "Too many requests")
+                response.headers["Retry-After"] = str(max(1, round(wait)))
+                return response
+        if fail:
+            return error(500, "Internal server error")
+
+    def cached(body):
+        # Validators let the CLI's conditional requests (banks cache, events --follow) get a 304
+        response = jsonify(body)
+        response.set_etag(hashlib.md5(response.get_data()).hexdigest())
+        return response.make_conditional(request)
+
+    @app.post("/v1/transaction/initialize")
+    def initialize():
+        data = request.get_json(silent=True) or {}
+        missing = [field for field in ("amount", "currency") if not data.get(field)]
+        if missing:
+            return error(400, {field: [f"The {field} field is required."] for field in missing})
+        try:
+            float(data["amount"])
+        except (TypeError, ValueError):
+            return error(400, {"amount": ["The amount must be a number."]})
+        data.setdefault("tx_ref", f"mock-init-{time.time_ns()}")
+
+        if dataset.create(data) is None:
+            return error(400, "Transaction reference has been used before")
+        if callbacks:
+            callbacks.schedule(data["tx_ref"], data)
+        return jsonify({"message": "Hosted Link", "status": "success",
+                        "data": {"checkout_url": f"{request.host_url}checkout/{data['tx_ref']}"}})
+
+    @app.get("/v1/transaction/verify/<tx_ref>")
+    def verify(tx_ref):
+        transaction = dataset.find(tx_ref)
+        if transaction is None:
+            return error(404, "Invalid transaction or Transaction not found")
+        return jsonify(verify_body(transaction))
+
+    @app.get("/v1/transaction/events/<reference>")
+    def events(reference):
+        transaction = dataset.find(reference)
+        if transaction is None:
+            return error(404, "Invalid transaction or Transaction not found")
+        return cached({"message": "Transaction events fetched", "status": "success",
+                       "data": transaction_events(transaction)})
+
+    @app.get("/v1/banks")
+    def banks():
+        return cached(banks_body())
+
+    @app.get("/v1/transactions")
+    def transactions():
+        page = request.args.get("page", 1, type=int)
+        return jsonify({"message": "Transactions retrieved", "status": "success", "data": dataset.page(page)})
+
+    return app
+
+
+@click.command("mock-server")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Interface to listen on.")
+@click.option("--port", default=8000, show_default=True, help="Port to listen on.")
+@click.option("--workers", type=int, help="Serve on waitress with this many threads (pip install chapa-cli[server]).")
+@click.option("--size", default=1000, show_default=True, help="Number of generated transactions.")
+@click.option("--seed", default=42, show_default=True, help="Seed of the generated data and of injected faults.")
+@click.option("--per-page", default=10, show_default=True, help="Transactions per /transactions page.")
+@click.option("--latency", default=0.0, show_default=True, help="Added latency per request, in milliseconds.")
+@click.option("--jitter", default=0.0, show_default=True, help="Random +/- variation of the latency, in milliseconds.")
+@click.option("--error-rate", default=0.0, show_default=True, help="Share of requests failing with a 500 (0-1).")
+@click.option("--throttle", type=float, help="Requests per second above which requests get a 429.")
+@click.option("--token", help="Only accept this secret key (default: any bearer token).")
+@click.option("--webhook-url", help="Send a signed webhook here when an initialized transaction completes.")
+@click.option("--webhook-secret", envvar="CHAPA_WEBHOOK_SECRET", help="Secret key used to sign webhooks.")
+@click.option("--complete-after", default=1.0, show_default=True,
+              help="Seconds after which initialized transactions succeed and callbacks are sent.")
+def mock_server(host, port, workers, size, seed, per_page, latency, jitter, error_rate, throttle, token,
+                webhook_url, webhook_secret, complete_after):
+    """Serve a mock Chapa API from a seeded, generated dataset."""
+    dataset = MockDataset(size=size, seed=seed, per_page=per_page)
+    callbacks = CallbackSender(dataset, webhook_url=webhook_url, secret=webhook_secret, delay=complete_after)
+    app = create_app(dataset, latency=latency / 1000, jitter=jitter / 1000, error_rate=error_rate,
+                     throttle=throttle, token=token, callbacks=callbacks, seed=seed)
+
+    click.echo(f"Mock Chapa API with {size} transactions; point the CLI at it with:")
+    click.echo(f"  export CHAPA_API_URL=http://{host}:{port}/v1")
+    click.echo("The local transaction index and bank cache are kept apart from the production ones.")
+    serve(app, host, port, workers=workers)
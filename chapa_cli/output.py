@@ -0,0 +1,180 @@
+import os
+import sys
+import click
+import csv
+import json
+
+# Formats of the global --output option
+OUTPUT_FORMATS = ["table", "json", "jsonl", "csv"]
+
+
+def flatten(row, prefix=""):
+    """Flatten nested dicts into dotted keys, e.g. customer.email."""
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+class JSONWriter:
+    """Write rows as one JSON array, emitting each row as soon as it arrives."""
+
+    def __init__(self, stream, fields=None):
+        self.stream = stream
+        self.fields = fields
+        self.count = 0
+
+    def write(self, row):
+        if self.fields:
+            row = {field: row.get(field) for field in self.fields}
+        self.stream.write(("[\n" if not self.count else ",\n") + json.dumps(row, default=str))
+        self.count += 1
+
+    def close(self):
+        self.stream.write("\n]\n" if self.count else "[]\n")
+        self.stream.flush()
+
+
+class JSONLWriter:
+    """Write one JSON document per line."""
+
+    def __init__(self, stream, fields=None):
+        self.stream = stream
+        self.fields = fields
+
+    def write(self, row):
+        if self.fields:
+            row = {field: row.get(field) for field in self.fields}
+        self.stream.write(json.dumps(row, default=str) + "\n")
+
+    def close(self):
+        self.stream.flush()
+
+
+class CSVWriter:
+    """Write flattened rows as CSV, taking the header from `fields` or the first row.
+
+    The header is skipped when appending to a file that already has content.
+    """
+
+    def __init__(self, stream, fields=None):
+        self.stream = stream
+        self.fields = fields
+        self.writer = None
+
+    def write(self, row):
+        row = flatten(row)
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.stream, fieldnames=self.fields or list(row), extrasaction="ignore")
+            if not self._appending():
+                self.writer.writeheader()
+        self.writer.writerow(row)
+
+    def _appending(self):
+        if "a" not in getattr(self.stream, "mode", ""):
+            return False
+        try:
+            return self.stream.tell() > 0
+        except (OSError, ValueError):
+            return False
+
+    def close(self):
+        self.stream.flush()
+
+
+class ParquetWriter:
+    """Write flattened rows to a Parquet file in row groups of `batch_size` rows.
+
+    Only one row group is held in memory at a time. Requires pyarrow.
+    """
+
+    def __init__(self, stream, fields=None, batch_size=10000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise click.ClickException("Parquet output requires pyarrow: pip install chapa-cli[parquet]")
+
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.stream = stream
+        self.fields = fields
+        self.batch_size = batch_size
+        self.batch = []
+        self.writer = None
+
+    def write(self, row):
+        row = flatten(row)
+        if self.fields:
+            row = {field: row.get(field) for field in self.fields}
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        if self.writer is None:
+            table = self.pa.Table.from_pylist(self.batch)
+            self.writer = self.pq.ParquetWriter(self.stream, table.schema)
+        else:
+            table = self.pa.Table.from_pylist(self.batch, schema=self.writer.schema)
+        self.writer.write_table(table)
+        self.batch = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {
+    "json": JSONWriter,
+    "jsonl": JSONLWriter,
+    "csv": CSVWriter,
+    "parquet": ParquetWriter,
+}
+
+# Formats written to a binary stream
+BINARY_FORMATS = {"parquet"}
+
+
+def open_output(path, fmt):
+    """Open `path` (or stdout for "-") in the mode the format needs."""
+    mode = "wb" if fmt in BINARY_FORMATS else "w"
+    return click.open_file(path, mode)
+
+
+def get_writer(fmt, stream, fields=None):
+    """Return a streaming row writer for the given format."""
+    return WRITERS[fmt](stream, fields=fields)
+
+
+def get_output_format():
+    """Return the format chosen with the global --output option (default "table")."""
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None:
+        obj = ctx.find_root().obj
+        if isinstance(obj, dict) and obj.get("output"):
+            return obj["output"]
+    return os.getenv("CHAPA_OUTPUT") or "table"
+
+
+def write_records(records, fmt, fields=None):
+    """Stream records to stdout in a machine readable format, without rich."""
+    writer = get_writer(fmt, sys.stdout, fields=fields)
+    for record in records:
+        writer.write(record)
+    writer.close()
+
+
+def write_record(record, fmt):
+    """Write a single record to stdout, as a JSON object for the json format."""
+    if fmt == "json":
+        sys.stdout.write(json.dumps(record, default=str) + "\n")
+        sys.stdout.flush()
+    else:
+        write_records([record], fmt)
@@ -0,0 +1,160 @@
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Phases are timed only while profiling is enabled; otherwise phase() is a
+# shared no-op so the hook points cost a function call and a branch.
+_enabled = False
+_lock = threading.Lock()
+_phases = {}
+# Set by enable(), so a long running process (the daemon) times each command on its own
+_started = None
+_profiler = None
+_restore = []
+
+
+class _NoPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_no_phase = _NoPhase()
+
+
+def is_enabled():
+    return _enabled
+
+
+def record(name, seconds):
+    """Add one timed call of `name` to the breakdown."""
+    with _lock:
+        entry = _phases.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+@contextmanager
+def _timed(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def phase(name):
+    """Context manager timing the enclosed block as `name` when profiling is on."""
+    return _timed(name) if _enabled else _no_phase
+
+
+def _wrap(owner, attribute, name):
+    """Time every call of owner.attribute as `name` until disable()."""
+    original = getattr(owner, attribute)
+
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - started)
+
+    setattr(owner, attribute, timed)
+    _restore.append((owner, attribute, original))
+
+
+def enable(cprofile=False, started=None):
+    """Start collecting phase timings, and a cProfile profile if asked to.
+
+    The total counts from `started` (a perf_counter() value, default now)
+    and any timings left from an earlier command are dropped. DNS
+    lookups, TLS handshakes and JSON decoding happen inside socket, ssl
+    and requests, so their entry points are wrapped for the duration
+    instead of being instrumented at every call site.
+    """
+    global _enabled, _started, _profiler
+    _profiler = None
+    _started = time.perf_counter() if started is None else started
+    with _lock:
+        _phases.clear()
+
+    started = time.perf_counter()
+    import ssl
+    import socket
+    import requests
+    record("imports", time.perf_counter() - started)
+
+    _wrap(socket, "getaddrinfo", "dns")
+    _wrap(ssl.SSLContext, "wrap_socket", "tls")
+    _wrap(requests.models.Response, "json", "json_decode")
+
+    if cprofile:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    _enabled = True
+
+
+def disable():
+    """Stop profiling and return the breakdown (see report())."""
+    global _enabled, _started
+    summary = report()
+    _enabled = False
+    _started = None
+    with _lock:
+        _phases.clear()
+    while _restore:
+        owner, attribute, original = _restore.pop()
+        setattr(owner, attribute, original)
+    if _profiler is not None:
+        _profiler.disable()
+    return summary
+
+
+def report():
+    """Return {"total_ms": ..., "phases": {name: {"calls", "total_ms"}}}.
+
+    Phases nest (a request includes its DNS lookup and TLS handshake) and
+    run concurrently in bulk commands, so they need not add up to the total.
+    """
+    total = time.perf_counter() - _started if _started is not None else 0.0
+    with _lock:
+        phases = {
+            name: {"calls": calls, "total_ms": round(seconds * 1000, 3)}
+            for name, (calls, seconds) in sorted(_phases.items(), key=lambda item: -item[1][1])
+        }
+    return {"total_ms": round(total * 1000, 3), "phases": phases}
+
+
+def dump_cprofile(path):
+    """Write the collected cProfile stats to `path`, for pstats or snakeviz."""
+    if _profiler is not None:
+        _profiler.dump_stats(path)
+
+
+def print_report(summary, stream=None):
+    """Print the per-phase breakdown as an aligned table (to stderr by default)."""
+    stream = stream or sys.stderr
+    total = summary["total_ms"]
+    stream.write(f"\nProfile: {total:.1f} ms total\n")
+    stream.write(f"  {'phase':<14}{'calls':>7}{'ms':>11}{'%':>7}\n")
+    for name, entry in summary["phases"].items():
+        share = entry["total_ms"] / total * 100 if total else 0.0
+        stream.write(f"  {name:<14}{entry['calls']:>7}{entry['total_ms']:>11.1f}{share:>7.1f}\n")
+
+
+def finish(json_path=None, cprofile_path=None):
+    """Stop profiling and print the breakdown, or write it to `json_path`."""
+    summary = disable()
+    if cprofile_path:
+        dump_cprofile(cprofile_path)
+    if json_path:
+        with open(json_path, "w") as report_file:
+            json.dump(summary, report_file, indent=2)
+    else:
+        print_report(summary)
+    return summary
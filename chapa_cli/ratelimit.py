@@ -0,0 +1,183 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread safe token bucket allowing `rate` calls per second."""
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate or 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a call if one is allowed now; otherwise return the seconds until one is."""
+        if not self.rate:
+            return 0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a call is allowed."""
+        import asyncio
+
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on the number of calls in flight.
+
+    Every successful call raises the limit by 1/limit, so by about one per
+    round of calls, up to `maximum`. A throttled call (429) multiplies it
+    by `backoff`, at most once per `cooldown` seconds since a burst of
+    concurrent calls is usually throttled together, and a Retry-After
+    pauses all new calls for that long.
+    """
+
+    def __init__(self, initial=8, minimum=1, maximum=64, backoff=0.5, cooldown=1.0):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.succeeded = 0
+        self.throttled = 0
+        self.condition = threading.Condition()
+        # Futures of coroutines waiting in acquire_async, woken by release
+        self.waiters = []
+
+    def acquire(self):
+        """Block until a call may start."""
+        with self.condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    self.condition.wait(pause)
+                elif self.in_flight < int(self.limit):
+                    break
+                else:
+                    self.condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a call may start."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = loop.create_future()
+            with self.condition:
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                if pause <= 0:
+                    self.waiters.append((loop, waiter))
+            if pause > 0:
+                await asyncio.sleep(pause)
+            else:
+                await waiter
+
+    def release(self, throttled=None, retry_after=None):
+        """End a call: throttled is True for a 429, False for a success, None to leave the limit alone."""
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.throttled += 1
+                if now - self.last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self.last_decrease = now
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            elif throttled is not None:
+                self.succeeded += 1
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+            waiters, self.waiters = self.waiters, []
+        for loop, waiter in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ApiLimiter:
+    """A token bucket and an adaptive concurrency limit shared by the API calls of one account."""
+
+    def __init__(self, rate=None, burst=None, concurrency=8, max_concurrency=64):
+        self.rate = RateLimiter(rate, burst)
+        self.concurrency = AdaptiveConcurrency(initial=concurrency, maximum=max_concurrency)
+
+    def acquire(self):
+        self.concurrency.acquire()
+        self.rate.acquire()
+
+    async def acquire_async(self):
+        await self.concurrency.acquire_async()
+        await self.rate.acquire_async()
+
+    def release(self, throttled=None, retry_after=None):
+        self.concurrency.release(throttled, retry_after)
+
+    def stats(self):
+        return {"limit": round(self.concurrency.limit, 2), "in_flight": self.concurrency.in_flight,
+                "succeeded": self.concurrency.succeeded, "throttled": self.concurrency.throttled}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def shared_limiter(key, rate=None, burst=None, concurrency=8, max_concurrency=64):
+    """Return the process wide ApiLimiter for `key` (an account), rebuilt when its limits change."""
+    config = (rate, burst, concurrency, max_concurrency)
+    with _limiters_lock:
+        entry = _limiters.get(key)
+        if entry is None or entry[0] != config:
+            entry = _limiters[key] = (config, ApiLimiter(*config))
+        return entry[1]
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (seconds or an HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    from datetime import datetime, timezone
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,214 @@
+import json
+import hmac
+import queue
+import hashlib
+import threading
+import time
+import click
+
+
+# Headers kept with each event so it can be replayed with its signature
+SIGNATURE_HEADERS = ["x-chapa-signature", "Chapa-Signature"]
+
+
+def compute_signature(secret_key, payload):
+    """Return the hex HMAC-SHA256 of `payload` signed with `secret_key`."""
+    if isinstance(payload, str):
+        payload = payload.encode()
+    return hmac.new(secret_key.encode(), payload, hashlib.sha256).hexdigest()
+
+
+def signature_headers(secret_key, body):
+    """Return the headers Chapa signs a webhook request with."""
+    return {
+        "Chapa-Signature": compute_signature(secret_key, secret_key),
+        "x-chapa-signature": compute_signature(secret_key, body),
+    }
+
+
+def verify_signature(secret_key, body, headers):
+    """Check a webhook request against Chapa's body signature in constant time.
+
+    Only `x-chapa-signature`, the HMAC of the raw body, is accepted.
+    `Chapa-Signature` is the HMAC of the secret key itself, the same for
+    every delivery, so it would let anyone replay it with another body.
+    """
+    signature = headers.get("x-chapa-signature")
+    return bool(signature) and hmac.compare_digest(signature, compute_signature(secret_key, body))
+
+
+class EventQueue:
+    """Bounded in-memory queue drained by a background writer thread.
+
+    Handlers only enqueue, so their latency does not depend on how fast
+    events are written out. When the queue is full `put` returns False
+    and the caller should ask Chapa to retry later. `idle` is called
+    from the writer thread whenever no event arrived for `idle_interval`
+    seconds, e.g. to fsync what the handler buffered.
+
+    A batch the handler fails on (a full disk, a closed stdout) is retried
+    every `idle_interval` seconds; meanwhile `put` returns False as well,
+    so Chapa keeps the new events and delivers them again later.
+    """
+
+    def __init__(self, handler, maxsize=10000, batch_size=256, idle=None, idle_interval=1.0):
+        self.handler = handler
+        self.idle = idle
+        self.idle_interval = idle_interval
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.received = 0
+        self.dropped = 0
+        self.failed = 0
+        self.healthy = True
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def put(self, event):
+        if not self.healthy:
+            self.dropped += 1
+            return False
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.received += 1
+        return True
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="chapa-webhook-writer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Write out every queued event and stop the writer, waiting at most `timeout` seconds."""
+        if self.thread is not None:
+            self.stopping.set()
+            try:
+                # Wakes the writer up at once, it also notices `stopping` on its own
+                self.queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.idle_interval)]
+            except queue.Empty:
+                if self.stopping.is_set():
+                    return
+                if self.idle:
+                    self.idle()
+                continue
+            # Grab whatever else is already waiting so it is written in one go
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batch = [event for event in batch if event is not None]
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        while True:
+            try:
+                self.handler(batch)
+            except Exception as e:
+                if self.healthy:
+                    self.healthy = False
+                    click.echo(click.style(f"Failed to write {len(batch)} webhook events, answering 503 until "
+                                           f"it works again: {e}", fg="red"), err=True)
+                # Give up on the batch only when shutting down
+                if self.stopping.wait(self.idle_interval):
+                    self.failed += len(batch)
+                    return
+                continue
+            if not self.healthy:
+                self.healthy = True
+                click.echo(click.style("Writing webhook events again.", fg="green"), err=True)
+            return
+
+
+def echo_events(events):
+    """Write a batch of received events to stdout with a single write."""
+    stdout = click.get_text_stream("stdout")
+    lines = [click.style(f"Webhook received: {json.dumps(event['payload'])}", fg="green") for event in events]
+    stdout.write("\n".join(lines) + "\n")
+    stdout.flush()
+
+
+def log_events(log, events):
+    """Append a batch of received events to the event log, without the parsed payload."""
+    log.append([{key: value for key, value in event.items() if key != "payload"} for event in events])
+
+
+def add_receiver(app, path, events, secret_key=None, dedup=None):
+    """Register the webhook endpoint on `app`, feeding accepted events to `events`.
+
+    With a `dedup` (chapa_cli.dedup.Deduplicator), redelivered events are
+    acknowledged with a 200 without being queued again. A GET on the same
+    path returns the receiver's counters.
+    """
+    from flask import request, jsonify
+    from chapa_cli.dedup import event_key
+
+    def chapa_webhook():
+        body = request.get_data()
+        if secret_key and not verify_signature(secret_key, body, request.headers):
+            return "Invalid signature", 401
+
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            return "Invalid JSON", 400
+
+        key = event_key(payload) if dedup is not None else None
+        if key is not None and dedup.check_and_add(key):
+            return "", 200
+
+        event = {
+            "received_at": time.time(),
+            "path": request.path,
+            "headers": {name: request.headers[name] for name in SIGNATURE_HEADERS if name in request.headers},
+            "body": body.decode("utf-8", "replace"),
+            "payload": payload,
+        }
+        if not events.put(event):
+            # Not processed, so the retry Chapa sends must not count as a duplicate
+            if key is not None:
+                dedup.discard(key)
+            return "Busy", 503
+        return "", 200
+
+    def chapa_webhook_stats():
+        stats = {"received": events.received, "dropped": events.dropped, "failed": events.failed}
+        if dedup is not None:
+            stats.update(dedup.stats())
+        return jsonify(stats)
+
+    app.add_url_rule(path, "chapa_webhook", chapa_webhook, methods=["POST"])
+    app.add_url_rule(path, "chapa_webhook_stats", chapa_webhook_stats, methods=["GET"])
+
+
+def serve(app, host, port, workers=None):
+    """Serve `app` on waitress with `workers` threads, or on Flask's server without workers."""
+    if not workers:
+        app.run(host=host, port=port)
+        return
+
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        click.echo(click.style("waitress is not installed (pip install chapa-cli[server]), "
+                               "falling back to Flask's threaded server.", fg="yellow"))
+        app.run(host=host, port=port, threaded=True)
+        return
+
+    click.echo(f"Serving on http://{host}:{port} with {workers} workers")
+    waitress_serve(app, host=host, port=port, threads=workers, backlog=2048, connection_limit=max(100, workers * 16))
@@ -0,0 +1,203 @@
+import os
+import json
+import zlib
+import tempfile
+from decimal import Decimal, InvalidOperation
+from concurrent.futures import ProcessPoolExecutor
+
+# Fields written for every discrepancy found by `transaction reconcile`
+RECONCILE_FIELDS = ["kind", "key", "fields", "ledger_amount", "chapa_amount", "ledger_currency",
+                    "chapa_currency", "ledger_status", "chapa_status"]
+
+# Ledger columns read for each field, unless mapped to other names
+LEDGER_COLUMNS = {"amount": "amount", "currency": "currency", "status": "status"}
+
+
+def parse_amount(value):
+    """Return an amount as a Decimal, or None if it is empty or not a number."""
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value).replace(",", ""))
+    except InvalidOperation:
+        return None
+
+
+def normalize(value):
+    return str(value).strip().lower() if value not in (None, "") else None
+
+
+class Partitioner:
+    """Spills records into `partitions` files on disk by the hash of their key.
+
+    Records with the same key always land in the same partition, so the
+    partitions of the ledger and of Chapa can be compared pairwise, each
+    pair fitting in memory.
+    """
+
+    def __init__(self, directory, name, partitions):
+        self.paths = [os.path.join(directory, f"{name}-{i}.jsonl") for i in range(partitions)]
+        self.files = [open(path, "w") for path in self.paths]
+        self.count = 0
+
+    def add(self, record):
+        # crc32 rather than hash(), which differs between processes
+        index = zlib.crc32(record[0].encode("utf-8")) % len(self.files)
+        self.files[index].write(json.dumps(record) + "\n")
+        self.count += 1
+
+    def close(self):
+        for partition in self.files:
+            partition.close()
+
+
+def _read(path):
+    with open(path, "r") as partition:
+        for line in partition:
+            yield json.loads(line)
+
+
+def _add_total(totals, currency, field, amount):
+    entry = totals.setdefault(currency or "", {"ledger_amount": Decimal(0), "count": 0,
+                                               "amount": Decimal(0), "charge": Decimal(0)})
+    entry[field] += amount
+
+
+def compare_partition(ledger_path, chapa_path, result_path):
+    """Compare one pair of partitions, writing discrepancies to `result_path`.
+
+    The ledger partition is loaded into a dict keyed by reference, then
+    the Chapa partition is streamed against it. Returns the counts and the
+    per currency totals of the partition.
+    """
+    counts = {"matched": 0, "missing": 0, "extra": 0, "mismatched": 0, "duplicate": 0}
+    totals = {}
+
+    with open(result_path, "w") as results:
+        def report(kind, key, fields=None, ledger=(None, None, None), chapa=(None, None, None)):
+            counts[kind] += 1
+            results.write(json.dumps({
+                "kind": kind, "key": key, "fields": fields,
+                "ledger_amount": ledger[0], "chapa_amount": chapa[0],
+                "ledger_currency": ledger[1], "chapa_currency": chapa[1],
+                "ledger_status": ledger[2], "chapa_status": chapa[2],
+            }) + "\n")
+
+        ledger = {}
+        for key, amount, currency, status in _read(ledger_path):
+            if key in ledger:
+                report("duplicate", key, ledger=(amount, currency, status))
+                continue
+            ledger[key] = (amount, currency, status)
+            if amount is not None:
+                _add_total(totals, currency, "ledger_amount", parse_amount(amount) or 0)
+
+        # The listing can repeat a transaction when new ones shift the pages
+        seen = set()
+        for key, amount, currency, status, charge in _read(chapa_path):
+            if key in seen:
+                continue
+            seen.add(key)
+            if normalize(status) == "success":
+                _add_total(totals, currency, "count", 1)
+                _add_total(totals, currency, "amount", parse_amount(amount) or 0)
+                _add_total(totals, currency, "charge", parse_amount(charge) or 0)
+
+            expected = ledger.pop(key, None)
+            if expected is None:
+                report("extra", key, chapa=(amount, currency, status))
+                continue
+
+            # Fields missing from the ledger are not compared
+            differing = []
+            if expected[0] is not None and parse_amount(expected[0]) != parse_amount(amount):
+                differing.append("amount")
+            if expected[1] is not None and normalize(expected[1]) != normalize(currency):
+                differing.append("currency")
+            if expected[2] is not None and normalize(expected[2]) != normalize(status):
+                differing.append("status")
+            if differing:
+                report("mismatched", key, ",".join(differing), expected, (amount, currency, status))
+            else:
+                counts["matched"] += 1
+
+        for key, expected in ledger.items():
+            report("missing", key, ledger=expected)
+
+    return counts, totals
+
+
+def reconcile(ledger_rows, transactions, write, key="ref_id", columns=None, partitions=32, workers=None,
+              tmpdir=None):
+    """Diff ledger rows against Chapa transactions, calling `write` for every discrepancy.
+
+    Both sides are streamed once into hash partitions in a temporary
+    directory, so memory use is bounded by the largest partition rather
+    than the size of the ledger. The partitions are compared on `workers`
+    processes (default: one per CPU).
+
+    Discrepancies are "missing" (in the ledger, not at Chapa), "extra" (at
+    Chapa, not in the ledger), "mismatched" (amount, currency or status
+    differ) and "duplicate" (a reference repeated in the ledger). Rows of
+    either side without `key` are counted as skipped, not compared. Returns
+    a summary with the counts, and the ledger amount and the count, amount
+    and charge of successful Chapa transactions per currency.
+    """
+    columns = dict(LEDGER_COLUMNS, **(columns or {}))
+    key_column = columns.get("key", key)
+    workers = workers or os.cpu_count() or 1
+    skipped = chapa_skipped = 0
+
+    with tempfile.TemporaryDirectory(prefix="chapa-reconcile-", dir=tmpdir) as directory:
+        ledger = Partitioner(directory, "ledger", partitions)
+        chapa = Partitioner(directory, "chapa", partitions)
+        try:
+            for row in ledger_rows:
+                reference = row.get(key_column)
+                if not reference:
+                    skipped += 1
+                    continue
+                ledger.add([str(reference)] + [row.get(columns[field]) for field in ("amount", "currency", "status")])
+
+            for transaction in transactions:
+                # Never fall back to the other key, the two never match
+                reference = transaction.get(key)
+                if not reference:
+                    chapa_skipped += 1
+                    continue
+                chapa.add([str(reference), transaction.get("amount"), transaction.get("currency"),
+                           transaction.get("status"), transaction.get("charge")])
+        finally:
+            ledger.close()
+            chapa.close()
+
+        result_paths = [os.path.join(directory, f"result-{i}.jsonl") for i in range(partitions)]
+        summary = {"ledger_rows": ledger.count + skipped, "chapa_transactions": chapa.count + chapa_skipped,
+                   "skipped": skipped, "chapa_skipped": chapa_skipped,
+                   "matched": 0, "missing": 0, "extra": 0, "mismatched": 0, "duplicate": 0}
+        totals = {}
+
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=min(workers, partitions))
+            results = executor.map(compare_partition, ledger.paths, chapa.paths, result_paths)
+        else:
+            executor = None
+            results = map(compare_partition, ledger.paths, chapa.paths, result_paths)
+        try:
+            for result_path, (counts, partition_totals) in zip(result_paths, results):
+                for name, count in counts.items():
+                    summary[name] += count
+                for currency, entry in partition_totals.items():
+                    for field, value in entry.items():
+                        _add_total(totals, currency, field, value)
+                for record in _read(result_path):
+                    write(record)
+        finally:
+            if executor:
+                executor.shutdown()
+
+    summary["totals"] = {
+        currency: {field: value if field == "count" else str(value) for field, value in entry.items()}
+        for currency, entry in sorted(totals.items())
+    }
+    return summary
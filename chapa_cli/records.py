@@ -0,0 +1,208 @@
+import sys
+import json
+import codecs
+
+_decoder = json.JSONDecoder()
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
+
+
+# Marks a field the API did not send, so to_dict() leaves it out again
+MISSING = _Missing()
+
+
+class Record:
+    """Base of the compact records of API objects.
+
+    Fields live in __slots__ instead of a per row dict, values repeated
+    across rows (statuses, currencies, ...) are interned, and nested
+    objects become records too. Fields the API adds later are kept in
+    `extra`. Records can be read like the decoded dicts (`get`, `[]`), so
+    they stand in for them in code that only reads rows.
+    """
+
+    __slots__ = ("extra",)
+    FIELDS = ()
+    # Fields with few distinct values, interned so rows share one string
+    INTERNED = ()
+    # Fields holding a nested object, and its record class
+    NESTED = {}
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, values.pop(field, MISSING))
+        self.extra = values or None
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls.__new__(cls)
+        for field in cls.FIELDS:
+            value = data.get(field, MISSING)
+            if field in cls.INTERNED and type(value) is str:
+                value = sys.intern(value)
+            elif field in cls.NESTED and isinstance(value, dict):
+                value = cls.NESTED[field].from_dict(value)
+            setattr(record, field, value)
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        record.extra = extra or None
+        return record
+
+    def to_dict(self):
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is MISSING:
+                continue
+            data[field] = value.to_dict() if isinstance(value, Record) else value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Customer(Record):
+    __slots__ = FIELDS = ("id", "email", "first_name", "last_name", "mobile")
+
+
+class Transaction(Record):
+    __slots__ = FIELDS = ("status", "ref_id", "tx_ref", "type", "created_at", "updated_at", "currency", "amount",
+                          "charge", "trans_id", "payment_method", "customer")
+    INTERNED = ("status", "type", "currency", "payment_method")
+    NESTED = {"customer": Customer}
+
+
+class Event(Record):
+    __slots__ = FIELDS = ("item", "message", "type", "created_at", "updated_at")
+    INTERNED = ("type",)
+
+
+class Bank(Record):
+    __slots__ = FIELDS = ("id", "slug", "swift", "name", "acct_length", "country_id", "is_mobilemoney", "is_active",
+                          "is_rtgs", "active", "is_24hrs", "created_at", "updated_at", "currency")
+    INTERNED = ("currency",)
+
+
+class _Reader:
+    """Reads JSON values one at a time from a document arriving in chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decode = codecs.getincrementaldecoder("utf-8")().decode
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            raise ValueError("Unexpected end of JSON document")
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            chunk = self.decode(b"", final=True)
+        elif isinstance(chunk, bytes):
+            chunk = self.decode(chunk)
+        # Drop what has been consumed, the buffer only holds the current value
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Return the next non whitespace character, without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            self._fill()
+
+    def take(self, expected):
+        char = self.peek()
+        if char not in expected:
+            raise ValueError(f"Expected {expected!r} in JSON document, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # A number ending the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+
+def _walk(reader, path, rest):
+    reader.take("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        key = reader.value()
+        reader.take(":")
+        if key == path[0] and len(path) > 1 and reader.peek() == "{":
+            yield from _walk(reader, path[1:], rest)
+        elif key == path[0] and len(path) == 1 and reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.take(",]") == "]":
+                        break
+        else:
+            rest[key] = reader.value()
+        if reader.take(",}") == "}":
+            return
+
+
+def iter_json_array(chunks, path, rest=None):
+    """Yield the items of the array at `path` of a JSON document read from `chunks`.
+
+    `path` names the keys leading to the array, e.g. ("data",
+    "transactions") for a transactions page. Items are decoded one at a
+    time, so the whole document is never held in memory. The other
+    members of the objects along the path (such as "pagination") are
+    decoded whole into `rest`, keyed by name.
+    """
+    rest = rest if rest is not None else {}
+    return _walk(_Reader(chunks), list(path), rest)
+
+
+def decode_records(cls, chunks, path, rest=None):
+    """Stream the array at `path` of a JSON document into records of `cls`."""
+    for item in iter_json_array(chunks, path, rest):
+        yield cls.from_dict(item)
@@ -0,0 +1,330 @@
+import array
+from bisect import bisect_left
+from chapa_cli.utils import parse_datetime
+
+# Dimensions transactions are grouped by
+DIMENSIONS = ["currency", "payment_method", "day"]
+
+# Fields of each group, in the order of the aggregate lists
+GROUP_FIELDS = ["count", "successful", "amount", "charge"]
+
+# Upper bounds of the settle latency buckets (created_at to updated_at of
+# successful transactions), in seconds
+LATENCY_BUCKETS = [1, 5, 15, 60, 300, 900, 3600, 21600, 86400]
+
+# Fields written per group for the jsonl and csv formats
+STATS_FIELDS = ["dimension", "key", "count", "successful", "success_rate", "amount", "charge"]
+
+_numpy = False
+
+
+def get_numpy():
+    """Return numpy if it is installed, else None. Imported on first use, it is slow to import."""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def transaction_row(transaction):
+    """The fields of an API transaction used by the stats, in the order Columns takes them."""
+    return (transaction.get("status"), transaction.get("created_at"), transaction.get("updated_at"),
+            transaction.get("currency"), transaction.get("amount"), transaction.get("charge"),
+            transaction.get("payment_method"))
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _latency(created_at, updated_at):
+    try:
+        return (parse_datetime(updated_at) - parse_datetime(created_at)).total_seconds()
+    except (AttributeError, ValueError):
+        return -1.0
+
+
+def _strings(numpy, values):
+    """Return `values` as a numpy string array, None as ""."""
+    return numpy.array([value or "" for value in values], dtype=str)
+
+
+def _floats(numpy, values):
+    try:
+        floats = numpy.array(values, dtype=float)
+    except ValueError:
+        return numpy.fromiter(map(_float, values), dtype=float, count=len(values))
+    # None became NaN
+    return numpy.nan_to_num(floats, nan=0.0)
+
+
+def _latencies(numpy, created, updated):
+    # datetime64 has no time zones: only UTC ("Z") timestamps are parsed in bulk
+    if numpy.char.endswith(created, "Z").all() and numpy.char.endswith(updated, "Z").all():
+        try:
+            seconds = ((numpy.char.rstrip(updated, "Z").astype("datetime64[us]")
+                        - numpy.char.rstrip(created, "Z").astype("datetime64[us]")) / numpy.timedelta64(1, "s"))
+            return numpy.nan_to_num(seconds, nan=-1.0)
+        except ValueError:
+            pass
+    return numpy.fromiter(map(_latency, created.tolist(), updated.tolist()), dtype=float, count=len(created))
+
+
+def _array(typecode, values):
+    column = array.array(typecode)
+    column.frombytes(values.astype(typecode).tobytes())
+    return column
+
+
+class Columns:
+    """A batch of transactions as typed arrays, one per field.
+
+    With numpy each field is converted for the whole batch at once
+    (status compares, float and datetime64 parsing); otherwise row by
+    row. `from_typed` takes rows converted already, as the SQL of
+    TransactionStore.stats_rows does for the local index.
+    """
+
+    def __init__(self, rows):
+        numpy = get_numpy()
+        if numpy is not None and rows:
+            self._convert(numpy, rows)
+            return
+
+        self.success = array.array("b")
+        self.amount = array.array("d")
+        self.charge = array.array("d")
+        self.latency = array.array("d")
+        self.keys = {dimension: [] for dimension in DIMENSIONS}
+        for status, created_at, updated_at, currency, amount, charge, payment_method in rows:
+            success = (status or "").lower() == "success"
+            self.success.append(success)
+            # Amounts and charges only count for successful transactions
+            self.amount.append(_float(amount) if success else 0.0)
+            self.charge.append(_float(charge) if success else 0.0)
+            self.latency.append(_latency(created_at, updated_at) if success else -1.0)
+            self.keys["currency"].append(currency or "")
+            self.keys["payment_method"].append(payment_method or "")
+            self.keys["day"].append((created_at or "")[:10])
+
+    def _convert(self, numpy, rows):
+        status, created_at, updated_at, currency, amount, charge, payment_method = zip(*rows)
+        # Few distinct statuses, each is compared once
+        flags = {value: (value or "").lower() == "success" for value in set(status)}
+        success = numpy.fromiter(map(flags.__getitem__, status), dtype=bool, count=len(status))
+        created_at, updated_at = _strings(numpy, created_at), _strings(numpy, updated_at)
+        # Amounts and charges only count for successful transactions
+        self.success = _array("b", success)
+        self.amount = _array("d", numpy.where(success, _floats(numpy, amount), 0.0))
+        self.charge = _array("d", numpy.where(success, _floats(numpy, charge), 0.0))
+        self.latency = _array("d", numpy.where(success, _latencies(numpy, created_at, updated_at), -1.0))
+        self.keys = {"currency": [value or "" for value in currency],
+                     "payment_method": [value or "" for value in payment_method],
+                     "day": created_at.astype("U10")}
+
+    @classmethod
+    def from_typed(cls, rows):
+        """Build the columns from (success, amount, charge, latency, currency, payment_method, day) rows."""
+        columns = cls.__new__(cls)
+        success, amount, charge, latency, currency, payment_method, day = zip(*rows) if rows else [()] * 7
+        columns.success = array.array("b", success)
+        columns.amount = array.array("d", amount)
+        columns.charge = array.array("d", charge)
+        columns.latency = array.array("d", latency)
+        columns.keys = {"currency": list(currency), "payment_method": list(payment_method), "day": list(day)}
+        return columns
+
+    def __len__(self):
+        return len(self.success)
+
+
+def group_sums(keys, weights):
+    """Return {key: [count, sum of each weight column]} over the rows of `keys`.
+
+    With numpy the keys are encoded with unique() and summed with
+    bincount(); otherwise the same is done in a plain loop.
+    """
+    numpy = get_numpy()
+    if numpy is not None:
+        unique, codes = numpy.unique(numpy.array(keys), return_inverse=True)
+        sums = [numpy.bincount(codes, minlength=len(unique))]
+        sums += [numpy.bincount(codes, weights=numpy.frombuffer(column, dtype=column.typecode),
+                                minlength=len(unique)) for column in weights]
+        return {key: [sum_[code].item() for sum_ in sums] for code, key in enumerate(unique.tolist())}
+
+    groups = {}
+    for i, key in enumerate(keys):
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [0] * (len(weights) + 1)
+        group[0] += 1
+        for j, column in enumerate(weights, 1):
+            group[j] += column[i]
+    return groups
+
+
+def latency_histogram(latency):
+    """Return (count, sum, max, bucket counts) of the non negative latencies."""
+    numpy = get_numpy()
+    if numpy is not None:
+        values = numpy.frombuffer(latency, dtype="d")
+        values = values[values >= 0]
+        buckets = numpy.bincount(numpy.searchsorted(LATENCY_BUCKETS, values), minlength=len(LATENCY_BUCKETS) + 1)
+        return (len(values), values.sum().item(), values.max().item() if len(values) else 0.0,
+                buckets.tolist())
+
+    count, total, maximum = 0, 0.0, 0.0
+    buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+    for value in latency:
+        if value < 0:
+            continue
+        count += 1
+        total += value
+        maximum = max(maximum, value)
+        buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+    return count, total, maximum, buckets
+
+
+class Aggregates:
+    """Running totals of transactions per currency, payment method and day.
+
+    Batches are folded in with `add`; the totals are plain JSON so they
+    can be stored and extended by later runs, see `TransactionStore.stats_rows`.
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.groups = {dimension: state.get("groups", {}).get(dimension, {}) for dimension in DIMENSIONS}
+        self.latency = state.get("latency") or {"count": 0, "sum": 0.0, "max": 0.0,
+                                                "buckets": [0] * (len(LATENCY_BUCKETS) + 1)}
+
+    def state(self):
+        return {"groups": self.groups, "latency": self.latency}
+
+    def _fold(self, dimension, key, values):
+        group = self.groups[dimension].setdefault(key, [0] * len(GROUP_FIELDS))
+        for i, value in enumerate(values):
+            group[i] += value
+
+    def add(self, rows):
+        """Fold a batch of (status, created_at, updated_at, currency, amount, charge, payment_method) rows."""
+        self.add_columns(Columns(rows))
+
+    def add_columns(self, columns):
+        """Fold a batch of Columns."""
+        if not len(columns):
+            return
+        for dimension in DIMENSIONS:
+            sums = group_sums(columns.keys[dimension], [columns.success, columns.amount, columns.charge])
+            for key, values in sums.items():
+                self._fold(dimension, key, values)
+
+        count, total, maximum, buckets = latency_histogram(columns.latency)
+        self.latency["count"] += count
+        self.latency["sum"] += total
+        self.latency["max"] = max(self.latency["max"], maximum)
+        self.latency["buckets"] = [a + b for a, b in zip(self.latency["buckets"], buckets)]
+
+    def merge(self, other):
+        for dimension in DIMENSIONS:
+            for key, values in other.groups[dimension].items():
+                self._fold(dimension, key, values)
+        for name in ("count", "sum"):
+            self.latency[name] += other.latency[name]
+        self.latency["max"] = max(self.latency["max"], other.latency["max"])
+        self.latency["buckets"] = [a + b for a, b in zip(self.latency["buckets"], other.latency["buckets"])]
+
+    def rows(self):
+        """Yield one flat row per group, the overall totals first."""
+        def row(dimension, key, values):
+            count, successful, amount, charge = values
+            return {"dimension": dimension, "key": key, "count": int(count), "successful": int(successful),
+                    "success_rate": round(successful / count, 4) if count else None,
+                    "amount": round(amount, 2) if amount is not None else None,
+                    "charge": round(charge, 2) if charge is not None else None}
+
+        # Every transaction has exactly one currency, so its groups add up to
+        # the total. Amounts in different currencies are not added up.
+        total = [sum(values[i] for values in self.groups["currency"].values()) for i in range(len(GROUP_FIELDS))]
+        if len(self.groups["currency"]) > 1:
+            total[2] = total[3] = None
+        yield row("total", None, total)
+        for dimension in DIMENSIONS:
+            for key in sorted(self.groups[dimension]):
+                yield row(dimension, key, self.groups[dimension][key])
+
+    def latency_percentile(self, pct):
+        """Upper bound, in seconds, of the bucket holding the `pct` percentile (None above the last one)."""
+        target = self.latency["count"] * pct / 100
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + [None], self.latency["buckets"]):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return None
+
+    def report(self):
+        rows = list(self.rows())
+        count = self.latency["count"]
+        return {
+            "total": rows[0],
+            "groups": rows[1:],
+            "latency": {
+                "count": count,
+                "mean": round(self.latency["sum"] / count, 3) if count else None,
+                "max": self.latency["max"] if count else None,
+                "p50_at_most": self.latency_percentile(50),
+                "p95_at_most": self.latency_percentile(95),
+                "buckets": dict(zip([f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"],
+                                    self.latency["buckets"])),
+            },
+        }
+
+
+def stream_stats(transactions, batch_size=10000):
+    """Aggregate an iterable of API transactions, `batch_size` at a time."""
+    aggregates = Aggregates()
+    batch = []
+    for transaction in transactions:
+        batch.append(transaction_row(transaction))
+        if len(batch) >= batch_size:
+            aggregates.add(batch)
+            batch = []
+    aggregates.add(batch)
+    return aggregates
+
+
+def local_stats(store, rebuild=False):
+    """Aggregate the local index, only reading transactions stored since the last run.
+
+    Finished transactions are folded into totals kept in the store;
+    pending ones are aggregated afresh on every run since they can still
+    change. Returns the aggregates and the number of newly folded rows.
+    A transaction that changes after being folded (e.g. a refunded
+    success) keeps its first status until `rebuild`.
+    """
+    if rebuild:
+        store.reset_stats()
+    state = store.load_stats() or {}
+    after = state.get("rowid", 0)
+    upto = store.max_rowid()
+
+    aggregates = Aggregates(state)
+    folded = 0
+    for rows in store.stats_rows(after, upto):
+        aggregates.add_columns(Columns.from_typed(rows))
+        folded += len(rows)
+    store.save_stats(aggregates.state(), after, upto)
+
+    pending = Aggregates()
+    for rows in store.stats_rows(pending=True):
+        pending.add_columns(Columns.from_typed(rows))
+    aggregates.merge(pending)
+    return aggregates, folded
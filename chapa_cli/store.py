@@ -0,0 +1,219 @@
+import os
+import json
+import sqlite3
+from chapa_cli.utils import STORE_FILE_PATH
+from chapa_cli.config import scoped_path
+
+# Statuses after which a transaction no longer changes
+TERMINAL_STATUSES = {"success", "failed", "failed/cancelled", "cancelled", "reversed", "refunded"}
+
+# Timestamps are stored in the API's own format so they sort lexically
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    ref_id TEXT PRIMARY KEY,
+    status TEXT,
+    created_at TEXT,
+    currency TEXT,
+    amount TEXT,
+    charge TEXT,
+    payment_method TEXT,
+    email TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_status ON transactions (status);
+CREATE INDEX IF NOT EXISTS transactions_created_at ON transactions (created_at);
+CREATE INDEX IF NOT EXISTS transactions_email ON transactions (email);
+
+CREATE TABLE IF NOT EXISTS verifications (
+    tx_ref TEXT PRIMARY KEY,
+    reference TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS verifications_reference ON verifications (reference);
+
+CREATE TABLE IF NOT EXISTS stats_folded (
+    ref_id TEXT PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# Fields of `transaction stats`, converted the way chapa_cli.stats.Columns
+# does so the rows can be taken as they are (Columns.from_typed). julianday
+# keeps milliseconds, so rounding the latency to them makes it exact.
+_SUCCESS = "lower(status) = 'success'"
+STATS_COLUMNS = (
+    f"coalesce({_SUCCESS}, 0), "
+    f"CASE WHEN {_SUCCESS} THEN coalesce(CAST(amount AS REAL), 0.0) ELSE 0.0 END, "
+    f"CASE WHEN {_SUCCESS} THEN coalesce(CAST(charge AS REAL), 0.0) ELSE 0.0 END, "
+    f"CASE WHEN {_SUCCESS} THEN coalesce(round((julianday(json_extract(data, '$.updated_at')) - julianday(created_at))"
+    " * 86400, 3), -1.0) ELSE -1.0 END, "
+    "coalesce(currency, ''), coalesce(payment_method, ''), coalesce(substr(created_at, 1, 10), '')"
+)
+
+_TERMINAL_SQL = "lower(status) IN ({})".format(", ".join("?" * len(TERMINAL_STATUSES)))
+
+
+def is_terminal(status):
+    """Return True if a transaction with this status will not change anymore."""
+    return (status or "").lower() in TERMINAL_STATUSES
+
+
+class TransactionStore:
+    """Local SQLite index of synced transactions and verify responses."""
+
+    def __init__(self, path=None):
+        # One index per API base URL and account, see chapa_cli.config.scoped_path
+        self.path = path or scoped_path(os.getenv("CHAPA_STORE_PATH") or STORE_FILE_PATH, per_account=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_state(self, key):
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_state(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert_transactions(self, transactions):
+        """Insert or update a batch of transactions from the /transactions endpoint."""
+        rows = []
+        for transaction in transactions:
+            customer = transaction.get("customer") or {}
+            rows.append((
+                transaction["ref_id"],
+                transaction.get("status"),
+                transaction.get("created_at"),
+                transaction.get("currency"),
+                str(transaction.get("amount")),
+                str(transaction.get("charge")),
+                transaction.get("payment_method"),
+                customer.get("email"),
+                json.dumps(transaction),
+            ))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO transactions "
+                "(ref_id, status, created_at, currency, amount, charge, payment_method, email, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def query(self, ref=None, status=None, email=None, since=None, until=None, limit=None):
+        """Yield stored transactions matching the filters, newest first."""
+        clauses, params = [], []
+        if ref:
+            clauses.append("ref_id = ?")
+            params.append(ref)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if email:
+            clauses.append("email = ?")
+            params.append(email)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since.strftime(TIMESTAMP_FORMAT))
+        if until:
+            clauses.append("created_at < ?")
+            params.append(until.strftime(TIMESTAMP_FORMAT))
+
+        sql = "SELECT data FROM transactions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        for row in self.conn.execute(sql, params):
+            yield json.loads(row["data"])
+
+    def oldest_pending(self, since):
+        """Return the created_at of the oldest unfinished transaction created at or after `since`, if any."""
+        row = self.conn.execute(
+            f"SELECT min(created_at) FROM transactions WHERE created_at >= ? AND (status IS NULL OR NOT {_TERMINAL_SQL})",
+            [since.strftime(TIMESTAMP_FORMAT)] + sorted(TERMINAL_STATUSES),
+        ).fetchone()
+        return row[0]
+
+    def save_verification(self, tx_ref, response):
+        """Store a verify response for `tx_ref`."""
+        data = response.get("data") or {}
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO verifications (tx_ref, reference, status, data) VALUES (?, ?, ?, ?)",
+                (tx_ref, data.get("reference"), data.get("status"), json.dumps(response)),
+            )
+
+    def get_verification(self, tx_ref):
+        """Return the stored verify response for `tx_ref`, if any."""
+        row = self.conn.execute("SELECT data FROM verifications WHERE tx_ref = ?", (tx_ref,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def max_rowid(self):
+        return self.conn.execute("SELECT coalesce(max(rowid), 0) FROM transactions").fetchone()[0]
+
+    def stats_rows(self, after=0, upto=None, pending=False, batch_size=10000):
+        """Yield batches of typed stats rows of finished transactions not folded into the stored stats yet.
+
+        Upserts give a row a new rowid, so only rows stored after rowid
+        `after` (up to `upto`) are read. With `pending`, yield every
+        unfinished transaction instead: those can still change, so they
+        are never folded.
+        """
+        terminal = sorted(TERMINAL_STATUSES)
+        if pending:
+            sql = f"SELECT {STATS_COLUMNS} FROM transactions WHERE status IS NULL OR NOT {_TERMINAL_SQL}"
+            params = terminal
+        else:
+            sql = (f"SELECT {STATS_COLUMNS} FROM transactions WHERE rowid > ? AND rowid <= ? AND {_TERMINAL_SQL} "
+                   "AND ref_id NOT IN (SELECT ref_id FROM stats_folded)")
+            params = [after, upto if upto is not None else self.max_rowid()] + terminal
+
+        cursor = self.conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+
+    def save_stats(self, state, after, upto):
+        """Record the finished transactions between rowids `after` and `upto` as folded into `state`."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO stats_folded (ref_id) "
+                f"SELECT ref_id FROM transactions WHERE rowid > ? AND rowid <= ? AND {_TERMINAL_SQL}",
+                [after, upto] + sorted(TERMINAL_STATUSES),
+            )
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                              ("stats", json.dumps(dict(state, rowid=upto))))
+
+    def load_stats(self):
+        """Return the stored stats state, with the rowid they cover, or None."""
+        value = self.get_state("stats")
+        return json.loads(value) if value else None
+
+    def reset_stats(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM stats_folded")
+            self.conn.execute("DELETE FROM sync_state WHERE key = 'stats'")
@@ -1,23 +1,77 @@
 import click
 import sys 
 import requests
-from chapa_cli.utils import load_token
+from datetime import timedelta
+from chapa_cli.client import POOL_SIZE, ChapaClient, ChapaError, configure_session, get_limiter, iter_transactions
+from chapa_cli.config import setting_default
+from chapa_cli.utils import load_token, generate_tx_ref, parse_datetime, format_date
+from chapa_cli.store import TransactionStore, is_terminal
+from chapa_cli.banks import DEFAULT_TTL, get_banks, lookup_bank
+from chapa_cli.bulk import read_references, read_rows, bounded_map, Checkpoint
+from chapa_cli.output import get_writer, open_output, get_output_format, write_record, write_records
+from chapa_cli.follow import EventFollower
+from chapa_cli.reconcile import RECONCILE_FIELDS, reconcile
+from chapa_cli.stats import STATS_FIELDS, local_stats, stream_stats
+from chapa_cli.profiling import phase
+from chapa_cli.records import Record
+
+# How far back `transaction sync` reads pending transactions again to pick
+# up their final status; ones left pending longer are abandoned checkouts
+PENDING_WINDOW = timedelta(days=3)
+
+# rich is imported lazily by the printers so scripted runs that never
+# render a table do not pay for it
+_console = None
+
+
+def get_console():
+    """Return the shared rich console, creating it on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+def render(renderable, **kwargs):
+    """Print a rich renderable on the shared console, passing `kwargs` to Console.print."""
+    with phase("render"):
+        get_console().print(renderable, **kwargs)
+
+
+def print_panel(title, rows):
+    """Print label/value rows in a titled panel."""
+    from rich.panel import Panel
+    from rich.table import Table
 
-from rich.console import Console
-from rich.table import Table 
-from datetime import datetime
-from rich import print as rprint
-from rich.panel import Panel
+    table = Table.grid()
+    table.add_column(justify="left", style="bold")
+    table.add_column(justify="left")
+    for label, value in rows:
+        table.add_row(label, value)
+    render(Panel(table, title=title))
+
+
+def print_error_panel(title, response):
+    """Print the fields of a failed API response in a red panel."""
+    fmt = get_output_format()
+    if fmt != "table":
+        # Machine readable output: the raw error, and a failing exit status
+        write_record(response, fmt)
+        sys.exit(1)
 
+    rows = [(f"{key.capitalize()}: ", str(value)) for key, value in response.items()]
+    print_panel(f"[bold red]{title}[/bold red]", rows)
 
-API_URL = "https://api.chapa.co/v1"
+# Fields written for every reference by `verify-bulk`
+VERIFY_FIELDS = ["reference", "ok", "http_status", "status", "amount", "currency",
+                 "charge", "method", "created_at", "message"]
 
-#Create a console object
-console = Console()
+# Fields written for every row by `initialize-batch`
+INITIALIZE_FIELDS = ["row", "tx_ref", "ok", "http_status", "checkout_url", "message"]
 
-# Function to format the dates
-def format_date(date_str):
-    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d")
+# Aliases accepted in initialize-batch input, mapped to API field names
+INITIALIZE_ALIASES = {"phone": "phone_number", "webhook_url": "webhook"}
 
 
 def print_banks_info(response):
@@ -27,9 +81,16 @@ def print_banks_info(response):
         return
 
     banks = response['data']
+
+    fmt = get_output_format()
+    if fmt != "table":
+        write_records(banks, fmt)
+        return
+
+    from rich.table import Table
     # print(f"\n{response['message']}\n")
 
-    table = Table(title="List of Supported Banks Information")
+    table = Table(title="List of Supported Banks Information", caption=response.get("message"))
 
     # Add columns to the table with adjusted width
     table.add_column("Bank ID", justify="right", style="cyan", no_wrap=True, width=8)
@@ -50,18 +111,18 @@ def print_banks_info(response):
         table.add_row(
             str(bank["id"]),
             bank["name"],
-            bank["swift"],
-            str(bank["acct_length"]),
-            bank["currency"],
-            "Y" if bank["is_mobilemoney"] else "N",
-            "Y" if bank["is_rtgs"] else "N",
-            "Y" if bank["is_24hrs"] else "N",
-            "Y" if bank["is_active"] else "N",
-            format_date(bank["created_at"]),
-            format_date(bank["updated_at"])
+            bank.get("swift") or "",
+            str(bank.get("acct_length", "")),
+            bank.get("currency") or "",
+            "Y" if bank.get("is_mobilemoney") else "N",
+            "Y" if bank.get("is_rtgs") else "N",
+            "Y" if bank.get("is_24hrs") else "N",
+            "Y" if bank.get("is_active") else "N",
+            format_date(bank["created_at"]) if bank.get("created_at") else "",
+            format_date(bank["updated_at"]) if bank.get("updated_at") else ""
         )
     # Print the table
-    console.print(table)
+    render(table)
 
 def print_transaction_events(response):
     """Prints transaction events in a readable format."""
@@ -70,6 +131,13 @@ def print_transaction_events(response):
         return
 
     events = response['data']
+
+    fmt = get_output_format()
+    if fmt != "table":
+        write_records(events, fmt)
+        return
+
+    from rich.table import Table
     
     #print(f"\n{response['message']}\n")
     table = Table(title="Transaction Events Fetched")
@@ -91,7 +159,7 @@ def print_transaction_events(response):
                       format_date(event['updated_at']))
         
     
-    console.print(table)
+    render(table)
 
 
 def print_transactions_info(response):
@@ -101,7 +169,12 @@ def print_transactions_info(response):
         return
         
     transactions = response['data']['transactions']
-    
+
+    fmt = get_output_format()
+    if fmt != "table":
+        write_records(transactions, fmt)
+        return
+
     for transaction in transactions:
         print(f"Status: {transaction['status']}")
         print(f"Reference ID: {transaction['ref_id']}")
@@ -126,6 +199,13 @@ def print_payment_details(response):
         return
 
     data = response['data']
+
+    fmt = get_output_format()
+    if fmt != "table":
+        write_record(data, fmt)
+        return
+
+    from rich.table import Table
     
     table = Table(show_header=True, header_style="bold magenta",title=f"{response['message']}".capitalize())
     
@@ -146,7 +226,7 @@ def print_payment_details(response):
         if not key in ['customization','created_at','updated_at']:
             table.add_row(key.replace("_", " ").capitalize(), str(value))
     
-    rprint(table)
+    render(table)
 
 @click.group()
 def transaction():
@@ -162,10 +242,6 @@ def transaction():
 @click.option("--callback_url", required=False, help="URL to redirect to after payment.")
 @click.option("--webhook_url", required=False, help="URL to receive transaction events.")
 def initialize(amount, email, phone ,currency, tx_ref, callback_url, webhook_url):
-    table = Table.grid()
-    table.add_column(justify="left", style="bold")
-    table.add_column(justify="left")
-    
     """Initialize a new transaction."""
     token = load_token()
     if not token:
@@ -177,144 +253,551 @@ def initialize(amount, email, phone ,currency, tx_ref, callback_url, webhook_url
         "currency": currency,
         "email": email,
         "phone_number": phone,
-        "tx_ref": tx_ref,
+        "tx_ref": tx_ref or generate_tx_ref(),
         "callback_url": callback_url ,
         "webhook": webhook_url
     }
 
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(f"{API_URL}/transaction/initialize", json=data, headers=headers)
+    try:
+        data = ChapaClient(token).initialize(data)
+    except ChapaError as e:
+        print_error_panel("Failed to initialize transaction", e.body)
+    else:
+        fmt = get_output_format()
+        if fmt != "table":
+            write_record(data, fmt)
+            return
+
+        rows = [(f"{key.capitalize()}:", str(value)) for key, value in data.items() if key != "data"]
 
-    data = response.json()
-    if response.status_code == 200:
-        for key,value in data.items():
-            if key != "data":
-                table.add_row(f"{key.capitalize()}:", str(value))
-                
         if 'data' in data and 'checkout_url' in data['data']:
             checkout_url = data['data']['checkout_url']
-            table.add_row("Checkout URL:", checkout_url)
-        rprint(Panel(table, title="[bold green]Transaction initialized successfully[/bold green]"))
+            rows.append(("Checkout URL:", checkout_url))
+        print_panel("[bold green]Transaction initialized successfully[/bold green]", rows)
         #click.echo(f"Transaction initialized successfully: {response.json()}")
-    else:
-        for key,value in response.json().items():
-            table.add_row(f"{key.capitalize()}: ", str(value))
-        rprint(Panel(table, title="[bold red]Failed to initialize transaction[/bold red]"))
 
 @transaction.command()
-@click.argument("reference")
-def verify(reference):
-    table = Table.grid()
-    table.add_column(justify="left", style="bold")
-    table.add_column(justify="left")
-
-    """Verify a transaction by its reference."""
+@click.option("--ttl", type=int, default=DEFAULT_TTL, show_default=True,
+              help="Seconds the cached bank list is used before revalidating it.")
+@click.option("--offline", is_flag=True, help="Only use the cached bank list.")
+@click.option("--refresh", is_flag=True, help="Ignore the cache and download the bank list.")
+@click.option("--id", "bank_id", help="Only print the bank with this ID.")
+@click.option("--swift", help="Only print the bank with this SWIFT code.")
+def banks(ttl, offline, refresh, bank_id, swift):
+    """Get a list of supported banks."""
     token = load_token()
     if not token:
         click.echo("Please login first using the `chapa login` command.")
         return
 
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(f"{API_URL}/transaction/verify/{reference}", headers=headers)
+    if bank_id or swift:
+        bank = lookup_bank(token, bank_id=bank_id, swift=swift, ttl=ttl, offline=offline, refresh=refresh)
+        if not bank:
+            raise click.ClickException("No matching bank found.")
+        fmt = get_output_format()
+        write_record(bank, "jsonl" if fmt == "table" else fmt)
+        return
+
+    print_banks_info(get_banks(token, ttl=ttl, offline=offline, refresh=refresh))
+
 
-    if response.status_code == 200:
-        click.echo(f"Transaction verified: {response.json()}")
-    else:
-        for key,value in response.json().items():
-           table.add_row(f"{key.capitalize()}: ", str(value))
-        rprint(Panel(table, title="[bold red]Failed to verify transaction[/bold red]"))
-        # click.echo(f"Failed to verify transaction: {response.json()}"
-        
 @transaction.command()
-def banks():
-    """Get a list of supported banks."""
+@click.argument('references', nargs=-1, required=True)
+@click.option('--follow', '-f', is_flag=True, help='Keep polling and print new events as they happen.')
+@click.option('--interval', default=2.0, show_default=True, help='Seconds between polls while events keep coming.')
+@click.option('--max-interval', default=30.0, show_default=True, help='Longest delay between polls of a quiet transaction.')
+@click.option('--timeout', type=float, help='Stop following after this many seconds.')
+def events(references, follow, interval, max_interval, timeout):
+    """Get the events for one or more transactions."""
     token = load_token()
     if not token:
         click.echo("Please login first using the `chapa login` command.")
         return
 
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(f"{API_URL}/banks", headers=headers)
+    if follow:
+        follow_transaction_events(token, references, interval, max_interval, timeout)
+        return
 
-    if response.status_code == 200:
-        print_banks_info(response.json())
-    else:
-        click.echo(f"Failed to get supported banks: {response.json()}")
+    client = ChapaClient(token)
+    for reference in references:
+        try:
+            print_transaction_events(client.events(reference))
+        except ChapaError as e:
+            print_error_panel("Failed to get transaction events", e.body)
+            #click.echo(f"Failed to get transaction events: {response.json()}")
+
+
+def follow_transaction_events(token, references, interval, max_interval, timeout=None):
+    """Print new events of the references one line at a time until interrupted."""
+    fmt = get_output_format()
+    writer = None if fmt == "table" else get_writer(fmt, sys.stdout)
+    failed = []
+
+    def stop_following(reference, error):
+        failed.append(reference)
+        if writer:
+            writer.write(dict(error.body, reference=reference))
+            sys.stdout.flush()
+        else:
+            print_error_panel(f"Stopped following {reference}", error.body)
+
+    follower = EventFollower(token, references, interval=interval, max_interval=max_interval,
+                             on_error=stop_following)
+    try:
+        for reference, event in follower.follow(timeout=timeout):
+            if writer:
+                writer.write(dict(event, reference=reference))
+                sys.stdout.flush()
+            else:
+                render(
+                    f"[cyan]{reference}[/cyan] #{event.get('item')} "
+                    f"[yellow]{event.get('created_at', '')}[/yellow] "
+                    f"[{'red' if event.get('type') == 'error' else 'green'}]{event.get('type', '')}[/] "
+                    f"{event.get('message', '')}",
+                    highlight=False,
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if writer:
+            writer.close()
+    if failed:
+        sys.exit(1)
 
 
 @transaction.command()
-@click.argument('reference')
-def events(reference):
-    table = Table.grid()
-    table.add_column(justify="left", style="bold")
-    table.add_column(justify="left")
-    
-    """Get the events for a specific transaction."""
+@click.option('--page', default=1, help='Page number for paginated results.')
+@click.option('--export', 'export_format', type=click.Choice(["jsonl", "csv", "parquet"]),
+              help='Stream every page from --page onwards in this format instead of printing one page.')
+@click.option('--output', default="-", help='File to export to (default stdout).')
+@click.option('--since', type=click.DateTime(), help='Only transactions created at or after this UTC time.')
+@click.option('--until', type=click.DateTime(), help='Only transactions created before this UTC time.')
+@click.option('--local', is_flag=True, help='Answer from the local index built by `transaction sync`.')
+@click.option('--refresh', is_flag=True, help='With --local, sync new transactions from the API first.')
+@click.option('--status', help='With --local, only transactions with this status.')
+@click.option('--email', help='With --local, only transactions of this customer email.')
+@click.option('--ref', 'ref_id', help='With --local, only the transaction with this reference ID.')
+def getall(page, export_format, output, since, until, local, refresh, status, email, ref_id):
+    """Get a list of transactions."""
     token = load_token()
     if not token:
         click.echo("Please login first using the `chapa login` command.")
         return
 
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"{API_URL}/transaction/events/{reference}"
-    response = requests.get(url, headers=headers)
+    if local:
+        with TransactionStore() as store:
+            if refresh:
+                sync_transactions(store, token)
+            transactions = store.query(ref=ref_id, status=status, email=email, since=since, until=until)
+            if export_format:
+                write_rows(transactions, export_format, output)
+            else:
+                print_transactions_info({"data": {"transactions": transactions}})
+        return
 
-    if response.status_code == 200:
-        print_transaction_events(response.json())
-    else:
-        for key,value in response.json().items():
-           table.add_row(f"{key.capitalize()}: ", str(value))
-        rprint(Panel(table, title="[bold red]Failed to get transaction events[/bold red]"))
-        #click.echo(f"Failed to get transaction events: {response.json()}")
+    if export_format:
+        export_transactions(token, export_format, output, since, until, page)
+        return
 
+    try:
+        print_transactions_info(ChapaClient(token).transactions(page))
+    except ChapaError as e:
+        #for key,value in response.items():
+        #    table.add_row(key.capitalize(), str(value))
+        click.echo(f"Failed to get transactions: {e.body}")
+
+
+def write_rows(rows, fmt, output):
+    """Stream rows into the output file in the given format."""
+    stream = open_output(output, fmt)
+    writer = get_writer(fmt, stream)
+    try:
+        for row in rows:
+            writer.write(row.to_dict() if isinstance(row, Record) else row)
+    finally:
+        writer.close()
+        stream.close()
+
+
+def export_transactions(token, fmt, output, since=None, until=None, start_page=1):
+    """Stream transactions from all pages straight into the output file."""
+    try:
+        write_rows(iter_transactions(token, since=since, until=until, start_page=start_page, records=True),
+                   fmt, output)
+    except requests.RequestException as e:
+        raise click.ClickException(f"Failed to get transactions: {e}")
+
+
+def sync_transactions(store, token, full=False, batch_size=500):
+    """Pull transactions newer than the last synced one into the store.
+
+    Transactions still pending when they were synced are read again, as
+    long as they were created within PENDING_WINDOW of the sync cursor;
+    older ones are only refreshed by a `full` sync. The sync cursor only
+    moves forward once every page has been read, so an interrupted sync
+    is simply picked up again by the next run.
+    """
+    last_synced = None if full else store.get_state("last_created_at")
+    since = parse_datetime(last_synced) if last_synced else None
+    if since:
+        pending = store.oldest_pending(since - PENDING_WINDOW)
+        if pending:
+            since = min(since, parse_datetime(pending))
+
+    newest = last_synced
+    count = 0
+    batch = []
+    try:
+        for transaction in iter_transactions(token, since=since):
+            batch.append(transaction)
+            if newest is None or transaction["created_at"] > newest:
+                newest = transaction["created_at"]
+            if len(batch) >= batch_size:
+                store.upsert_transactions(batch)
+                count += len(batch)
+                batch = []
+    except requests.RequestException as e:
+        raise click.ClickException(f"Failed to sync transactions: {e}")
+    finally:
+        store.upsert_transactions(batch)
+    count += len(batch)
+
+    if newest:
+        store.set_state("last_created_at", newest)
+    return count
 
-@transaction.command()
-@click.option('--page', default=1, help='Page number for paginated results.')
-def getall(page):
-    table = Table.grid()
-    table.add_column(justify="left", style="bold")
-    table.add_column(justify="left")
 
-    """Get a list of transactions."""
+@transaction.command()
+@click.option('--full', is_flag=True, help='Re-sync the whole history instead of only new transactions.')
+def sync(full):
+    """Sync transactions into the local index."""
     token = load_token()
     if not token:
         click.echo("Please login first using the `chapa login` command.")
         return
 
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"{API_URL}/transactions?page={page}"
-    response = requests.get(url, headers=headers)
-
-    if response.status_code == 200:
-        print_transactions_info(response.json())
-    else:
-        #for key,value in response.items():
-        #    table.add_row(key.capitalize(), str(value))
-        click.echo(f"Failed to get transactions: {response.json()}")
+    with TransactionStore() as store:
+        count = sync_transactions(store, token, full=full)
+    click.echo(f"Synced {count} transactions.")
 
 
 @transaction.command()
 @click.argument('tx_ref')
-def verify(tx_ref):
-    table = Table.grid()
-    table.add_column(justify="left", style="bold")
-    table.add_column(justify="left")
-    
+@click.option('--refresh', is_flag=True, help='Always ask the API, even for a finished transaction in the local index.')
+def verify(tx_ref, refresh):
     """Verify a transaction by its reference."""
+    with TransactionStore() as store:
+        cached = None if refresh else store.get_verification(tx_ref)
+        if cached:
+            print_payment_details(cached)
+            return
+
+        token = load_token()
+        if not token:
+            click.echo("Please login first using the `chapa login` command.")
+            return
+
+        try:
+            body = ChapaClient(token).verify(tx_ref)
+        except ChapaError as e:
+            print_error_panel("Failed to verify transaction", e.body)
+        else:
+            # Only finished transactions are safe to answer from the index later
+            if is_terminal((body.get("data") or {}).get("status")):
+                store.save_verification(tx_ref, body)
+            print_payment_details(body)
+            #click.echo(f"Failed to verify transaction: {response.json()}")
+
+
+def verify_reference(reference, client):
+    """Verify one reference and return a flat result row."""
+    row = {"reference": reference, "ok": False}
+    try:
+        body = client.verify(reference)
+    except ChapaError as e:
+        row["http_status"] = e.status_code
+        row["message"] = e.body.get("message")
+        return row
+    except requests.RequestException as e:
+        row["message"] = str(e)
+        return row
+
+    data = body.get("data") or {}
+    row["ok"] = True
+    row["http_status"] = 200
+    row["message"] = body.get("message")
+    for key in ["status", "amount", "currency", "charge", "method", "created_at"]:
+        row[key] = data.get(key)
+    return row
+
+
+@transaction.command("verify-bulk")
+@click.argument("references", type=click.File("r"), default="-")
+@click.option("--concurrency", type=int, default=setting_default("max_concurrency"), show_default="config, 64",
+              help="Maximum number of concurrent verify requests, see \"Rate Limits\" in the README.")
+@click.option("--rate", type=float, default=setting_default("rate"), help="Maximum requests per second.")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl", show_default=True,
+              help="Output format, one line per reference.")
+@click.option("--output", type=click.File("w"), default="-", help="File to write results to (default stdout).")
+def verify_bulk(references, concurrency, rate, fmt, output):
+    """Verify many references read from a file or stdin, one per line."""
     token = load_token()
     if not token:
         click.echo("Please login first using the `chapa login` command.")
         return
 
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"{API_URL}/transaction/verify/{tx_ref}"
-    response = requests.get(url, headers=headers)
+    # Make sure every worker can hold on to a keep-alive connection
+    configure_session(pool_size=max(concurrency, POOL_SIZE))
+    writer = get_writer(fmt, output, fields=VERIFY_FIELDS)
+
+    client = ChapaClient(token)
+    # Workers start at the account's concurrency setting and adapt up to
+    # --concurrency, backing off whenever the API throttles
+    client.limiter = get_limiter(dict(client.settings, rate=rate, max_concurrency=concurrency))
+
+    def verify_one(reference):
+        return verify_reference(reference, client)
+
+    failed = 0
+    for row in bounded_map(verify_one, read_references(references), concurrency):
+        writer.write(row)
+        if not row["ok"]:
+            failed += 1
+    writer.close()
+
+    if failed:
+        sys.exit(1)
+
+
+def initialize_row(number, row, client, batch_id, prefix):
+    """Create one checkout from an input row and return a flat result row."""
+    data = {INITIALIZE_ALIASES.get(key, key): value for key, value in row.items()}
+    data.setdefault("currency", "ETB")
+    # Derived from the batch id so a resumed batch reuses the same reference
+    data.setdefault("tx_ref", f"{prefix}-{batch_id}-{number}")
+
+    result = {"row": number, "tx_ref": data["tx_ref"], "ok": False}
+    try:
+        body = client.initialize(data)
+    except ChapaError as e:
+        result["http_status"] = e.status_code
+        result["message"] = e.body.get("message")
+        return result
+    except requests.RequestException as e:
+        result["message"] = str(e)
+        return result
+
+    result["ok"] = True
+    result["http_status"] = 200
+    result["message"] = body.get("message")
+    result["checkout_url"] = (body.get("data") or {}).get("checkout_url")
+    return result
+
+
+@transaction.command("initialize-batch")
+@click.argument("rows", type=click.File("r"))
+@click.option("--output", required=True, type=click.Path(dir_okay=False),
+              help="File the results, including checkout URLs, are appended to.")
+@click.option("--input-format", type=click.Choice(["csv", "jsonl"]),
+              help="Format of ROWS (default: from the file extension).")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl", show_default=True,
+              help="Format of the output file.")
+@click.option("--checkpoint", type=click.Path(dir_okay=False),
+              help="Checkpoint file used to resume an interrupted batch (default: OUTPUT.checkpoint).")
+@click.option("--concurrency", type=int, default=setting_default("max_concurrency"), show_default="config, 64",
+              help="Maximum number of concurrent requests, see \"Rate Limits\" in the README.")
+@click.option("--rate", type=float, default=setting_default("rate"), help="Maximum requests per second.")
+@click.option("--prefix", default="chapa-cli", show_default=True, help="Prefix of generated tx_refs.")
+def initialize_batch(rows, output, input_format, fmt, checkpoint, concurrency, rate, prefix):
+    """Initialize a transaction for every row of a CSV or JSONL file.
+
+    Rows use the same fields as the API (amount, currency, email,
+    phone_number, tx_ref, callback_url, ...). Rows without a tx_ref get a
+    generated one.
+    """
+    token = load_token()
+    if not token:
+        click.echo("Please login first using the `chapa login` command.")
+        return
 
-    if response.status_code == 200:
-        print_payment_details(response.json())
+    input_format = input_format or ("csv" if rows.name.endswith(".csv") else "jsonl")
+    checkpoint = Checkpoint(checkpoint or f"{output}.checkpoint")
+    configure_session(pool_size=max(concurrency, POOL_SIZE))
+
+    pending = ((number, row) for number, row in enumerate(read_rows(rows, input_format), 1)
+               if number not in checkpoint.done)
+
+    client = ChapaClient(token)
+    client.limiter = get_limiter(dict(client.settings, rate=rate, max_concurrency=concurrency))
+
+    def initialize_one(item):
+        number, row = item
+        return initialize_row(number, row, client, checkpoint.batch_id, prefix)
+
+    created = failed = 0
+    # Append so results of earlier runs of the same batch are kept
+    with open(output, "a", newline="") as stream:
+        writer = get_writer(fmt, stream, fields=INITIALIZE_FIELDS)
+        try:
+            for result in bounded_map(initialize_one, pending, concurrency):
+                writer.write(result)
+                stream.flush()
+                if result["ok"]:
+                    checkpoint.mark_done(result["row"], result["tx_ref"])
+                    created += 1
+                else:
+                    failed += 1
+        finally:
+            writer.close()
+            checkpoint.close()
+
+    click.echo(f"Initialized {created} transactions, {failed} failed.", err=True)
+    if failed:
+        sys.exit(1)
+
+
+@transaction.command("reconcile")
+@click.option("--ledger", "ledger_file", required=True, type=click.File("r"),
+              help="Ledger export to check, CSV (with header) or JSONL.")
+@click.option("--ledger-format", type=click.Choice(["csv", "jsonl"]),
+              help="Format of the ledger (default: from the file extension).")
+@click.option("--transactions", "transactions_file", type=click.File("r"),
+              help="Compare against a `getall --export` JSONL or CSV file instead of the API.")
+@click.option("--local", is_flag=True, help="Compare against the local index built by `transaction sync`.")
+@click.option("--since", type=click.DateTime(), help="Only Chapa transactions created at or after this UTC time.")
+@click.option("--until", type=click.DateTime(), help="Only Chapa transactions created before this UTC time.")
+@click.option("--key", type=click.Choice(["ref_id", "tx_ref"]), default="ref_id", show_default=True,
+              help="Chapa field matching the ledger's references (the transaction list only carries ref_id).")
+@click.option("--column", "columns", multiple=True, metavar="FIELD=COLUMN",
+              help="Ledger column holding the key, amount, currency or status, e.g. amount=total.")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv"]), default="jsonl", show_default=True,
+              help="Output format, one line per discrepancy.")
+@click.option("--output", type=click.File("w"), default="-", help="File to write discrepancies to (default stdout).")
+@click.option("--workers", type=int, help="Processes comparing partitions (default: one per CPU).")
+@click.option("--partitions", type=int, default=32, show_default=True,
+              help="Number of on-disk partitions, more keeps less of the ledger in memory at once.")
+@click.option("--tmpdir", type=click.Path(file_okay=False), help="Directory for the partitions (default: system temp).")
+def reconcile_command(ledger_file, ledger_format, transactions_file, local, since, until, key, columns, fmt, output,
+                      workers, partitions, tmpdir):
+    """Report transactions missing, extra or different between a ledger and Chapa."""
+    mapping = {}
+    for column in columns:
+        field, _, name = column.partition("=")
+        if field not in ("key", "amount", "currency", "status") or not name:
+            raise click.BadParameter(f"expected key, amount, currency or status=COLUMN, got {column!r}",
+                                     param_hint="--column")
+        mapping[field] = name
+
+    ledger_format = ledger_format or ("csv" if ledger_file.name.endswith(".csv") else "jsonl")
+    ledger_rows = read_rows(ledger_file, ledger_format)
+
+    store = None
+    if transactions_file:
+        transactions = read_rows(transactions_file, "csv" if transactions_file.name.endswith(".csv") else "jsonl")
     else:
-        for key,value in response.json().items():
-            table.add_row(f"{key.capitalize()}: ", str(value))
-            
-        rprint(Panel(table, title="[bold red]Failed to verify transaction[/bold red]"))
-        #click.echo(f"Failed to verify transaction: {response.json()}")
+        token = load_token()
+        if not token:
+            click.echo("Please login first using the `chapa login` command.")
+            return
+        if local:
+            store = TransactionStore()
+            transactions = store.query(since=since, until=until)
+        else:
+            transactions = iter_transactions(token, since=since, until=until, records=True)
+
+    writer = get_writer(fmt, output, fields=RECONCILE_FIELDS)
+    try:
+        summary = reconcile(ledger_rows, transactions, writer.write, key=key, columns=mapping,
+                            partitions=partitions, workers=workers, tmpdir=tmpdir)
+    except requests.RequestException as e:
+        raise click.ClickException(f"Failed to get transactions: {e}")
+    finally:
+        writer.close()
+        if store:
+            store.close()
+
+    click.echo(
+        f"Compared {summary['ledger_rows']} ledger rows with {summary['chapa_transactions']} Chapa transactions: "
+        f"{summary['matched']} matched, {summary['missing']} missing, {summary['extra']} extra, "
+        f"{summary['mismatched']} mismatched, {summary['duplicate']} duplicate.",
+        err=True,
+    )
+    if summary["skipped"] or summary["chapa_skipped"]:
+        click.echo(f"Warning: skipped {summary['skipped']} ledger rows and {summary['chapa_skipped']} Chapa "
+                   f"transactions without a {key}; check --key and --column key=...", err=True)
+    for currency, totals in summary["totals"].items():
+        click.echo(f"{currency or '-'}: ledger {totals['ledger_amount']}, {totals['count']} successful at Chapa, "
+                   f"amount {totals['amount']}, charge {totals['charge']}", err=True)
+
+    if (summary["missing"] or summary["extra"] or summary["mismatched"] or summary["duplicate"]
+            or summary["skipped"] or summary["chapa_skipped"]):
+        sys.exit(1)
+
+
+def print_stats(report):
+    """Print the aggregates of `transaction stats` as one table per dimension."""
+    fmt = get_output_format()
+    if fmt == "json":
+        write_record(report, fmt)
+        return
+    if fmt != "table":
+        write_records([report["total"]] + report["groups"], fmt, fields=STATS_FIELDS)
+        return
+
+    from rich.table import Table
+
+    titles = {"total": "Total", "currency": "By Currency", "payment_method": "By Payment Method", "day": "By Day"}
+    for dimension, title in titles.items():
+        rows = [row for row in [report["total"]] + report["groups"] if row["dimension"] == dimension]
+        if not rows:
+            continue
+        table = Table(show_header=True, header_style="bold magenta", title=title)
+        for column in ["Key", "Count", "Successful", "Success Rate", "Amount", "Charge"]:
+            table.add_column(column, justify="left" if column == "Key" else "right")
+        for row in rows:
+            rate = f"{row['success_rate']:.1%}" if row["success_rate"] is not None else "-"
+            table.add_row(row["key"] or "-", str(row["count"]), str(row["successful"]), rate,
+                          str(row["amount"] if row["amount"] is not None else "-"),
+                          str(row["charge"] if row["charge"] is not None else "-"))
+        render(table)
+
+    latency = report["latency"]
+    if latency["count"]:
+        p50 = f"<= {latency['p50_at_most']}s" if latency["p50_at_most"] is not None else "-"
+        p95 = f"<= {latency['p95_at_most']}s" if latency["p95_at_most"] is not None else "-"
+        print_panel("Settle Latency", [
+            ("Successful: ", str(latency["count"])),
+            ("Mean: ", f"{latency['mean']}s"),
+            ("Median: ", p50),
+            ("95th percentile: ", p95),
+            ("Max: ", f"{latency['max']}s"),
+        ])
+
+
+@transaction.command()
+@click.option("--local", is_flag=True,
+              help="Aggregate the local index built by `transaction sync`, only reading rows new since the last run.")
+@click.option("--refresh", is_flag=True, help="With --local, sync new transactions from the API first.")
+@click.option("--rebuild", is_flag=True, help="With --local, recompute the stored totals from scratch.")
+def stats(local, refresh, rebuild):
+    """Summarize transactions: totals and success rates by currency, payment method and day."""
+    if local:
+        with TransactionStore() as store:
+            if refresh:
+                token = load_token()
+                if not token:
+                    click.echo("Please login first using the `chapa login` command.")
+                    return
+                sync_transactions(store, token)
+            aggregates, _ = local_stats(store, rebuild=rebuild)
+    else:
+        token = load_token()
+        if not token:
+            click.echo("Please login first using the `chapa login` command.")
+            return
+        try:
+            aggregates = stream_stats(iter_transactions(token, records=True))
+        except requests.RequestException as e:
+            raise click.ClickException(f"Failed to get transactions: {e}")
+
+    print_stats(aggregates.report())
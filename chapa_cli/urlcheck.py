@@ -0,0 +1,204 @@
+import ssl
+import json
+import time
+import socket
+import threading
+import http.client
+from urllib.parse import urlparse
+from chapa_cli.bulk import bounded_map
+from chapa_cli.receiver import signature_headers
+
+
+class TTLCache:
+    """Thread safe dict whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            self.entries.pop(key, None)
+            return None
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+
+
+# Resolved addresses per (host, port) and certificate details/TLS sessions per host
+dns_cache = TTLCache(ttl=300)
+cert_cache = TTLCache(ttl=3600)
+
+_context = ssl.create_default_context()
+
+
+def resolve(host, port, timings):
+    """Return a socket address for host:port, from the DNS cache when possible."""
+    address = dns_cache.get((host, port))
+    timings["dns_cached"] = address is not None
+    if address is None:
+        started = time.perf_counter()
+        address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][:2]
+        timings["dns"] = round((time.perf_counter() - started) * 1000, 3)
+        dns_cache.set((host, port), address)
+    return address
+
+
+class _TimedConnectionMixin:
+    """Connect through the DNS cache and record connect/TLS timings."""
+
+    def connect(self):
+        address = resolve(self.host, self.port, self.timings)
+
+        started = time.perf_counter()
+        sock = socket.create_connection(address, self.timeout)
+        self.timings["connect"] = round((time.perf_counter() - started) * 1000, 3)
+
+        if not self.tls:
+            self.sock = sock
+            return
+
+        # Resume the TLS session of an earlier connection to this host if we have one
+        cached = cert_cache.get(self.host)
+        started = time.perf_counter()
+        self.sock = _context.wrap_socket(sock, server_hostname=self.host,
+                                         session=cached["session"] if cached else None)
+        self.timings["tls"] = round((time.perf_counter() - started) * 1000, 3)
+        self.timings["tls_resumed"] = self.sock.session_reused
+        # Read it now, the server may close the socket after the first response
+        self.certificate = certificate_details(self)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, http.client.HTTPConnection):
+    tls = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {}
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, http.client.HTTPSConnection):
+    tls = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {}
+        self.certificate = None
+
+
+def certificate_details(conn):
+    """Read the peer certificate of an open TLS connection, caching it with the TLS session."""
+    cached = cert_cache.get(conn.host)
+    if cached and conn.timings.get("tls_resumed"):
+        return cached["certificate"]
+
+    cert = conn.sock.getpeercert()
+    certificate = {
+        "subject": dict(x[0] for x in cert["subject"]),
+        "issuer": dict(x[0] for x in cert["issuer"]),
+        "not_before": cert["notBefore"],
+        "not_after": cert["notAfter"],
+    }
+    cert_cache.set(conn.host, {"certificate": certificate, "session": conn.sock.session})
+    return certificate
+
+
+def _timed_request(conn, method, path, report, phase, **kwargs):
+    started = time.perf_counter()
+    conn.request(method, path, **kwargs)
+    response = conn.getresponse()
+    # Drain the body so the connection can be reused
+    response.read()
+    report["timings_ms"][phase] = round((time.perf_counter() - started) * 1000, 3)
+
+    # Connection level timings are only recorded when the request had to (re)connect
+    for name in ("dns", "connect", "tls"):
+        if name in conn.timings:
+            report["timings_ms"][name] = report["timings_ms"].get(name, 0) + conn.timings.pop(name)
+    return response.status
+
+
+def check_url(url, secret_key=None, timeout=5, conn=None):
+    """Check reachability, POST support and the certificate of a webhook URL.
+
+    The GET and the POST go over the same connection, and the certificate
+    is read from it, so each URL costs one connection and one handshake.
+    Returns a report with per-phase timings in milliseconds.
+    """
+    parsed = urlparse(url)
+    path = parsed.path or "/"
+    if parsed.query:
+        path += f"?{parsed.query}"
+
+    report = {"url": url, "ok": False, "error": None, "get_status": None, "post_status": None,
+              "certificate": None, "cached": {}, "timings_ms": {}}
+    started = time.perf_counter()
+    own_conn = conn is None
+    if own_conn:
+        connection_class = TimedHTTPSConnection if parsed.scheme == "https" else TimedHTTPConnection
+        conn = connection_class(parsed.hostname, parsed.port, timeout=timeout)
+
+    try:
+        report["get_status"] = _timed_request(conn, "GET", path, report, "get")
+        report["cached"] = {"dns": conn.timings.get("dns_cached"), "tls_session": conn.timings.get("tls_resumed")}
+
+        if report["get_status"] != 200:
+            report["error"] = f"URL is not reachable. Status code: {report['get_status']}"
+            return report
+
+        body = json.dumps({"event": "cli.test", "message": "Selam from chapa-cli"})
+        headers = {"Content-Type": "application/json"}
+        if secret_key:
+            headers.update(signature_headers(secret_key, body))
+        report["post_status"] = _timed_request(conn, "POST", path, report, "post", body=body, headers=headers)
+        if report["post_status"] != 200:
+            report["error"] = f"POST request failed. Status code: {report['post_status']}"
+            return report
+
+        if parsed.scheme != "https":
+            report["error"] = "Only HTTPS URLs are supported for Chapa Webhook URL verification."
+            return report
+
+        report["certificate"] = conn.certificate
+        report["ok"] = True
+    except ssl.SSLError as e:
+        report["error"] = f"SSL certificate verification failed: {e}"
+        conn.close()
+    except (OSError, http.client.HTTPException) as e:
+        report["error"] = f"Failed to reach URL: {e}"
+        conn.close()
+    finally:
+        if own_conn:
+            conn.close()
+        report["timings_ms"]["total"] = round((time.perf_counter() - started) * 1000, 3)
+    return report
+
+
+def check_urls(urls, secret_key=None, timeout=5, concurrency=16):
+    """Check many URLs concurrently and yield their reports as they complete.
+
+    URLs on the same host are checked one after another over a single
+    connection, different hosts in parallel.
+    """
+    hosts = {}
+    for url in urls:
+        parsed = urlparse(url)
+        hosts.setdefault((parsed.scheme, parsed.hostname, parsed.port), []).append(url)
+
+    def check_host(item):
+        (scheme, hostname, port), host_urls = item
+        connection_class = TimedHTTPSConnection if scheme == "https" else TimedHTTPConnection
+        conn = connection_class(hostname, port, timeout=timeout)
+        try:
+            return [check_url(url, secret_key=secret_key, timeout=timeout, conn=conn) for url in host_urls]
+        finally:
+            conn.close()
+
+    for reports in bounded_map(check_host, hosts.items(), concurrency):
+        for report in reports:
+            yield report
@@ -1,33 +1,79 @@
 import os
-import json
-import base64
+import re
+import uuid
+from functools import lru_cache
+from datetime import datetime, timedelta
+from chapa_cli.profiling import phase
 
 CONFIG_FILE_PATH = os.path.expanduser("~/.chapa_cli_config.json")
+STORE_FILE_PATH = os.path.expanduser("~/.chapa_cli_store.sqlite3")
+BANKS_CACHE_PATH = os.path.expanduser("~/.chapa_cli_banks.json")
+WEBHOOK_LOG_DIR = os.path.expanduser("~/.chapa_cli_webhooks")
+DAEMON_SOCKET_PATH = os.path.expanduser("~/.chapa_cli_daemon.sock")
 
-def save_token(token):
-    """Save the secret token to a config file."""
-    config_data = {
-        "token": base64.b64encode(token.encode("utf-8")).decode("utf-8")
-    }
-    with open(CONFIG_FILE_PATH, "w") as config_file:
-        json.dump(config_data, config_file)
+def save_token(token, account=None):
+    """Save the secret token to the config file, or to the profile of `account`."""
+    from chapa_cli.config import save_settings
+    save_settings({"token": token}, account=account)
 
 def validate_token(token):
     """Validate the secret token with the server."""
     return True
 
 
-def load_token():
-    """Load the secret token from the environment variable or config file."""
-    token = os.getenv("CHAPA_API_TOKEN")
-    
-    if token:
-        return token
-    
-    if os.path.exists(CONFIG_FILE_PATH):
-        with open(CONFIG_FILE_PATH, "r") as config_file:
-            config_data = json.load(config_file)
-            token = base64.b64decode(config_data.get("token")).decode("utf-8")
-            return token
-    
-    return None
+def load_token(account=None):
+    """Load the secret token from the environment variable or config file.
+
+    The config file is decoded once and cached until it changes (see
+    chapa_cli.config), so this is cheap to call per request.
+    """
+    from chapa_cli.config import get_settings
+    with phase("load_token"):
+        return get_settings(account)["token"]
+
+
+def generate_tx_ref(prefix="chapa-cli"):
+    """Generate a unique transaction reference."""
+    return f"{prefix}-{uuid.uuid4().hex[:16]}"
+
+
+# ISO-8601 timestamps as sent by the API and its variants: optional time,
+# seconds, fraction (any precision) and Z or +HH:MM offset
+_TIMESTAMP = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?"
+    r"\s*(Z|[+-]\d{2}:?\d{2})?$"
+)
+
+# Offsets at the end of a timestamp that is not in UTC
+_OFFSET = re.compile(r"[+-]\d{2}:?\d{2}$")
+
+
+@lru_cache(maxsize=4096)
+def parse_datetime(value):
+    """Parse an API timestamp such as 2023-02-02T07:05:23.000000Z into a naive UTC datetime."""
+    match = _TIMESTAMP.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    parsed = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0),
+                      int(fraction[:6].ljust(6, "0")) if fraction else 0)
+
+    if offset and offset != "Z":
+        sign = -1 if offset[0] == "-" else 1
+        digits = offset[1:].replace(":", "")
+        parsed -= sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:]))
+    return parsed
+
+
+@lru_cache(maxsize=4096)
+def format_date(value):
+    """Return the UTC date (YYYY-MM-DD) of an API timestamp."""
+    # UTC and naive timestamps already start with their date, only
+    # timestamps with a real offset need to be parsed
+    if len(value) >= 10 and value[4] == "-" and value[7] == "-":
+        offset = _OFFSET.search(value, 10)
+        if not offset or offset.group() in ("+00:00", "+0000", "-00:00"):
+            return value[:10]
+    return parse_datetime(value).strftime("%Y-%m-%d")
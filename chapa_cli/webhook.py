@@ -1,14 +1,41 @@
 import click
+import sys
 import ssl
+import json
+import time
 import socket
 import requests
-import hmac
-import hashlib
-from flask import Flask, request
-from pyngrok import ngrok
 from urllib.parse import urlparse
+from chapa_cli.receiver import EventQueue, add_receiver, echo_events, log_events, serve, signature_headers
+from chapa_cli.bench import run_bench, print_report
+from chapa_cli.eventlog import EventLog, iter_events
+from chapa_cli.dedup import Deduplicator
+from chapa_cli.forward import FanOut
+from chapa_cli.client import build_session
+from chapa_cli.bulk import bounded_map, read_references
+from chapa_cli.output import get_output_format, get_writer
+from chapa_cli.urlcheck import check_urls
+from chapa_cli.ratelimit import RateLimiter
+from chapa_cli.utils import WEBHOOK_LOG_DIR
 
-app = Flask(__name__)
+# Flask is only imported, and the app only created, by commands that serve
+_app = None
+
+
+def get_app():
+    """Return the Flask app webhook endpoints are registered on."""
+    global _app
+    if _app is None:
+        from flask import Flask
+        _app = Flask(__name__)
+    return _app
+
+
+def __getattr__(name):
+    # Keep `from chapa_cli.webhook import app` working without creating it at import time
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 @click.group()
 def webhook():
@@ -32,17 +59,13 @@ def verify_webhook_url(url, secret_key=None):
             "message": "Selam from chapa-cli"
         }
         
-        headers = {}
+        # Sign the exact bytes that are sent
+        body = json.dumps(test_data)
+        headers = {"Content-Type": "application/json"}
         if secret_key:
-            payload = str(test_data)
-            hash = hmac.new(secret_key.encode(), payload.encode(), hashlib.sha256).hexdigest()
-            cshash = hmac.new(secret_key.encode(), secret_key.encode(), hashlib.sha256).hexdigest()
-            headers = {
-                'Chapa-Signature': cshash,
-                'x-chapa-signature': hash,
-            }
-
-        post_response = requests.post(url, json=test_data, headers=headers, timeout=5)
+            headers.update(signature_headers(secret_key, body))
+
+        post_response = requests.post(url, data=body, headers=headers, timeout=5)
         if post_response.status_code != 200:
             click.echo(click.style(f"POST request failed. Status code: {post_response.status_code}", fg="red"))
             return False
@@ -89,22 +112,129 @@ def verify_webhook_url(url, secret_key=None):
 
 @webhook.command()
 @click.argument("url")
-def listen(url):
+@click.option("--workers", type=int, help="Serve on a multi-threaded production server (waitress) with this many workers.")
+@click.option("--secret", envvar="CHAPA_WEBHOOK_SECRET", help="Reject requests whose signature does not match this secret key.")
+@click.option("--queue-size", default=10000, show_default=True, help="Maximum number of events waiting to be written.")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Interface to listen on.")
+@click.option("--log-dir", default=WEBHOOK_LOG_DIR, show_default=True, help="Directory of the append-only event log.")
+@click.option("--no-log", is_flag=True, help="Do not persist received events.")
+@click.option("--dedup-size", default=100000, show_default=True,
+              help="Number of recent events remembered to drop redeliveries (0 disables deduplication).")
+@click.option("--dedup-db", type=click.Path(dir_okay=False),
+              help="SQLite index of processed events, so redeliveries are recognised across restarts.")
+@click.option("--forward-to", "forward_to", multiple=True,
+              help="Also POST every event to this URL (repeatable), e.g. a local service.")
+@click.option("--forward-queue-size", default=1000, show_default=True,
+              help="Events waiting per forward target; further events are not forwarded to a target that is behind.")
+@click.option("--forward-workers", default=4, show_default=True, help="Concurrent requests per forward target.")
+@click.option("--forward-retries", default=5, show_default=True, help="Retries per event for 429, 5xx and connection errors.")
+def listen(url, workers, secret, queue_size, host, log_dir, no_log, dedup_size, dedup_db,
+           forward_to, forward_queue_size, forward_workers, forward_retries):
     """Listen to a webhook endpoint."""
     # Extract the path from the URL
     if not url.startswith('/'):
         if '//' in url:
             url = url.split('//', 1)[-1]
         url = '/' + url.split('/', 1)[-1]
-    
-    @app.route(url, methods=['POST'])
-    def chapa_webhook():
-        data = request.json
-        click.echo(click.style(f"Webhook received: {data}", fg="green"))
-        return "", 200
+
+    def write_events(batch):
+        if log:
+            log_events(log, batch)
+        if fanout:
+            fanout.forward(batch)
+        echo_events(batch)
+
+    log = None if no_log else EventLog(log_dir)
+    # Handlers only enqueue events, a background thread writes them out
+    # and fsyncs the log when it goes quiet
+    events = EventQueue(write_events, maxsize=queue_size, idle=log.tick if log else None,
+                        idle_interval=log.fsync_interval if log else 1.0)
+    app = get_app()
+    dedup = Deduplicator(dedup_size, path=dedup_db) if dedup_size or dedup_db else None
+    add_receiver(app, url, events, secret_key=secret, dedup=dedup)
+    fanout = None
+    if forward_to:
+        fanout = FanOut(forward_to, queue_size=forward_queue_size, workers=forward_workers,
+                        max_retries=forward_retries).start()
 
     port = int(url.split(':')[-1]) if ':' in url else 5000
-    app.run(port=port)
+    events.start()
+    try:
+        serve(app, host, port, workers=workers)
+    finally:
+        events.stop()
+        if events.failed:
+            click.echo(click.style(f"{events.failed} webhook events could not be written.", fg="red"), err=True)
+        if fanout:
+            fanout.stop(timeout=10)
+            for stats in fanout.stats():
+                click.echo(f"Forwarded {stats['forwarded']} events to {stats['url']}: {stats['failed']} failed, "
+                           f"{stats['dropped']} dropped, {stats['retried']} retries.")
+        if log:
+            log.close()
+        if dedup:
+            stats = dedup.stats()
+            click.echo(f"Received {events.received} events, {stats['duplicates']} duplicates dropped.")
+            dedup.close()
+
+@webhook.command()
+@click.argument("url")
+@click.option("--log-dir", default=WEBHOOK_LOG_DIR, show_default=True, help="Directory of the event log to replay.")
+@click.option("--rate", type=float, help="Maximum events per second.")
+@click.option("--speedup", type=float, help="Replay with the recorded timing, this many times faster.")
+@click.option("--concurrency", default=8, show_default=True, help="Number of concurrent requests.")
+def replay(url, log_dir, rate, speedup, concurrency):
+    """Re-send logged webhook events to URL."""
+    session = build_session(pool_size=concurrency, max_retries=0)
+    limiter = RateLimiter(rate)
+
+    def scheduled(events):
+        # Sleep between submissions to reproduce the recorded inter-arrival times
+        first = started = None
+        for event in events:
+            if speedup:
+                if first is None:
+                    first, started = event["received_at"], time.monotonic()
+                delay = (event["received_at"] - first) / speedup - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            yield event
+
+    def send(event):
+        limiter.acquire()
+        headers = dict(event.get("headers") or {})
+        headers["Content-Type"] = "application/json"
+        try:
+            response = session.post(url, data=event["body"].encode(), headers=headers, timeout=10)
+            return response.status_code < 400
+        except requests.RequestException:
+            return False
+
+    started = time.monotonic()
+    sent = failed = 0
+    for ok in bounded_map(send, scheduled(iter_events(log_dir)), concurrency):
+        sent += 1
+        failed += not ok
+    elapsed = time.monotonic() - started
+
+    click.echo(f"Replayed {sent} events in {elapsed:.2f}s ({sent / elapsed if elapsed else 0:.1f}/s), {failed} failed.")
+
+
+@webhook.command()
+@click.argument("url")
+@click.option("--duration", default=10.0, show_default=True, help="Seconds to run the benchmark for.")
+@click.option("--concurrency", default=8, show_default=True, help="Number of concurrent connections.")
+@click.option("--rps", type=float, help="Target requests per second across all connections (default: as fast as possible).")
+@click.option("--usekey", help="The secret key for signing the requests.")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON.")
+def bench(url, duration, concurrency, rps, usekey, as_json):
+    """Load test a webhook endpoint with signed events."""
+    report = run_bench(url, duration=duration, concurrency=concurrency, rps=rps, secret_key=usekey)
+    if as_json:
+        click.echo(json.dumps(report))
+    else:
+        print_report(report)
+
 
 @webhook.command()
 @click.argument("url")
@@ -122,20 +252,55 @@ def ping(url):
         click.echo(click.style(f"Ping failed: {response.status_code}", fg="red"))
 
 @webhook.command()
-@click.argument("url")
+@click.argument("urls", nargs=-1)
 @click.option('--usekey', help='The secret key for signing the request.')
-def verifywebhook(url, usekey):
-    """Verify the webhook URL by checking reachability, POST method, and SSL using Chapa's standard webhook protocol."""
-    if verify_webhook_url(url, secret_key=usekey):
-        click.echo(click.style("Webhook URL verified successfully.", fg="green"))
-    else:
-        click.echo(click.style("Webhook URL verification failed.", fg="red"))
+@click.option('--file', 'url_file', type=click.File("r"), help='Read URLs to verify from this file, one per line.')
+@click.option('--concurrency', default=16, show_default=True, help='Number of hosts checked in parallel.')
+@click.option('--timeout', default=5.0, show_default=True, help='Socket timeout in seconds.')
+def verifywebhook(urls, usekey, url_file, concurrency, timeout):
+    """Verify the webhook URL by checking reachability, POST method, and SSL using Chapa's standard webhook protocol.
+
+    Given several URLs (or --file), they are checked concurrently and a
+    report with per-phase timings is printed for each one.
+    """
+    urls = list(urls) + (list(read_references(url_file)) if url_file else [])
+    if not urls:
+        raise click.UsageError("Provide at least one URL or --file.")
+
+    if len(urls) == 1 and not url_file:
+        if verify_webhook_url(urls[0], secret_key=usekey):
+            click.echo(click.style("Webhook URL verified successfully.", fg="green"))
+        else:
+            click.echo(click.style("Webhook URL verification failed.", fg="red"))
+        return
+
+    fmt = get_output_format()
+    writer = None if fmt == "table" else get_writer(fmt, sys.stdout)
+    failed = 0
+    for report in check_urls(urls, secret_key=usekey, timeout=timeout, concurrency=concurrency):
+        failed += not report["ok"]
+        if writer:
+            writer.write(report)
+            continue
+        timings = ", ".join(f"{phase} {ms:.0f}ms" for phase, ms in report["timings_ms"].items())
+        if report["ok"]:
+            valid_until = report["certificate"]["not_after"]
+            click.echo(click.style(f"OK   {report['url']}", fg="green") + f"  ({timings}; cert valid until {valid_until})")
+        else:
+            click.echo(click.style(f"FAIL {report['url']}", fg="red") + f"  {report['error']} ({timings})")
+    if writer:
+        writer.close()
+
+    if failed:
+        sys.exit(1)
 
 @webhook.command()
 @click.argument('port')
 def tunnel(port):
     """Create a tunnel for the specified port."""
     try:
+        from pyngrok import ngrok
+
         # Start ngrok tunnel
         public_url = ngrok.connect(port)
         click.echo(click.style(f"Ngrok tunnel started at {public_url}", fg="green"))
@@ -25,9 +25,15 @@ setup(
         "rich"             # For beautiful terminal output 
         
     ],
+    extras_require={
+        "parquet": ["pyarrow"],   # For `getall --export parquet`
+        "server": ["waitress"],   # For `webhook listen --workers`
+        "async": ["httpx[http2]"],  # For AsyncChapaClient
+        "stats": ["numpy"],       # Faster `transaction stats`
+    },
     entry_points={
         "console_scripts": [
-            "chapa=chapa_cli.main:cli",
+            "chapa=chapa_cli.main:main",
         ],
     },
 )
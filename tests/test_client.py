@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import unittest
+import requests_mock
+from chapa_cli import client, ChapaClient, AsyncChapaClient, ChapaError
+from chapa_cli.records import Bank, Event
+from chapa_cli.ratelimit import AdaptiveConcurrency, ApiLimiter, parse_retry_after
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+class TestApiClient(unittest.TestCase):
+
+    def tearDown(self):
+        client.close_session()
+
+    def test_session_is_shared(self):
+        """The same pooled session is reused across calls."""
+        self.assertIs(client.get_session(), client.get_session())
+
+    @requests_mock.Mocker()
+    def test_request_sends_token_and_timeout(self, mock):
+        """Requests carry the bearer token and go to API_URL."""
+        mock.get("https://api.chapa.co/v1/banks", json={"data": []}, status_code=200)
+
+        response = client.api_get("/banks", token="test_token")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock.last_request.headers["Authorization"], "Bearer test_token")
+        self.assertEqual(mock.last_request.timeout, (client.CONNECT_TIMEOUT, client.READ_TIMEOUT))
+
+    def test_retry_policy(self):
+        """429 and 5xx responses are retried with backoff."""
+        adapter = client.build_session(max_retries=5).get_adapter("https://api.chapa.co")
+        self.assertEqual(adapter.max_retries.total, 5)
+        self.assertIn(429, adapter.max_retries.status_forcelist)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        # A POST that got a 5xx may have been processed, only a 429 is retried
+        self.assertTrue(adapter.max_retries.is_retry("GET", 503))
+        self.assertFalse(adapter.max_retries.is_retry("POST", 503))
+        self.assertTrue(adapter.max_retries.is_retry("POST", 429))
+        self.assertTrue(adapter.max_retries.new().is_retry("POST", 429))
+
+    @requests_mock.Mocker()
+    def test_client_raises_chapa_error(self, mock):
+        """Non 200 responses raise ChapaError carrying the decoded body."""
+        mock.get("https://api.chapa.co/v1/transaction/verify/missing",
+                 json={"message": "Invalid transaction or Transaction not found"}, status_code=404)
+
+        with self.assertRaises(ChapaError) as error:
+            ChapaClient("test_token").verify("missing")
+
+        self.assertEqual(error.exception.status_code, 404)
+        self.assertEqual(error.exception.body["message"], "Invalid transaction or Transaction not found")
+
+    @requests_mock.Mocker()
+    def test_events_and_banks_as_records(self, mock):
+        """With records=True the "data" array is decoded into Event and Bank records."""
+        mock.get("https://api.chapa.co/v1/transaction/events/AP1", json={"message": "Events fetched", "data": [
+            {"item": 1, "message": "Checkout created", "type": "log", "created_at": "2024-03-02T10:00:00.000000Z"}]})
+        mock.get("https://api.chapa.co/v1/banks", json={"message": "Banks retrieved", "data": [
+            {"id": 1, "swift": "TSTBKTAA", "name": "Test Bank", "currency": "ETB"}]})
+
+        events = ChapaClient("test_token").events("AP1", records=True)
+        banks = ChapaClient("test_token").banks(records=True)
+
+        self.assertEqual(events["message"], "Events fetched")
+        self.assertIsInstance(events["data"][0], Event)
+        self.assertEqual(events["data"][0].message, "Checkout created")
+        self.assertIsInstance(banks["data"][0], Bank)
+        self.assertEqual(banks["data"][0]["swift"], "TSTBKTAA")
+
+    def test_adaptive_concurrency(self):
+        """The limit is halved on throttling (once per cooldown) and grows back on success."""
+        limiter = AdaptiveConcurrency(initial=8, maximum=10, cooldown=60)
+        for _ in range(2):
+            limiter.acquire()
+            limiter.release(throttled=True)
+        self.assertEqual(limiter.limit, 4)
+
+        for _ in range(60):
+            limiter.acquire()
+            limiter.release(throttled=False)
+        self.assertEqual(limiter.limit, 10)
+        self.assertEqual(limiter.throttled, 2)
+
+    @requests_mock.Mocker()
+    def test_throttled_requests_back_off(self, mock):
+        """A 429 lowers the client's concurrency and its Retry-After pauses new calls."""
+        mock.get("https://api.chapa.co/v1/transaction/verify/tx-1",
+                 [{"json": {"message": "Too many requests"}, "status_code": 429, "headers": {"Retry-After": "0.2"}},
+                  {"json": {"message": "Payment details", "data": {}}, "status_code": 200}])
+        limiter = ApiLimiter(concurrency=8)
+        chapa = ChapaClient("test_token", limiter=limiter)
+
+        with self.assertRaises(ChapaError):
+            chapa.verify("tx-1")
+        self.assertEqual(limiter.stats()["limit"], 4)
+        self.assertGreater(limiter.concurrency.paused_until, 0)
+
+        chapa.verify("tx-1")
+        self.assertEqual(limiter.stats()["succeeded"], 1)
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+
+    @unittest.skipUnless(httpx, "httpx is not installed")
+    def test_async_verify_many(self):
+        """Concurrent verifies return bodies and errors in input order, retrying 429s."""
+        calls = {}
+
+        def handler(request):
+            reference = request.url.path.rsplit("/", 1)[-1]
+            calls[reference] = calls.get(reference, 0) + 1
+            if reference == "throttled" and calls[reference] == 1:
+                return httpx.Response(429, headers={"Retry-After": "0"}, json={"message": "Too many requests"})
+            if reference == "missing":
+                return httpx.Response(404, json={"message": "Not found"})
+            return httpx.Response(200, json={"data": {"tx_ref": reference, "status": "success"}})
+
+        limiter = ApiLimiter(concurrency=2, max_concurrency=4)
+
+        async def verify_all():
+            async with AsyncChapaClient("test_token", transport=httpx.MockTransport(handler), limiter=limiter) as api:
+                return await api.verify_many(["ok", "throttled", "missing"], concurrency=2)
+
+        results = asyncio.run(verify_all())
+
+        # Every attempt went through the shared limiter, which saw the 429
+        self.assertEqual(limiter.stats()["throttled"], 1)
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+        self.assertEqual(limiter.stats()["succeeded"], 3)
+
+        self.assertEqual(results[0]["data"]["tx_ref"], "ok")
+        self.assertEqual(results[1]["data"]["tx_ref"], "throttled")
+        self.assertEqual(calls["throttled"], 2)
+        self.assertIsInstance(results[2], ChapaError)
+
+    @unittest.skipUnless(httpx, "httpx is not installed")
+    def test_async_initialize_is_not_retried_on_5xx(self):
+        """A POST answered with a 5xx may have gone through, so it is not sent again."""
+        calls = []
+
+        def handler(request):
+            calls.append(request.method)
+            return httpx.Response(503, json={"message": "Service unavailable"})
+
+        async def initialize():
+            async with AsyncChapaClient("test_token", transport=httpx.MockTransport(handler)) as api:
+                return await api.initialize({"tx_ref": "tx-1"})
+
+        with self.assertRaises(ChapaError):
+            asyncio.run(initialize())
+        self.assertEqual(calls, ["POST"])
+
+    def test_async_acquire_waits_for_a_release(self):
+        """A coroutine waiting on a full limiter is woken by a release from another thread."""
+        limiter = ApiLimiter(concurrency=1, max_concurrency=1)
+        limiter.acquire()
+
+        async def acquire():
+            threading.Timer(0.05, limiter.release, kwargs={"throttled": False}).start()
+            await asyncio.wait_for(limiter.acquire_async(), 2)
+
+        asyncio.run(acquire())
+        self.assertEqual(limiter.stats()["in_flight"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
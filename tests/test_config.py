@@ -0,0 +1,101 @@
+import os
+import json
+import base64
+import tempfile
+import unittest
+from unittest.mock import patch
+import requests_mock
+from chapa_cli import config, ChapaClient
+from chapa_cli.utils import load_token, save_token
+
+
+def encoded(token):
+    return base64.b64encode(token.encode("utf-8")).decode("utf-8")
+
+
+class ConfigTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "config.json")
+        self.env = patch.dict(os.environ, {"CHAPA_CONFIG_PATH": self.path})
+        self.env.start()
+        for variable in ["CHAPA_API_TOKEN", "CHAPA_ACCOUNT", "CHAPA_API_URL"]:
+            os.environ.pop(variable, None)
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    def write_config(self, data, mtime=None):
+        with open(self.path, "w") as config_file:
+            json.dump(data, config_file)
+        if mtime:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_config_is_read_once_until_it_changes(self):
+        self.write_config({"token": encoded("first")}, mtime=1000)
+
+        with patch("chapa_cli.config._read", wraps=config._read) as read:
+            self.assertEqual(load_token(), "first")
+            self.assertEqual(load_token(), "first")
+            self.assertEqual(read.call_count, 1)
+
+            self.write_config({"token": encoded("second")}, mtime=2000)
+            self.assertEqual(load_token(), "second")
+            self.assertEqual(read.call_count, 2)
+
+    def test_caches_are_scoped_by_api_url(self):
+        self.assertEqual(config.scoped_path("/tmp/store.sqlite3"), "/tmp/store.sqlite3")
+        with patch.dict(os.environ, {"CHAPA_API_URL": "http://127.0.0.1:8000/v1"}):
+            mock_path = config.scoped_path("/tmp/store.sqlite3")
+        self.assertNotEqual(mock_path, "/tmp/store.sqlite3")
+        self.assertTrue(mock_path.endswith(".sqlite3"))
+
+        save_token("shop-token", account="shop")
+        with patch.dict(os.environ, {"CHAPA_ACCOUNT": "shop"}):
+            self.assertEqual(config.scoped_path("/tmp/banks.json"), "/tmp/banks.json")
+            self.assertNotEqual(config.scoped_path("/tmp/store.sqlite3", per_account=True), "/tmp/store.sqlite3")
+
+    def test_profiles_and_precedence(self):
+        save_token("default-token")
+        save_token("shop-token", account="shop")
+        config.save_settings({"api_url": "http://localhost:8000/v1", "concurrency": 32}, account="shop")
+
+        self.assertEqual(load_token(), "default-token")
+        shop = config.get_settings("shop")
+        self.assertEqual((shop["token"], shop["api_url"], shop["concurrency"]), ("shop-token", "http://localhost:8000/v1", 32))
+        self.assertEqual(config.get_settings()["api_url"], config.DEFAULTS["api_url"])
+
+        with patch.dict(os.environ, {"CHAPA_ACCOUNT": "shop", "CHAPA_API_TOKEN": "env-token"}):
+            # The environment token overrides the active account only
+            self.assertEqual(load_token(), "env-token")
+            self.assertEqual(load_token("shop"), "shop-token")
+
+        with self.assertRaises(config.ConfigError):
+            config.get_settings("missing")
+
+        # A profile never borrows the top level token
+        config.save_settings({"api_url": "http://localhost:8000/v1"}, account="other")
+        with self.assertRaises(config.ConfigError):
+            load_token("other")
+        with patch.dict(os.environ, {"CHAPA_ACCOUNT": "other", "CHAPA_API_TOKEN": "env-token"}):
+            self.assertEqual(load_token(), "env-token")
+
+    @requests_mock.Mocker()
+    def test_clients_for_several_accounts(self, mock):
+        self.write_config({"profiles": {
+            "a": {"token": encoded("token-a")},
+            "b": {"token": encoded("token-b"), "api_url": "http://localhost:8000/v1"},
+        }})
+        mock.get("https://api.chapa.co/v1/banks", json={"data": []})
+        mock.get("http://localhost:8000/v1/banks", json={"data": []})
+
+        ChapaClient(account="a").banks()
+        self.assertEqual(mock.last_request.headers["Authorization"], "Bearer token-a")
+        ChapaClient(account="b").banks()
+        self.assertEqual(mock.last_request.url, "http://localhost:8000/v1/banks")
+        self.assertEqual(mock.last_request.headers["Authorization"], "Bearer token-b")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import io
+import os
+import json
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from chapa_cli.daemon import control, forward, make_server, should_forward
+from chapa_cli.store import TransactionStore
+
+
+class DaemonTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "daemon.sock")
+        self.server = make_server(self.path)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def forward(self, *args, env=None):
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+        with patch.dict(os.environ, env or {}), patch("sys.stdout", stdout):
+            code = forward(list(args), self.path)
+            stdout.flush()
+        return code, stdout.buffer.getvalue().decode("utf-8")
+
+    def test_forwards_command_with_client_environment(self):
+        store_path = os.path.join(self.tmpdir.name, "store.sqlite3")
+        with TransactionStore(store_path) as store:
+            store.save_verification("tx-1", {"message": "Payment details", "data": {"status": "success"}})
+
+        # The store path and output format only exist in the client's environment
+        code, output = self.forward("transaction", "verify", "tx-1",
+                                    env={"CHAPA_STORE_PATH": store_path, "CHAPA_OUTPUT": "json"})
+
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output)["status"], "success")
+        self.assertNotIn("CHAPA_STORE_PATH", os.environ)
+        self.assertEqual(control("ping", self.path)["served"], 1)
+
+    def test_exit_status_is_relayed(self):
+        code, output = self.forward("transaction", "no-such-command")
+        self.assertEqual(code, 2)
+
+    def test_interactive_and_stdin_commands_stay_local(self):
+        self.assertFalse(should_forward(["login"]))
+        self.assertFalse(should_forward(["-o", "json", "daemon", "status"]))
+        self.assertFalse(should_forward(["webhook", "listen", "http://localhost/hook"]))
+        self.assertFalse(should_forward(["transaction", "verify-bulk", "-"]))
+        # REFERENCES defaults to stdin
+        self.assertFalse(should_forward(["transaction", "verify-bulk", "--concurrency", "4"]))
+        self.assertTrue(should_forward(["transaction", "verify-bulk", os.devnull]))
+        self.assertTrue(should_forward(["-o", "json", "transaction", "verify", "tx-1"]))
+        self.assertIsNone(forward(["login"], self.path))
+
+    def test_long_running_commands_stay_local(self):
+        self.assertFalse(should_forward(["mock-server", "--port", "8001"]))
+        self.assertFalse(should_forward(["webhook", "bench", "http://localhost/hook"]))
+        self.assertFalse(should_forward(["webhook", "replay", "http://localhost/hook"]))
+        self.assertFalse(should_forward(["transaction", "events", "AP1", "--follow"]))
+        self.assertTrue(should_forward(["transaction", "events", "AP1"]))
+
+    def test_no_daemon_skips_argument_parsing(self):
+        with patch("chapa_cli.daemon.should_forward") as should_forward_mock:
+            self.assertIsNone(forward(["transaction", "verify", "tx-1"], os.path.join(self.tmpdir.name, "none.sock")))
+        should_forward_mock.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import time
+import unittest
+from datetime import datetime, timedelta
+from chapa_cli.utils import parse_datetime, format_date
+
+ROWS = 100000
+
+
+def legacy_format_date(date_str):
+    """The strptime based implementation format_date replaced."""
+    return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%Y-%m-%d")
+
+
+def synthetic_timestamps(count):
+    """API style created_at/updated_at values, one second apart."""
+    start = datetime(2023, 1, 1)
+    return [(start + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%S.%fZ") for i in range(count)]
+
+
+class DateParsingTestCase(unittest.TestCase):
+
+    def test_variant_formats(self):
+        self.assertEqual(format_date("2023-02-02T07:05:23.000000Z"), "2023-02-02")
+        self.assertEqual(format_date("2023-02-02T07:05:23Z"), "2023-02-02")
+        self.assertEqual(format_date("2023-02-02 07:05:23"), "2023-02-02")
+        self.assertEqual(format_date("2023-02-02"), "2023-02-02")
+        # Converted to UTC when there is a real offset
+        self.assertEqual(format_date("2023-02-02T01:00:00+03:00"), "2023-02-01")
+
+    def test_parse_datetime(self):
+        self.assertEqual(parse_datetime("2023-02-02T07:05:23.5Z"), datetime(2023, 2, 2, 7, 5, 23, 500000))
+        self.assertEqual(parse_datetime("2023-02-02T10:05:23+03:00"), datetime(2023, 2, 2, 7, 5, 23))
+        with self.assertRaises(ValueError):
+            parse_datetime("02/02/2023")
+
+    def test_matches_legacy_implementation(self):
+        for timestamp in synthetic_timestamps(1000):
+            self.assertEqual(format_date(timestamp), legacy_format_date(timestamp))
+
+    @unittest.skipUnless(os.getenv("CHAPA_BENCH"), "set CHAPA_BENCH=1 to run the format_date benchmark")
+    def test_benchmark_against_legacy(self):
+        """format_date over 100k rows (created_at and updated_at) is faster than strptime."""
+        created = synthetic_timestamps(ROWS)
+        # updated_at repeats created_at for most rows, as in real listings
+        rows = [(value, value) for value in created]
+
+        started = time.perf_counter()
+        for created_at, updated_at in rows:
+            legacy_format_date(created_at)
+            legacy_format_date(updated_at)
+        legacy = time.perf_counter() - started
+
+        format_date.cache_clear()
+        started = time.perf_counter()
+        for created_at, updated_at in rows:
+            format_date(created_at)
+            format_date(updated_at)
+        fast = time.perf_counter() - started
+
+        self.assertLess(fast, legacy)
+
+if __name__ == "__main__":
+    unittest.main()
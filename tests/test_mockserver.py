@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import requests_mock
+from click.testing import CliRunner
+from werkzeug.serving import make_server
+from chapa_cli.main import cli
+from chapa_cli.mockserver import CallbackSender, MockDataset, create_app
+from chapa_cli.receiver import verify_signature
+
+AUTH = {"Authorization": "Bearer test_token"}
+
+
+class MockServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = MockDataset(size=25, seed=7, per_page=10)
+        self.app = create_app(self.dataset).test_client()
+
+    def test_dataset_is_deterministic(self):
+        self.assertEqual(MockDataset(seed=7).transaction(3), MockDataset(seed=7).transaction(3))
+        self.assertNotEqual(MockDataset(seed=8).transaction(3), MockDataset(seed=7).transaction(3))
+
+    def test_pages_and_verify(self):
+        last = self.app.get("/v1/transactions?page=3", headers=AUTH).get_json()["data"]
+        self.assertEqual(len(last["transactions"]), 5)
+        self.assertIsNone(last["pagination"]["next_page_url"])
+
+        tx_ref = last["transactions"][0]["tx_ref"]
+        body = self.app.get(f"/v1/transaction/verify/{tx_ref}", headers=AUTH).get_json()
+        self.assertEqual(body["data"]["tx_ref"], tx_ref)
+        self.assertEqual(self.app.get("/v1/transaction/verify/unknown", headers=AUTH).status_code, 404)
+        self.assertEqual(self.app.get("/v1/banks").status_code, 401)
+
+    def test_initialize_rejects_reused_tx_ref(self):
+        data = {"amount": "100", "currency": "ETB", "email": "a@example.com", "tx_ref": "order-1"}
+        self.assertEqual(self.app.post("/v1/transaction/initialize", json=data, headers=AUTH).status_code, 200)
+        self.assertEqual(self.app.post("/v1/transaction/initialize", json=data, headers=AUTH).status_code, 400)
+        body = self.app.get("/v1/transaction/verify/order-1", headers=AUTH).get_json()
+        self.assertEqual(body["data"]["status"], "pending")
+
+    def test_throttling_and_errors(self):
+        app = create_app(self.dataset, throttle=1, error_rate=0).test_client()
+        self.assertEqual(app.get("/v1/banks", headers=AUTH).status_code, 200)
+        response = app.get("/v1/banks", headers=AUTH)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response.headers)
+
+        app = create_app(self.dataset, error_rate=1).test_client()
+        self.assertEqual(app.get("/v1/banks", headers=AUTH).status_code, 500)
+
+    @requests_mock.Mocker()
+    def test_completed_transaction_sends_signed_webhook(self, mock):
+        mock.post("http://localhost:9000/hook", status_code=200)
+        callbacks = CallbackSender(self.dataset, webhook_url="http://localhost:9000/hook", secret="secret", delay=0)
+        app = create_app(self.dataset, callbacks=callbacks).test_client()
+
+        app.post("/v1/transaction/initialize", json={"amount": 10, "currency": "ETB", "tx_ref": "order-2"}, headers=AUTH)
+        for _ in range(100):
+            if mock.called:
+                break
+            time.sleep(0.02)
+
+        request = mock.last_request
+        self.assertEqual(request.json()["tx_ref"], "order-2")
+        self.assertTrue(verify_signature("secret", request.body, request.headers))
+        self.assertEqual(self.dataset.find("order-2")["status"], "success")
+
+    def test_cli_runs_against_mock_server(self):
+        """getall pages through the whole dataset with the base URL pointed at the mock."""
+        server = make_server("127.0.0.1", 0, create_app(self.dataset), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        tmpdir = tempfile.TemporaryDirectory()
+        env = {"CHAPA_API_URL": f"http://127.0.0.1:{server.server_port}/v1", "CHAPA_API_TOKEN": "test_token",
+               "CHAPA_STORE_PATH": os.path.join(tmpdir.name, "store.sqlite3")}
+        try:
+            with patch.dict(os.environ, env):
+                result = CliRunner().invoke(cli, ["transaction", "getall", "--export", "jsonl"])
+        finally:
+            server.shutdown()
+            tmpdir.cleanup()
+
+        rows = [json.loads(line) for line in result.output.splitlines()]
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[0]["tx_ref"], self.dataset.tx_ref(0))
+
+if __name__ == "__main__":
+    unittest.main()
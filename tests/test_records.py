@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import unittest
+import subprocess
+from chapa_cli.records import Transaction, iter_json_array, decode_records
+from chapa_cli.mockserver import MockDataset
+
+# Synthetic transactions held by the memory benchmark, run with CHAPA_BENCH=1
+BENCH_ROWS = int(os.getenv("CHAPA_BENCH_ROWS", "1000000"))
+
+# Decodes BENCH_ROWS transactions page by page, keeping every row, and
+# reports the peak RSS of the process in MiB
+SCRIPT = """
+import sys, json, resource
+from chapa_cli.records import Transaction, decode_records
+from chapa_cli.mockserver import MockDataset
+
+mode, rows, per_page = sys.argv[1], int(sys.argv[2]), 1000
+dataset = MockDataset(size=per_page, seed=7)
+page = json.dumps({"data": {"transactions": [dataset.transaction(i) for i in range(per_page)]}}).encode()
+kept = []
+for _ in range(rows // per_page):
+    if mode == "records":
+        chunks = (page[i:i + 65536] for i in range(0, len(page), 65536))
+        kept.extend(decode_records(Transaction, chunks, ("data", "transactions")))
+    else:
+        kept.extend(json.loads(page)["data"]["transactions"])
+print(json.dumps({"rows": len(kept), "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def peak_rss(mode, rows):
+    result = subprocess.run([sys.executable, "-c", SCRIPT, mode, str(rows)], capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout)
+
+
+class RecordsTestCase(unittest.TestCase):
+
+    def test_streaming_decode_across_chunks(self):
+        """Items are decoded one by one however the document is split."""
+        dataset = MockDataset(size=20, seed=3)
+        transactions = [dataset.transaction(i) for i in range(20)]
+        transactions[0]["new_field"] = "kept"
+        del transactions[1]["updated_at"]
+        document = json.dumps({"message": "Transactions fetched", "data": {
+            "transactions": transactions, "pagination": {"next_page_url": None, "per_page": 20}}}).encode()
+
+        for size in (1, 7, 4096):
+            rest = {}
+            chunks = [document[i:i + size] for i in range(0, len(document), size)]
+            records = list(decode_records(Transaction, chunks, ("data", "transactions"), rest))
+
+            self.assertEqual([record.to_dict() for record in records], transactions)
+            self.assertEqual(rest["pagination"], {"next_page_url": None, "per_page": 20})
+
+        self.assertEqual(records[0]["customer"]["email"], transactions[0]["customer"]["email"])
+        self.assertIsNone(records[1].get("updated_at"))
+        # Repeated values are interned, so every row shares one string
+        currencies = [record.currency for record in records if record.currency == "ETB"]
+        self.assertIs(currencies[0], currencies[-1])
+        self.assertEqual(list(iter_json_array([b'{"data": null}'], ("data", "transactions"))), [])
+
+    @unittest.skipUnless(os.getenv("CHAPA_BENCH"), "set CHAPA_BENCH=1 to run the memory benchmark")
+    def test_records_peak_rss(self):
+        """Holding BENCH_ROWS transactions as records takes less memory than as dicts."""
+        dicts = peak_rss("dicts", BENCH_ROWS)
+        records = peak_rss("records", BENCH_ROWS)
+        sys.stderr.write(f"\n{BENCH_ROWS} transactions, peak RSS: dicts {dicts['peak_rss_mb']:.0f} MiB, "
+                         f"records {records['peak_rss_mb']:.0f} MiB\n")
+        self.assertEqual(records["rows"], dicts["rows"])
+        self.assertLess(records["peak_rss_mb"], dicts["peak_rss_mb"])
+
+if __name__ == "__main__":
+    unittest.main()
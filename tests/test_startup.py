@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import unittest
+import subprocess
+
+# Wall time budget for a cold `chapa --help`, in seconds
+STARTUP_BUDGET = float(os.getenv("CHAPA_STARTUP_BUDGET", "1.5"))
+
+HEAVY_MODULES = ["flask", "pyngrok", "rich", "requests"]
+
+# Runs the CLI in a fresh interpreter and reports which heavy modules it imported
+SCRIPT = """
+import sys, json
+from chapa_cli.main import cli
+try:
+    cli(sys.argv[1:], standalone_mode=False)
+finally:
+    sys.stderr.write(json.dumps([m for m in %r if m in sys.modules]))
+""" % (HEAVY_MODULES,)
+
+
+def run_cli(*args, env=None):
+    result = subprocess.run([sys.executable, "-c", SCRIPT, *args], capture_output=True, text=True,
+                            env=dict(os.environ, **(env or {})))
+    return result.stdout, json.loads(result.stderr.strip().splitlines()[-1])
+
+
+class StartupTestCase(unittest.TestCase):
+
+    def test_help_imports_no_heavy_modules(self):
+        output, imported = run_cli("--help")
+        self.assertIn("transaction", output)
+        self.assertEqual(imported, [])
+
+    def test_help_cold_start_time(self):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "chapa_cli.main", "--help"], capture_output=True, check=True)
+        self.assertLess(time.perf_counter() - started, STARTUP_BUDGET)
+
+    def test_verify_does_not_import_webhook_dependencies(self):
+        from chapa_cli.store import TransactionStore
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "store.sqlite3")
+            with TransactionStore(path) as store:
+                store.save_verification("tx-1", {"message": "Payment details", "data": {"status": "success"}})
+
+            output, imported = run_cli("transaction", "verify", "tx-1", env={"CHAPA_STORE_PATH": path})
+
+        self.assertIn("Payment details", output)
+        self.assertNotIn("flask", imported)
+        self.assertNotIn("pyngrok", imported)
+
+if __name__ == "__main__":
+    unittest.main()
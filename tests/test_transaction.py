@@ -1,17 +1,36 @@
+import os
+import json
+import tempfile
 import unittest
 from click.testing import CliRunner
 from unittest.mock import patch
+import requests
 import requests_mock
 from chapa_cli.transaction import transaction
+from chapa_cli.main import cli
+from chapa_cli import profiling
+from chapa_cli.stats import Columns, get_numpy, local_stats
+from chapa_cli.store import TransactionStore
 
 class TestTransactionCommands(unittest.TestCase):
 
     def setUp(self):
         self.runner = CliRunner()
+        # Keep the local transaction index out of the home directory
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            "CHAPA_STORE_PATH": os.path.join(self.tmpdir.name, "store.sqlite3"),
+            "CHAPA_BANKS_CACHE_PATH": os.path.join(self.tmpdir.name, "banks.json"),
+        })
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmpdir.cleanup()
 
     @patch('chapa_cli.transaction.load_token', return_value="test_token")
     @requests_mock.Mocker()
-    def test_banks_command(self, mock, load_token_mock):
+    def test_banks_command(self, load_token_mock, mock):
         """Test the banks command."""
         banks_response = {
             "message": "Banks retrieved",
@@ -35,7 +54,7 @@ class TestTransactionCommands(unittest.TestCase):
 
     @patch('chapa_cli.transaction.load_token', return_value="test_token")
     @requests_mock.Mocker()
-    def test_verify_command(self, mock, load_token_mock):
+    def test_verify_command(self, load_token_mock, mock):
         """Test the verify transaction command."""
         verify_response = {
             "message": "Payment details",
@@ -66,7 +85,7 @@ class TestTransactionCommands(unittest.TestCase):
 
     @patch('chapa_cli.transaction.load_token', return_value="test_token")
     @requests_mock.Mocker()
-    def test_initialize_command(self, mock, load_token_mock):
+    def test_initialize_command(self, load_token_mock, mock):
         """Test the initialize transaction command."""
         init_response = {
             "message": "Transaction initialized successfully",
@@ -84,5 +103,380 @@ class TestTransactionCommands(unittest.TestCase):
         print(f"Exception: {result.exception}") 
         self.assertIn("Transaction initialized successfully", result.output)
 
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_verify_bulk_command(self, load_token_mock, mock):
+        """Test verifying many references concurrently as JSONL."""
+        mock.get("https://api.chapa.co/v1/transaction/verify/ref-1",
+                 json={"message": "Payment details", "data": {"status": "success", "amount": 100}}, status_code=200)
+        mock.get("https://api.chapa.co/v1/transaction/verify/ref-2",
+                 json={"message": "Invalid transaction or Transaction not found", "data": None}, status_code=404)
+
+        result = self.runner.invoke(transaction.commands['verify-bulk'], ['--concurrency', '2'], input="ref-1\nref-2\n")
+        rows = {row["reference"]: row for row in map(json.loads, result.output.splitlines())}
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertTrue(rows["ref-1"]["ok"])
+        self.assertEqual(rows["ref-1"]["amount"], 100)
+        self.assertFalse(rows["ref-2"]["ok"])
+        self.assertEqual(rows["ref-2"]["http_status"], 404)
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_getall_export_command(self, load_token_mock, mock):
+        """Test exporting every page as JSONL, stopping at --since."""
+        def page(created_at, next_page_url):
+            return {"data": {
+                "transactions": [{"ref_id": created_at, "created_at": created_at, "customer": {"email": "a@b.c"}}],
+                "pagination": {"next_page_url": next_page_url},
+            }}
+        mock.get("https://api.chapa.co/v1/transactions?page=1",
+                 json=page("2024-03-02T10:00:00.000000Z", "?page=2"), status_code=200)
+        mock.get("https://api.chapa.co/v1/transactions?page=2",
+                 json=page("2024-02-01T10:00:00.000000Z", "?page=3"), status_code=200)
+        mock.get("https://api.chapa.co/v1/transactions?page=3",
+                 json=page("2024-01-01T10:00:00.000000Z", None), status_code=200)
+
+        result = self.runner.invoke(transaction.commands['getall'], ['--export', 'jsonl', '--since', '2024-01-15'])
+        rows = [json.loads(line) for line in result.output.splitlines()]
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual([row["ref_id"] for row in rows],
+                         ["2024-03-02T10:00:00.000000Z", "2024-02-01T10:00:00.000000Z"])
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_sync_and_local_getall(self, load_token_mock, mock):
+        """Test syncing into the local index and querying it by email."""
+        transactions = [
+            {"ref_id": "APnew", "status": "success", "created_at": "2024-03-02T10:00:00.000000Z",
+             "customer": {"email": "new@example.com"}},
+            {"ref_id": "APold", "status": "failed", "created_at": "2024-01-02T10:00:00.000000Z",
+             "customer": {"email": "old@example.com"}},
+        ]
+        mock.get("https://api.chapa.co/v1/transactions?page=1",
+                 json={"data": {"transactions": transactions, "pagination": {"next_page_url": None}}}, status_code=200)
+
+        result = self.runner.invoke(transaction.commands['sync'])
+        self.assertIn("Synced 2 transactions", result.output)
+
+        result = self.runner.invoke(transaction.commands['getall'],
+                                    ['--local', '--email', 'old@example.com', '--export', 'jsonl'])
+        self.assertEqual([json.loads(line)["ref_id"] for line in result.output.splitlines()], ["APold"])
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_sync_refreshes_pending_transactions(self, load_token_mock, mock):
+        """Test that an incremental sync reads transactions that were pending again."""
+        def chapa(ref_id, status, created_at):
+            return {"ref_id": ref_id, "status": status, "created_at": created_at}
+        first = [chapa("AP2", "success", "2024-03-01T12:00:00.000000Z"),
+                 chapa("AP1", "pending", "2024-03-01T10:00:00.000000Z")]
+        second = [chapa("AP2", "success", "2024-03-01T12:00:00.000000Z"),
+                  chapa("AP1", "success", "2024-03-01T10:00:00.000000Z"),
+                  chapa("AP0", "failed", "2024-02-01T10:00:00.000000Z")]
+        mock.get("https://api.chapa.co/v1/transactions?page=1",
+                 [{"json": {"data": {"transactions": page, "pagination": {"next_page_url": None}}}}
+                  for page in (first, second)])
+
+        self.runner.invoke(transaction.commands['sync'])
+        result = self.runner.invoke(transaction.commands['sync'])
+
+        # Paging stops at AP0, older than the pending AP1
+        self.assertIn("Synced 2 transactions", result.output)
+        with TransactionStore() as store:
+            self.assertEqual(next(store.query(ref="AP1"))["status"], "success")
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_reconcile_command(self, load_token_mock, mock):
+        """Test diffing a CSV ledger against the API across worker processes."""
+        def chapa(tx_ref, status, currency, amount, charge):
+            return {"tx_ref": tx_ref, "status": status, "currency": currency, "amount": amount, "charge": charge,
+                    "created_at": "2024-03-01T10:00:00.000000Z"}
+        transactions = [
+            chapa("tx-1", "success", "ETB", "100.00", "3.50"),
+            chapa("tx-2", "success", "ETB", "250.00", "8.75"),
+            chapa("tx-3", "failed", "USD", "10.00", "0"),
+            chapa("tx-9", "success", "USD", "5.00", "0.18"),
+            chapa(None, "success", "ETB", "1.00", "0.04"),
+        ]
+        mock.get("https://api.chapa.co/v1/transactions?page=1",
+                 json={"data": {"transactions": transactions, "pagination": {"next_page_url": None}}}, status_code=200)
+        ledger = os.path.join(self.tmpdir.name, "ledger.csv")
+        with open(ledger, "w") as ledger_file:
+            ledger_file.write("reference,total,currency,status\n"
+                              "tx-1,100,ETB,success\n"
+                              "tx-2,205.00,ETB,success\n"
+                              "tx-3,10,USD,success\n"
+                              "tx-4,50,ETB,success\n")
+        output = os.path.join(self.tmpdir.name, "diff.jsonl")
+
+        result = self.runner.invoke(transaction.commands['reconcile'], [
+            '--ledger', ledger, '--key', 'tx_ref', '--column', 'key=reference', '--column', 'amount=total',
+            '--output', output, '--workers', '2', '--partitions', '4'])
+        with open(output) as diff:
+            rows = {row["key"]: row for row in map(json.loads, diff)}
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual(rows["tx-2"]["fields"], "amount")
+        self.assertEqual(rows["tx-3"]["fields"], "status")
+        self.assertEqual(rows["tx-4"]["kind"], "missing")
+        self.assertEqual(rows["tx-9"]["kind"], "extra")
+        self.assertNotIn("tx-1", rows)
+        self.assertIn("1 matched, 1 missing, 1 extra, 2 mismatched", result.output)
+        self.assertIn("skipped 0 ledger rows and 1 Chapa transactions without a tx_ref", result.output)
+        self.assertIn("ETB: ledger 355.00, 2 successful at Chapa, amount 350.00, charge 12.25", result.output)
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_stats_fold_only_new_rows(self, load_token_mock, mock):
+        """Test that local stats fold finished transactions once and recount pending ones."""
+        def chapa(ref_id, status, amount, created_at, updated_at):
+            return {"ref_id": ref_id, "status": status, "currency": "ETB", "amount": amount, "charge": "1.00",
+                    "payment_method": "telebirr", "created_at": created_at, "updated_at": updated_at}
+        first = [chapa("AP1", "success", "100.00", "2024-03-01T10:00:00.000000Z", "2024-03-01T10:00:30.000000Z"),
+                 chapa("AP2", "pending", "50.00", "2024-03-01T11:00:00.000000Z", "2024-03-01T11:00:00.000000Z")]
+        second = [chapa("AP2", "success", "50.00", "2024-03-01T11:00:00.000000Z", "2024-03-01T11:10:00.000000Z"),
+                  chapa("AP1", "success", "100.00", "2024-03-01T10:00:00.000000Z", "2024-03-01T10:00:30.000000Z")]
+        mock.get("https://api.chapa.co/v1/transactions?page=1",
+                 [{"json": {"data": {"transactions": page, "pagination": {"next_page_url": None}}}}
+                  for page in (first, second)])
+
+        result = self.runner.invoke(cli, ['-o', 'json', 'transaction', 'stats', '--local', '--refresh'])
+        report = json.loads(result.output)
+        self.assertEqual(report["total"]["count"], 2)
+        self.assertEqual(report["total"]["successful"], 1)
+        self.assertEqual(report["total"]["amount"], 100.0)
+
+        # The second sync re-stores AP1 unchanged and finishes AP2
+        self.runner.invoke(transaction.commands['sync'], ['--full'])
+        with TransactionStore() as store:
+            aggregates, folded = local_stats(store)
+        report = aggregates.report()
+        self.assertEqual(folded, 1)
+        self.assertEqual(report["total"]["successful"], 2)
+        self.assertEqual(report["total"]["amount"], 150.0)
+        self.assertEqual(report["groups"][2], {"dimension": "day", "key": "2024-03-01", "count": 2, "successful": 2,
+                                               "success_rate": 1.0, "amount": 150.0, "charge": 2.0})
+        self.assertEqual(report["latency"]["p50_at_most"], 60)
+
+    def test_stats_columns_convert_in_bulk(self):
+        """Test that the bulk conversions (numpy, SQL) give the row by row result."""
+        rows = [("success", "2024-03-01T10:00:00.000000Z", "2024-03-01T10:01:00.500000Z", "ETB", "100.50", "1.5",
+                 "telebirr"),
+                ("SUCCESS", "2024-03-01T12:00:00+03:00", "2024-03-01T09:00:05Z", "USD", "abc", None, None),
+                ("pending", None, None, None, "10", "1", "cbebirr"),
+                ("success", "", "", "ETB", None, "2", "telebirr")]
+        with patch("chapa_cli.stats._numpy", None):
+            expected = Columns(rows)
+        if get_numpy() is not None:
+            for batch in (rows, rows[:1]):
+                with patch("chapa_cli.stats._numpy", None):
+                    loop = Columns(batch)
+                columns = Columns(batch)
+                for name in ("success", "amount", "charge", "latency"):
+                    self.assertEqual(getattr(columns, name), getattr(loop, name))
+                self.assertEqual({dimension: list(keys) for dimension, keys in columns.keys.items()}, loop.keys)
+        self.assertEqual(list(expected.latency), [60.5, 5.0, -1.0, -1.0])
+
+        with TransactionStore() as store:
+            store.upsert_transactions([
+                {"ref_id": str(i), "status": status, "created_at": created_at, "updated_at": updated_at,
+                 "currency": currency, "amount": amount, "charge": charge, "payment_method": payment_method}
+                for i, (status, created_at, updated_at, currency, amount, charge, payment_method) in enumerate(rows)])
+            typed = Columns.from_typed([row for batch in store.stats_rows(pending=True) for row in batch]
+                                       + [row for batch in store.stats_rows() for row in batch])
+        self.assertEqual(sorted(typed.latency), sorted(expected.latency))
+        self.assertEqual(sorted(typed.charge), sorted(expected.charge))
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_verify_answers_finished_transactions_locally(self, load_token_mock, mock):
+        """Test that a successful verify is served from the index until --refresh."""
+        verify_response = {"message": "Payment details", "data": {"status": "success", "tx_ref": "tx-1"}}
+        mock.get("https://api.chapa.co/v1/transaction/verify/tx-1", json=verify_response, status_code=200)
+
+        self.runner.invoke(transaction.commands['verify'], ["tx-1"])
+        result = self.runner.invoke(transaction.commands['verify'], ["tx-1"])
+        self.assertIn("Payment details", result.output)
+        self.assertEqual(mock.call_count, 1)
+
+        self.runner.invoke(transaction.commands['verify'], ["tx-1", "--refresh"])
+        self.assertEqual(mock.call_count, 2)
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_banks_cache(self, load_token_mock, mock):
+        """Test that the bank list is cached, revalidated and looked up by SWIFT."""
+        banks_response = {"message": "Banks retrieved", "data": [{"id": 1, "swift": "TSTBKTAA", "name": "Test Bank"}]}
+        mock.get("https://api.chapa.co/v1/banks", json=banks_response, status_code=200, headers={"ETag": '"v1"'})
+
+        self.runner.invoke(transaction.commands['banks'])
+        result = self.runner.invoke(transaction.commands['banks'], ['--offline'])
+        self.assertIn("Test Bank", result.output)
+        self.assertEqual(mock.call_count, 1)
+
+        mock.get("https://api.chapa.co/v1/banks", status_code=304)
+        result = self.runner.invoke(transaction.commands['banks'], ['--ttl', '0'])
+        self.assertIn("Test Bank", result.output)
+        self.assertEqual(mock.last_request.headers["If-None-Match"], '"v1"')
+
+        result = self.runner.invoke(transaction.commands['banks'], ['--swift', 'tstbktaa', '--offline'])
+        self.assertEqual(json.loads(result.output)["id"], 1)
+
+        # An unreachable or failing API falls back to the stale list
+        mock.get("https://api.chapa.co/v1/banks", exc=requests.ConnectionError("Connection refused"))
+        result = self.runner.invoke(transaction.commands['banks'], ['--ttl', '0'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Test Bank", result.output)
+        self.assertIn("Warning: could not refresh the bank list", result.output)
+        mock.get("https://api.chapa.co/v1/banks", text="<html>Forbidden</html>", status_code=403)
+        result = self.runner.invoke(transaction.commands['banks'], ['--ttl', '0'])
+        self.assertIn("Failed to get supported banks: 403: <html>Forbidden</html>", result.output)
+
+        # The in-process lookup tables follow a refreshed list
+        banks_response["data"].append({"id": 2, "swift": "NEWBKTAA", "name": "New Bank"})
+        mock.get("https://api.chapa.co/v1/banks", json=banks_response, status_code=200)
+        result = self.runner.invoke(transaction.commands['banks'], ['--swift', 'newbktaa', '--refresh'])
+        self.assertEqual(json.loads(result.output)["id"], 2)
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_global_output_format(self, load_token_mock, mock):
+        """Test that --output csv streams rows instead of rendering a table."""
+        events_response = {"message": "Events fetched", "data": [
+            {"item": 1, "message": "Checkout created", "type": "log",
+             "created_at": "2024-03-02T10:00:00.000000Z", "updated_at": "2024-03-02T10:00:00.000000Z"},
+            {"item": 2, "message": "Payment completed", "type": "log",
+             "created_at": "2024-03-02T10:01:00.000000Z", "updated_at": "2024-03-02T10:01:00.000000Z"},
+        ]}
+        mock.get("https://api.chapa.co/v1/transaction/events/AP1", json=events_response, status_code=200)
+
+        result = self.runner.invoke(cli, ['--output', 'csv', 'transaction', 'events', 'AP1'])
+        lines = result.output.splitlines()
+
+        self.assertEqual(lines[0], "item,message,type,created_at,updated_at")
+        self.assertEqual(len(lines), 3)
+        self.assertNotIn("Transaction Events Fetched", result.output)
+
+        result = self.runner.invoke(cli, ['-o', 'json', 'transaction', 'events', 'AP1'])
+        self.assertEqual([event["item"] for event in json.loads(result.output)], [1, 2])
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_initialize_batch_resumes_from_checkpoint(self, load_token_mock, mock):
+        """Test that a resumed batch skips completed rows and reuses generated tx_refs."""
+        rows = os.path.join(self.tmpdir.name, "rows.csv")
+        output = os.path.join(self.tmpdir.name, "links.csv")
+        with open(rows, "w") as rows_file:
+            rows_file.write("amount,email,tx_ref\n100,a@example.com,given-ref\n200,b@example.com,\n")
+
+        mock.post("https://api.chapa.co/v1/transaction/initialize", [
+            {"json": {"message": "Hosted Link", "data": {"checkout_url": "https://checkout.chapa.co/1"}}, "status_code": 200},
+            {"json": {"message": "Server Error"}, "status_code": 500},
+        ])
+        args = ['initialize-batch', rows, '--output', output, '--format', 'csv', '--concurrency', '1']
+        result = self.runner.invoke(transaction, args)
+        self.assertEqual(result.exit_code, 1)
+        first_refs = [request.json()["tx_ref"] for request in mock.request_history]
+
+        mock.post("https://api.chapa.co/v1/transaction/initialize",
+                  json={"message": "Hosted Link", "data": {"checkout_url": "https://checkout.chapa.co/2"}}, status_code=200)
+        result = self.runner.invoke(transaction, args)
+        self.assertEqual(result.exit_code, 0)
+
+        # Only the failed row is sent again, with the same generated tx_ref
+        self.assertEqual(first_refs[0], "given-ref")
+        self.assertEqual(mock.request_history[-1].json()["tx_ref"], first_refs[1])
+        self.assertEqual(mock.call_count, 3)
+        with open(output) as output_file:
+            lines = output_file.read().splitlines()
+        self.assertEqual(lines[0], "row,tx_ref,ok,http_status,checkout_url,message")
+        self.assertEqual(len(lines), 4)
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_events_follow_prints_only_new_events(self, load_token_mock, mock):
+        """Test that --follow prints each event once, across polls of several references."""
+        def event(item, message):
+            return {"item": item, "message": message, "type": "log", "created_at": "2024-03-02T10:00:00.000000Z"}
+
+        mock.get("https://api.chapa.co/v1/transaction/events/AP1", [
+            {"json": {"data": [event(1, "Checkout created")]}, "status_code": 200},
+            {"json": {"data": [event(1, "Checkout created"), event(2, "Payment completed")]}, "status_code": 200},
+        ])
+        mock.get("https://api.chapa.co/v1/transaction/events/AP2", json={"data": [event(1, "Checkout created")]},
+                 status_code=200)
+
+        result = self.runner.invoke(cli, ['-o', 'jsonl', 'transaction', 'events', 'AP1', 'AP2', '--follow',
+                                          '--interval', '0.01', '--timeout', '0.2'])
+        lines = [(row["reference"], row["item"]) for row in map(json.loads, result.output.splitlines())]
+
+        self.assertEqual(sorted(lines), [("AP1", 1), ("AP1", 2), ("AP2", 1)])
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_events_follow_stops_on_client_errors(self, load_token_mock, mock):
+        """Test that --follow retries 5xx but gives up on a reference the API rejects."""
+        mock.get("https://api.chapa.co/v1/transaction/events/AP1", [
+            {"json": {"message": "Unavailable"}, "status_code": 503},
+            {"json": {"data": [{"item": 1, "message": "Checkout created"}]}, "status_code": 200},
+        ])
+        mock.get("https://api.chapa.co/v1/transaction/events/missing", json={"message": "Invalid reference"},
+                 status_code=404)
+
+        result = self.runner.invoke(cli, ['-o', 'jsonl', 'transaction', 'events', 'AP1', 'missing', '--follow',
+                                          '--interval', '0.01', '--timeout', '0.3'])
+        rows = [json.loads(line) for line in result.output.splitlines()]
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn({"message": "Invalid reference", "reference": "missing"}, rows)
+        self.assertIn("Checkout created", [row.get("message") for row in rows])
+        self.assertEqual(sum(request.path.endswith("/missing") for request in mock.request_history), 1)
+
+        # Nothing left to follow: the command returns without waiting for --timeout
+        result = self.runner.invoke(transaction.commands['events'], ['missing', '--follow', '--timeout', '30'])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Stopped following missing", result.output)
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_events_follow_table_output(self, load_token_mock, mock):
+        """Test that --follow renders events in the default table mode."""
+        mock.get("https://api.chapa.co/v1/transaction/events/AP1", json={"data": [
+            {"item": 1, "message": "Checkout created", "type": "log", "created_at": "2024-03-02T10:00:00.000000Z"}]},
+            status_code=200)
+
+        result = self.runner.invoke(transaction.commands['events'], ['AP1', '--follow', '--interval', '0.01',
+                                                                     '--timeout', '0.1'])
+
+        self.assertIsNone(result.exception)
+        self.assertIn("AP1 #1", result.output)
+        self.assertIn("Checkout created", result.output)
+
+    @patch('chapa_cli.transaction.load_token', return_value="test_token")
+    @requests_mock.Mocker()
+    def test_profile_writes_phase_breakdown(self, load_token_mock, mock):
+        """--profile-json records the request, JSON decode and rendering phases."""
+        mock.get("https://api.chapa.co/v1/transaction/events/AP1", status_code=200, json={
+            "message": "Events fetched", "data": [{"item": 1, "message": "Checkout created", "type": "log",
+                                                   "created_at": "2024-03-02T10:00:00.000000Z",
+                                                   "updated_at": "2024-03-02T10:00:00.000000Z"}]})
+        report_path = os.path.join(self.tmpdir.name, "profile.json")
+        # Left over from before, e.g. an earlier command in the daemon
+        profiling.record("imports", 5.0)
+
+        result = self.runner.invoke(cli, ['--profile-json', report_path, 'transaction', 'events', 'AP1'])
+
+        self.assertEqual(result.exit_code, 0)
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+        self.assertGreater(report["total_ms"], 0)
+        self.assertLess(report["total_ms"], 5000)
+        self.assertLess(report["phases"].get("imports", {}).get("total_ms", 0), 5000)
+        for name in ("request", "json_decode", "render"):
+            self.assertEqual(report["phases"][name]["calls"], 1)
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,19 @@
+import os
+import json
+import tempfile
 import unittest
+import time
+import threading
+import requests_mock
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
+from flask import Flask
 from click.testing import CliRunner
 from chapa_cli.webhook import app, webhook
+from chapa_cli.receiver import EventQueue, add_receiver, compute_signature
+from chapa_cli.eventlog import EventLog, iter_events, list_segments
+from chapa_cli.urlcheck import check_urls, dns_cache
+from chapa_cli.dedup import Deduplicator
+from chapa_cli.forward import FanOut
 
 class WebhookTestCase(unittest.TestCase):
     
@@ -23,5 +36,274 @@ class WebhookTestCase(unittest.TestCase):
         result = self.runner.invoke(webhook.commands['listen'], ['http://localhost:5000/webhook/test'])
         self.assertIn('Running on http://0.0.0.0:5000/', result.output)
 
+
+class ReceiverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.written = []
+        self.events = EventQueue(self.written.extend, maxsize=1)
+        self.dedup = Deduplicator(capacity=10)
+        receiver_app = Flask(__name__)
+        add_receiver(receiver_app, '/hook', self.events, secret_key="secret", dedup=self.dedup)
+        self.app = receiver_app.test_client()
+
+    def post(self, payload, signature):
+        body = json.dumps(payload)
+        return self.app.post('/hook', data=body, headers={'x-chapa-signature': signature})
+
+    def test_signed_event_is_queued(self):
+        payload = {"event": "charge.success", "tx_ref": "tx-1"}
+        response = self.post(payload, compute_signature("secret", json.dumps(payload)))
+        self.assertEqual(response.status_code, 200)
+
+        self.events.start().stop()
+        self.assertEqual(self.written[0]["payload"], payload)
+
+    def test_bad_signature_is_rejected(self):
+        response = self.post({"event": "charge.success"}, "not-a-signature")
+        self.assertEqual(response.status_code, 401)
+
+    def test_body_must_be_signed(self):
+        """The static Chapa-Signature header alone does not authenticate a body."""
+        forged = json.dumps({"tx_ref": "forged", "amount": "999999"})
+        response = self.app.post('/hook', data=forged,
+                                 headers={'Chapa-Signature': compute_signature("secret", "secret")})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.dedup.stats()["unique"], 0)
+
+    def test_full_queue_asks_for_retry(self):
+        payload = {"event": "charge.success"}
+        signature = compute_signature("secret", json.dumps(payload))
+        self.assertEqual(self.post(payload, signature).status_code, 200)
+        self.assertEqual(self.post(payload, signature).status_code, 503)
+        self.assertEqual(self.events.dropped, 1)
+
+    def test_redelivery_is_acknowledged_once(self):
+        payload = {"event": "charge.success", "tx_ref": "tx-1", "status": "success"}
+        signature = compute_signature("secret", json.dumps(payload))
+        self.assertEqual(self.post(payload, signature).status_code, 200)
+        # Not queued again, so the full queue does not answer 503
+        self.assertEqual(self.post(payload, signature).status_code, 200)
+
+        stats = self.app.get('/hook').get_json()
+        self.assertEqual((stats["received"], stats["duplicates"], stats["unique"]), (1, 1, 1))
+
+    def test_dedup_index_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "dedup.sqlite3")
+            first = Deduplicator(capacity=1, path=path)
+            self.assertFalse(first.check_and_add("tx-1:success"))
+            self.assertFalse(first.check_and_add("tx-2:success"))
+            # Evicted from the LRU, still found in the index
+            self.assertTrue(first.check_and_add("tx-1:success"))
+            first.close()
+
+            second = Deduplicator(path=path)
+            self.assertTrue(second.check_and_add("tx-2:success"))
+            self.assertFalse(second.check_and_add("tx-2:failed"))
+            self.assertEqual(second.stats()["duplicates"], 1)
+            second.close()
+
+
+class BenchTestCase(unittest.TestCase):
+
+    @requests_mock.Mocker()
+    def test_bench_command_json_report(self, mock):
+        mock.post("http://localhost:9000/hook", status_code=200)
+
+        result = CliRunner().invoke(webhook.commands['bench'], [
+            'http://localhost:9000/hook', '--duration', '0.2', '--concurrency', '2', '--usekey', 'secret', '--json'])
+        report = json.loads(result.output)
+
+        self.assertGreater(report["requests"], 0)
+        self.assertEqual(report["error_rate"], 0)
+        self.assertEqual(sum(report["histogram"].values()), report["requests"])
+        body = mock.last_request.text
+        self.assertEqual(mock.last_request.headers["x-chapa-signature"], compute_signature("secret", body))
+
+
+class EventQueueTestCase(unittest.TestCase):
+
+    def test_writer_survives_handler_errors(self):
+        written, failures = [], [OSError("No space left on device")]
+
+        def handler(batch):
+            if failures:
+                raise failures.pop()
+            written.extend(batch)
+
+        events = EventQueue(handler, idle_interval=0.2).start()
+        self.assertTrue(events.put({"i": 1}))
+        time.sleep(0.1)
+        # The batch is retried, new events are refused meanwhile
+        self.assertFalse(events.healthy)
+        self.assertFalse(events.put({"i": 2}))
+        time.sleep(0.5)
+        self.assertTrue(events.healthy)
+        self.assertTrue(events.put({"i": 3}))
+        events.stop()
+        self.assertEqual(written, [{"i": 1}, {"i": 3}])
+        self.assertEqual(events.dropped, 1)
+
+    def test_stop_does_not_hang(self):
+        def handler(batch):
+            raise OSError("Broken pipe")
+
+        events = EventQueue(handler, maxsize=1, idle_interval=0.05).start()
+        events.put({"i": 1})
+        time.sleep(0.1)
+        started = time.monotonic()
+        events.stop(timeout=2)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(events.failed, 1)
+
+
+class EventLogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.runner = CliRunner()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_events(self, count, **kwargs):
+        log = EventLog(self.tmpdir.name, **kwargs)
+        for i in range(count):
+            log.append([{"received_at": i, "headers": {"x-chapa-signature": "sig"}, "body": json.dumps({"i": i})}])
+        log.close()
+
+    def test_segments_rotate_and_replay_in_order(self):
+        self.write_events(10, segment_size=200)
+        self.assertGreater(len(list_segments(self.tmpdir.name)), 1)
+        self.assertEqual([event["received_at"] for event in iter_events(self.tmpdir.name)], list(range(10)))
+
+    def test_idle_writer_fsyncs_on_a_timer(self):
+        log = EventLog(self.tmpdir.name, fsync_every=1000, fsync_interval=0.05)
+        events = EventQueue(lambda batch: log.append(batch), idle=log.tick, idle_interval=0.05).start()
+        events.put({"received_at": 1})
+        # Nothing else arrives to trigger a sync on append, the writer thread syncs anyway
+        time.sleep(0.3)
+        self.assertEqual(log.unsynced, 0)
+        events.stop()
+        log.close()
+
+    @requests_mock.Mocker()
+    def test_replay_command(self, mock):
+        self.write_events(3)
+        mock.post("http://localhost:9000/hook", status_code=200)
+
+        result = self.runner.invoke(webhook.commands['replay'],
+                                    ['http://localhost:9000/hook', '--log-dir', self.tmpdir.name, '--concurrency', '2'])
+
+        self.assertIn("Replayed 3 events", result.output)
+        self.assertIn("0 failed", result.output)
+        self.assertEqual(mock.last_request.headers["x-chapa-signature"], "sig")
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def reply(self):
+        self.connections.add(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200 if self.path != "/down" else 503)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_GET = do_POST = reply
+
+    def log_message(self, *args):
+        pass
+
+
+class VerifyWebhookTestCase(unittest.TestCase):
+
+    def setUp(self):
+        KeepAliveHandler.connections = set()
+        self.server = HTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_urls_on_one_host_share_a_connection(self):
+        reports = list(check_urls([f"{self.base}/a", f"{self.base}/b", f"{self.base}/down"]))
+
+        # GET and POST of every URL went over a single connection
+        self.assertEqual(len(KeepAliveHandler.connections), 1)
+        self.assertEqual(len(reports), 3)
+        self.assertTrue(all("get" in report["timings_ms"] for report in reports))
+        # Only the first URL paid for the connection
+        self.assertEqual(sum("connect" in report["timings_ms"] for report in reports), 1)
+        errors = {report["url"].rsplit("/", 1)[-1]: report["error"] for report in reports}
+        self.assertIn("Only HTTPS", errors["a"])
+        self.assertIn("Status code: 503", errors["down"])
+        self.assertTrue(dns_cache.get(("127.0.0.1", self.server.server_port)))
+
+    def test_verifywebhook_json_report(self):
+        runner = CliRunner()
+        result = runner.invoke(webhook.commands['verifywebhook'], [f"{self.base}/a", f"{self.base}/b"],
+                               env={"CHAPA_OUTPUT": "jsonl"})
+
+        self.assertEqual(result.exit_code, 1)
+        reports = [json.loads(line) for line in result.output.splitlines()]
+        self.assertEqual(sorted(report["get_status"] for report in reports), [200, 200])
+        self.assertTrue(all(report["post_status"] == 200 for report in reports))
+
+class ForwardTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.received = {"/slow": [], "/flaky": []}
+        self.attempts = {"/flaky": 0}
+        test = self
+
+        class Handler(KeepAliveHandler):
+            def reply(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status = 200
+                if self.path == "/slow":
+                    test.release.wait(5)
+                else:
+                    test.attempts["/flaky"] += 1
+                    status = 503 if test.attempts["/flaky"] == 1 else 200
+                if status == 200:
+                    test.received[self.path].append((json.loads(body), self.headers["x-chapa-signature"]))
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            do_POST = reply
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_slow_target_does_not_hold_back_others(self):
+        fanout = FanOut([f"{self.base}/slow", f"{self.base}/flaky"], queue_size=1, workers=1, backoff=0).start()
+
+        for i in range(3):
+            fanout.forward([{"body": json.dumps({"i": i}), "headers": {"x-chapa-signature": "sig"}}])
+            time.sleep(0.1)
+        slow_target, flaky_target = fanout.targets
+        # One in flight and one queued: the third is shed for the slow target only
+        self.assertEqual(slow_target.dropped, 1)
+        self.assertEqual([payload["i"] for payload, _ in self.received["/flaky"]], [0, 1, 2])
+
+        self.release.set()
+        fanout.stop(timeout=5)
+        self.assertEqual(slow_target.stats()["forwarded"], 2)
+        self.assertEqual(flaky_target.retried, 1)
+        self.assertEqual(self.received["/flaky"][0][1], "sig")
+
 if __name__ == "__main__":
     unittest.main()